@@ -1,11 +1,33 @@
-import pygame
-import random
-import math
-import sys
+import time
+LAUNCH_TIME = time.perf_counter() # See profiler.StartupTimer
+
+import pygame # noqa: E402
+import random # noqa: E402
+import math # noqa: E402
+import sys # noqa: E402
+import os # noqa: E402
+import argparse # noqa: E402
+import hashlib # noqa: E402
+import collections # noqa: E402
+import pickle # noqa: E402
+import struct # noqa: E402
+import zlib # noqa: E402
+
+import numpy as np # noqa: E402
+
+import hud # noqa: E402
+import profiler # noqa: E402
+import text_cache # noqa: E402
+from pool import PooledSprite, SpritePool # noqa: E402
+from dirty_rects import DirtyRectTracker # noqa: E402
+from spatial_hash import SpatialHash # noqa: E402
+from timestep import FixedTimestep, lerp_wrapped # noqa: E402
 
 # --- Constants ---
 WIDTH, HEIGHT = 800, 600
-FPS = 60
+FPS = 60 # Render frame cap
+TICK_RATE = 60 # Simulation ticks per second, independent of FPS
+MAX_TICKS_PER_FRAME = 5 # Catch-up cap so one slow frame can't snowball
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0) # For Game Over text and Player damage
@@ -35,6 +57,11 @@ BULLET_RADIUS = 2
 CODE_BLOCK_SPEED_MIN = 1
 CODE_BLOCK_SPEED_MAX = 4
 CODE_BLOCK_START_COUNT = 4
+# Level scaling: each level adds blocks and speed, up to a cap
+CODE_BLOCK_COUNT_PER_LEVEL = 2
+CODE_BLOCK_MAX_COUNT = 15
+CODE_BLOCK_SPEED_PER_LEVEL = 0.5
+CODE_BLOCK_SPEED_CAP = 8
 # Points awarded for destroying different sizes (bigger blocks more points)
 CODE_BLOCK_SCORES = {
     'large': 20,
@@ -50,16 +77,42 @@ CODE_BLOCK_SIZES = {
     'small': {'base_size': 15, 'text_length': 8, 'split': 0, 'collision_mult': 1.0}, # Doesn't split, text is shorter
 }
 
+# Outlined CodeBlock text surfaces kept in the LRU, keyed by (segment, font size)
+CODE_BLOCK_SURFACE_CACHE_SIZE = 256
+
 # Particle Constants
 PARTICLE_LIFESPAN = 800 # milliseconds
 PARTICLE_SPEED_MIN = 1
 PARTICLE_SPEED_MAX = 5
 PARTICLE_COUNT_MULTIPLIER = 1.5 # How many particles per character
+PARTICLE_MAX_PER_BLOCK = 50 # Cap per explosion so one block can't flood the screen
+PARTICLE_DRAG = 0.98 # Velocity multiplier applied every frame
+PARTICLE_FONT_SIZE = 12
+PARTICLE_CAPACITY = 32768 # Preallocated particle slots
+PARTICLE_DIRTY_CELL_SIZE = 32 # Particles are reported as dirty per grid cell this size, not one by one
+
+# Collision broadphase grid cell size (pixels)
+COLLISION_CELL_SIZE = 100
 
 # Game State Constants
 WAIT_FOR_LEVEL_START = 3000 # milliseconds to wait before level starts or after death
 GAME_OVER_WAIT = 5000 # milliseconds to show game over before allowing restart/quit
 
+# Replays
+REPLAY_MAGIC = b'ASTR'
+REPLAY_VERSION = 2
+REPLAY_HEADER = struct.Struct('<4sHqI') # Magic, version, seed, tick count; zlib'd input bytes follow
+REPLAY_HEADER_V1 = struct.Struct('<4sHQI') # Version 1 stored the seed unsigned
+REPLAY_CHECKPOINT_TICKS = TICK_RATE * 10 # Seeking re-simulates at most this many ticks
+REPLAY_SEEK_SECONDS = 5 # Left/Right arrow jump during playback
+
+# Rewind
+SNAPSHOT_SECONDS = 30 # History kept by SnapshotBuffer, one snapshot per tick
+SNAPSHOT_KEYFRAME_TICKS = TICK_RATE # A full snapshot this often; the ticks between are deltas against it
+SNAPSHOT_COMPRESSION = 1 # zlib level for the deltas
+REWIND_SECONDS = 3 # Backspace jump back
+FRAME_PHASES = ('events', 'seek', 'update', 'collision', 'snapshot', 'draw', 'hud', 'flip') # profiler.PHASES plus replay seeks and snapshots
+
 
 # --- Python Code Snippets ---
 # Each element in this list is a block of code we can sample from
@@ -78,6 +131,51 @@ PYTHON_CODE_SNIPPETS = [
     # Add more snippets for variety!
 ]
 
+
+class SnippetPool:
+    """
+    The code snippets flattened to single lines once at startup.
+
+    CodeBlocks slice their text out of these, so spawning a block doesn't
+    re-strip and re-join a whole snippet.
+    """
+
+    def __init__(self, snippets, text_lengths):
+        # Remove leading/trailing whitespace and join lines for simpler single-line display
+        self.texts = [" ".join(line.strip() for line in snippet.splitlines() if line.strip()) for snippet in snippets]
+        # Number of valid segment start offsets for each (snippet, text length)
+        self._start_counts = {
+            (index, length): len(text) - min(length, len(text)) + 1
+            for index, text in enumerate(self.texts)
+            for length in text_lengths
+        }
+
+    def choose(self, text_length, rng=random):
+        """Selects a random snippet and a segment of text from it."""
+        index = rng.randrange(len(self.texts))
+        clean_snippet = self.texts[index]
+
+        if not clean_snippet: # Handle empty snippets if any exist
+            return "pass"
+
+        # Ensure text length doesn't exceed the snippet length
+        text_len = min(text_length, len(clean_snippet))
+
+        if text_len <= 0:
+             return clean_snippet # Just show whatever is there or handle empty
+
+        start_count = self._start_counts.get((index, text_length))
+        if start_count is None:
+            start_count = len(clean_snippet) - text_len + 1
+        start_index = rng.randrange(start_count)
+        return clean_snippet[start_index : start_index + text_len]
+
+def make_snippet_pool():
+    """A SnippetPool of PYTHON_CODE_SNIPPETS for every CODE_BLOCK_SIZES text length."""
+    return SnippetPool(PYTHON_CODE_SNIPPETS, [size['text_length'] for size in CODE_BLOCK_SIZES.values()])
+
+SNIPPET_POOL = make_snippet_pool()
+
 # --- Helper Functions ---
 
 def wrap_position(position, width, height):
@@ -95,53 +193,168 @@ def rotate_point(point, angle_degrees):
     rotation_angle_ccw = angle_degrees + 90
     return point.rotate(rotation_angle_ccw)
 
+class RotationTable:
+    """
+    A polygon's points rotated (by rotate_point) to each angle, computed once per angle.
+
+    The ship only ever turns in PLAYER_ROTATION_SPEED steps, so every angle
+    it can face is tabled up front and drawing is a lookup plus a translate.
+    Any other angle is worked out on first use and kept; angles are never
+    interpolated.
+    """
+
+    def __init__(self, base_points, step=PLAYER_ROTATION_SPEED):
+        self.base_points = [pygame.math.Vector2(point) for point in base_points]
+        self._offsets = {}
+        if 360 % step == 0:
+            for angle in range(0, 360, step):
+                self._rotate(angle)
+
+    def _rotate(self, angle):
+        offsets = tuple((point.x, point.y) for point in (rotate_point(base, angle) for base in self.base_points))
+        self._offsets[angle] = offsets
+        return offsets
+
+    def points(self, angle, x, y):
+        """The points rotated to angle (degrees) and moved to (x, y)."""
+        angle %= 360
+        offsets = self._offsets.get(angle)
+        if offsets is None:
+            offsets = self._rotate(angle)
+        return [(x + dx, y + dy) for dx, dy in offsets]
+
 def draw_text(screen, text, size, color, x, y, antialias=True):
-    """Helper function to draw text on the screen."""
-    font = pygame.font.Font(None, size) # Use default font
-    text_surface = font.render(text, antialias, color)
+    """Helper function to draw text on the screen. Returns the rect drawn."""
+    text_surface = text_cache.render_text(text, size, color, antialias=antialias) # Default font, cached
     text_rect = text_surface.get_rect()
     text_rect.topleft = (x, y)
-    screen.blit(text_surface, text_rect)
+    return screen.blit(text_surface, text_rect)
+
+def sprite_radius(sprite):
+    """The radius pygame.sprite.collide_circle would use for a sprite."""
+    if hasattr(sprite, 'radius'):
+        return sprite.radius
+    return 0.5 * math.hypot(sprite.rect.width, sprite.rect.height)
+
+def collide_circle_wrapped(left, right, spatial_hash):
+    """Like pygame.sprite.collide_circle, but measures the short way around the screen."""
+    dx, dy = spatial_hash.delta(left.rect.centerx, left.rect.centery, right.rect.centerx, right.rect.centery)
+    return dx * dx + dy * dy <= (sprite_radius(left) + sprite_radius(right)) ** 2
+
+def build_collision_hash(spatial_hash, sprites):
+    """Rebuilds the broadphase grid from a group's current positions."""
+    spatial_hash.clear()
+    for sprite in sprites:
+        spatial_hash.insert_circle(sprite, sprite.rect.centerx, sprite.rect.centery, sprite_radius(sprite))
+
+def spritecollide_wrapped(sprite, spatial_hash, dokill=False):
+    """spritecollide() against the sprites in spatial_hash, wrap-aware."""
+    hits = [
+        other for other in spatial_hash.query_circle(sprite.rect.centerx, sprite.rect.centery, sprite_radius(sprite))
+        if other.alive() and collide_circle_wrapped(sprite, other, spatial_hash) # Skip sprites killed earlier this tick
+    ]
+    if dokill:
+        for other in hits:
+            other.kill()
+    return hits
+
+def groupcollide_wrapped(group, spatial_hash, dokill_group, dokill_hashed):
+    """groupcollide(group, <hashed group>, ...) using the spatial hash broadphase."""
+    collisions = {}
+    for sprite in group.sprites():
+        hits = spritecollide_wrapped(sprite, spatial_hash, dokill_hashed)
+        if hits:
+            collisions[sprite] = hits
+            if dokill_group:
+                sprite.kill()
+    return collisions
+
+def interpolated_center(sprite, alpha):
+    """Where to draw a wrapping sprite, between its previous and current tick positions."""
+    x = lerp_wrapped(sprite.previous_position.x, sprite.position.x, alpha, sprite.screen_width)
+    y = lerp_wrapped(sprite.previous_position.y, sprite.position.y, alpha, sprite.screen_height)
+    return x, y
+
+def draw_interpolated(screen, sprites, alpha, doreturn=False):
+    """Like Group.draw(), but at interpolated positions. With doreturn, returns the rects drawn."""
+    return screen.blits([(sprite.image, sprite.image.get_rect(center=interpolated_center(sprite, alpha))) for sprite in sprites], doreturn=doreturn)
+
+# Life icon: a small upright ship, scaled down once here rather than every frame
+LIFE_ICON_SCALE = 0.7
+LIFE_ICON_POINTS = tuple(
+    (x * LIFE_ICON_SCALE, y * LIFE_ICON_SCALE)
+    for x, y in ((0, -PLAYER_SIZE), (-PLAYER_SIZE * 0.7, PLAYER_SIZE * 0.7), (PLAYER_SIZE * 0.7, PLAYER_SIZE * 0.7))
+)
+LIFE_ICON_SPACING = PLAYER_SIZE * LIFE_ICON_SCALE * 2 + 5 # Icon width plus a gap
 
 def draw_player_lives(screen, lives, x, y):
     """Draws small player icons for remaining lives."""
-    life_ship_points = [
-         pygame.math.Vector2(0, -PLAYER_SIZE),
-         pygame.math.Vector2(-PLAYER_SIZE * 0.7, PLAYER_SIZE * 0.7),
-         pygame.math.Vector2(PLAYER_SIZE * 0.7, PLAYER_SIZE * 0.7)
-    ]
-    scale = 0.7 # Scale down the life icon
-    scaled_points = [p * scale for p in life_ship_points]
-
     for i in range(lives):
         # Calculate position for each icon
-        icon_x = x + i * (PLAYER_SIZE * scale * 2 + 5) # Position side-by-side with spacing
+        icon_x = x + i * LIFE_ICON_SPACING # Position side-by-side with spacing
         icon_y = y
-        # Translate scaled points to the icon's position
-        translated_points = [(icon_x + p.x, icon_y + p.y) for p in scaled_points]
+        # Translate the icon's points to its position
+        translated_points = [(icon_x + dx, icon_y + dy) for dx, dy in LIFE_ICON_POINTS]
         pygame.draw.polygon(screen, WHITE, translated_points, 1) # Draw outline
 
+LIVES_X = WIDTH - (LIFE_ICON_SPACING * PLAYER_START_LIVES - 5 + 10) # Position lives near top right
+LIVES_Y = 10
+
+class LivesWidget(hud.Widget):
+    """The row of life icons as a HUD widget, drawn again only when a life is lost or gained."""
+
+    def __init__(self, value, x, y):
+        # Draw on a surface whose corner is a whole pixel, so the icons land exactly where they would on screen
+        left = min(dx for dx, dy in LIFE_ICON_POINTS)
+        top = min(dy for dx, dy in LIFE_ICON_POINTS)
+        self.origin = (max(math.floor(x + left) - 1, 0), max(math.floor(y + top) - 1, 0)) # Clipped at the screen edge, as on screen
+        self.icon_x = x - self.origin[0]
+        self.icon_y = y - self.origin[1]
+        super().__init__(value, topleft=self.origin)
+
+    def render(self, lives):
+        right = max(dx for dx, dy in LIFE_ICON_POINTS)
+        bottom = max(dy for dx, dy in LIFE_ICON_POINTS)
+        width = math.ceil(self.icon_x + (lives - 1) * LIFE_ICON_SPACING + right) + 2 if lives > 0 else 0
+        width = min(width, WIDTH - self.origin[0])
+        surface = pygame.Surface((width, math.ceil(self.icon_y + bottom) + 2), pygame.SRCALPHA)
+        draw_player_lives(surface, lives, self.icon_x, self.icon_y)
+        return surface
+
 
 # --- Classes ---
 
 # Moved Bullet class definition BEFORE Player class definition
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, position, velocity, screen_width, screen_height):
+class Bullet(PooledSprite):
+    """A bullet; killed bullets go back to Bullet.pool and are handed out again by shoot()."""
+    shared_image = None # One image for every bullet, drawn on first use
+
+    def __init__(self, position, velocity, screen_width, screen_height, spawn_time):
         super().__init__()
-        self.screen_width = screen_width
-        self.screen_height = screen_height
         self.radius = BULLET_RADIUS
 
-        self.image = pygame.Surface((self.radius * 2, self.radius * 2), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, WHITE, (self.radius, self.radius), self.radius)
-
-        self.rect = self.image.get_rect(center=position)
-        self.position = pygame.math.Vector2(self.rect.center)
-        self.velocity = pygame.math.Vector2(velocity)
+        if Bullet.shared_image is None:
+            Bullet.shared_image = pygame.Surface((self.radius * 2, self.radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(Bullet.shared_image, WHITE, (self.radius, self.radius), self.radius)
+        self.image = Bullet.shared_image
 
-        self.spawn_time = pygame.time.get_ticks()
+        self.rect = self.image.get_rect()
+        self.position = pygame.math.Vector2()
+        self.previous_position = pygame.math.Vector2() # For render interpolation
+        self.velocity = pygame.math.Vector2()
+        self.reset(position, velocity, screen_width, screen_height, spawn_time)
 
-    def update(self):
+    def reset(self, position, velocity, screen_width, screen_height, spawn_time):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.rect.center = position
+        self.position.update(self.rect.center)
+        self.previous_position.update(self.position)
+        self.velocity.update(velocity)
+        self.spawn_time = spawn_time
+
+    def update(self, now):
+        self.previous_position.update(self.position)
         self.position += self.velocity
         self.rect.center = (int(self.position.x), int(self.position.y))
 
@@ -152,11 +365,31 @@ class Bullet(pygame.sprite.Sprite):
         )
 
         # Remove bullet after lifespan
-        if pygame.time.get_ticks() - self.spawn_time > BULLET_LIFESPAN:
+        if now - self.spawn_time > BULLET_LIFESPAN:
             self.kill()
 
+    def save_state(self):
+        return (tuple(self.position), tuple(self.previous_position), tuple(self.velocity), self.spawn_time, self.rect.center)
+
+    @classmethod
+    def from_state(cls, state, screen_width, screen_height):
+        """A bullet (from the pool) in the state save_state() returned."""
+        position, previous_position, velocity, spawn_time, center = state
+        bullet = cls.pool.acquire(position, velocity, screen_width, screen_height, spawn_time)
+        bullet.position.update(position)
+        bullet.previous_position.update(previous_position)
+        bullet.rect.center = center
+        return bullet
+
+
+Bullet.pool = SpritePool('asteroid.Bullet', Bullet)
+
 
 class Player(pygame.sprite.Sprite):
+    # Ship and flame outlines at every angle, shared by every Player and built on first use
+    ship_rotations = None
+    flame_rotations = None
+
     def __init__(self, screen_width, screen_height):
         super().__init__()
         self.screen_width = screen_width
@@ -176,7 +409,12 @@ class Player(pygame.sprite.Sprite):
             pygame.math.Vector2(PLAYER_SIZE * 0.8, PLAYER_SIZE * 1.5)  # Right base near ship corner
         ]
 
+        if Player.ship_rotations is None:
+            Player.ship_rotations = RotationTable(self._base_ship_points)
+            Player.flame_rotations = RotationTable(self._base_flame_points)
+
         self.position = pygame.math.Vector2(screen_width // 2, screen_height // 2)
+        self.previous_position = pygame.math.Vector2(self.position) # For render interpolation
         self.velocity = pygame.math.Vector2(0, 0)
         self.angle = -90 # Pointing upwards initially (-90 degrees from positive x)
 
@@ -197,24 +435,48 @@ class Player(pygame.sprite.Sprite):
         self._last_blink_time = 0
         self._blink_interval = 100 # milliseconds
 
-    def activate_invincibility(self):
+    def activate_invincibility(self, now):
         """Starts the invincibility timer and visual effect."""
         self.is_invincible = True
-        self.invincibility_start_time = pygame.time.get_ticks()
+        self.invincibility_start_time = now
         self.visible = True # Make sure player is visible initially
         self._blink_toggle = True # Ensure we start blinking
 
-    def get_transformed_points(self, base_points):
+    def respawn(self):
+        """Puts the ship back in the middle of the screen, at rest."""
+        self.position = pygame.math.Vector2(self.screen_width // 2, self.screen_height // 2)
+        self.previous_position = pygame.math.Vector2(self.position) # Don't interpolate across the jump
+        self.velocity = pygame.math.Vector2(0, 0)
+
+    def save_state(self):
+        return (
+            tuple(self.position), tuple(self.previous_position), tuple(self.velocity), self.angle,
+            self.thrusting, self.rotating_left, self.rotating_right, self.visible, self.rect.center,
+            self.is_invincible, self.invincibility_start_time, self._blink_toggle, self._last_blink_time,
+        )
+
+    def load_state(self, state):
+        (position, previous_position, velocity, self.angle,
+         self.thrusting, self.rotating_left, self.rotating_right, self.visible, self.rect.center,
+         self.is_invincible, self.invincibility_start_time, self._blink_toggle, self._last_blink_time) = state
+        self.position = pygame.math.Vector2(position)
+        self.previous_position = pygame.math.Vector2(previous_position)
+        self.velocity = pygame.math.Vector2(velocity)
+
+    def get_transformed_points(self, base_points, position=None):
         """Rotates and translates base points to current world coordinates."""
+        if position is None:
+            position = self.position
         transformed_points = []
         for point in base_points:
             rotated_point = rotate_point(point, self.angle)
-            translated_point = rotated_point + self.position
+            translated_point = rotated_point + position
             transformed_points.append(translated_point)
         return transformed_points
 
-    def update(self):
+    def update(self, now):
         # Only update if visible (or not in game over state)
+        self.previous_position.update(self.position)
         if self.visible: # We might make player invisible during waiting periods
             # Handle rotation
             if self.rotating_left:
@@ -253,29 +515,29 @@ class Player(pygame.sprite.Sprite):
 
             # Handle invincibility timer
             if self.is_invincible:
-                if pygame.time.get_ticks() - self.invincibility_start_time > PLAYER_INVINCIBILITY_DURATION:
+                if now - self.invincibility_start_time > PLAYER_INVINCIBILITY_DURATION:
                     self.is_invincible = False
                     self.visible = True # Ensure visible after invincibility
                 else:
                     # Blink effect during invincibility
-                    if pygame.time.get_ticks() - self._last_blink_time > self._blink_interval:
+                    if now - self._last_blink_time > self._blink_interval:
                         self._blink_toggle = not self._blink_toggle
-                        self._last_blink_time = pygame.time.get_ticks()
+                        self._last_blink_time = now
 
 
-    def draw(self, screen):
-        """Draws the player spaceship and the flame if thrusting."""
+    def draw(self, screen, alpha=1.0):
+        """Draws the player spaceship and the flame if thrusting. Returns the rects drawn."""
+        rects = []
         if self.visible and (not self.is_invincible or self._blink_toggle): # Only draw if visible AND (not invincible OR blinking)
-            ship_points_world = self.get_transformed_points(self._base_ship_points)
-            ship_points_tuple = [(p.x, p.y) for p in ship_points_world]
-            pygame.draw.polygon(screen, WHITE, ship_points_tuple, 2) # Draw outline with thickness 2
+            # Rotated outlines come from the tables; only the translation is per frame
+            x, y = interpolated_center(self, alpha)
+            rects.append(pygame.draw.polygon(screen, WHITE, Player.ship_rotations.points(self.angle, x, y), 2)) # Draw outline with thickness 2
 
             if self.thrusting:
-                flame_points_world = self.get_transformed_points(self._base_flame_points)
-                flame_points_tuple = [(p.x, p.y) for p in flame_points_world]
-                pygame.draw.polygon(screen, ORANGE, flame_points_tuple) # Draw filled flame
+                rects.append(pygame.draw.polygon(screen, ORANGE, Player.flame_rotations.points(self.angle, x, y))) # Draw filled flame
+        return rects
 
-    def shoot(self):
+    def shoot(self, now):
         """Creates a bullet fired from the player's position and direction."""
         if not self.visible: # Cannot shoot if player is not visible/active
             return None
@@ -289,12 +551,15 @@ class Player(pygame.sprite.Sprite):
         nose_pos = ship_points_world[0] # Assuming the first point is the nose
 
         bullet_velocity = direction * BULLET_SPEED
-        # The Bullet class is now defined above this, so this line works
-        return Bullet(nose_pos, bullet_velocity, self.screen_width, self.screen_height)
+        # Recycles a spent bullet if there is one
+        return Bullet.pool.acquire(nose_pos, bullet_velocity, self.screen_width, self.screen_height, now)
 
 
 class CodeBlock(pygame.sprite.Sprite):
-    def __init__(self, position, velocity, size_key, screen_width, screen_height, font_size_multiplier=1.0):
+    # Rendered surfaces are shared by every block showing the same text at the same size
+    surface_cache = text_cache.LRUCache(CODE_BLOCK_SURFACE_CACHE_SIZE)
+
+    def __init__(self, position, velocity, size_key, screen_width, screen_height, font_size_multiplier=1.0, rng=random, text_segment=None):
         super().__init__()
         self.screen_width = screen_width
         self.screen_height = screen_height
@@ -307,40 +572,32 @@ class CodeBlock(pygame.sprite.Sprite):
         self.collision_radius = self.base_size * 1.5 # Estimate collision radius based on text size
 
         self.position = pygame.math.Vector2(position)
+        self.previous_position = pygame.math.Vector2(self.position) # For render interpolation
         self.velocity = pygame.math.Vector2(velocity)
 
+        self.font_size_multiplier = font_size_multiplier
         self.font_size = int(self.base_size * font_size_multiplier)
-        self.font = pygame.font.Font(None, self.font_size) # Font specific to this block size
+        self.font = text_cache.get_font(self.font_size) # Shared by every block of this size
 
-        self.text_segment = self.choose_text_segment()
-        self.image = self.render_text_surface()
+        # A given text_segment (when restoring a saved state) doesn't draw from rng
+        self.text_segment = text_segment if text_segment is not None else self.choose_text_segment(rng)
+        self.image = self.get_text_surface()
         # Update rect center based on position, width/height come from rendered image
         self.rect = self.image.get_rect(center=(int(self.position.x), int(self.position.y)))
 
 
-    def choose_text_segment(self):
+    def choose_text_segment(self, rng=random):
         """Selects a random snippet and a segment of text from it."""
-        snippet = random.choice(PYTHON_CODE_SNIPPETS)
-        # Remove leading/trailing whitespace and potentially split into lines
-        lines = [line.strip() for line in snippet.splitlines() if line.strip()]
-        clean_snippet = " ".join(lines) # Join lines for simpler single-line display for now
-
-        if not clean_snippet: # Handle empty snippets if any exist
-            return "pass"
-
-        # Ensure text length doesn't exceed the snippet length
-        text_len = min(self.text_length, len(clean_snippet))
-
-        if text_len <= 0:
-             return clean_snippet # Just show whatever is there or handle empty
+        return SNIPPET_POOL.choose(self.text_length, rng)
 
-        # Choose a random starting index
-        # Make sure the end index doesn't go past the end of the string
-        max_start_index = len(clean_snippet) - text_len
-        start_index = random.randrange(0, max_start_index + 1) if max_start_index >= 0 else 0
-
-
-        return clean_snippet[start_index : start_index + text_len]
+    def get_text_surface(self):
+        """Returns the outlined text surface, rendering it only if it isn't cached."""
+        key = (self.text_segment, self.font_size)
+        surface = CodeBlock.surface_cache.get(key)
+        if surface is None:
+            surface = self.render_text_surface()
+            CodeBlock.surface_cache.put(key, surface)
+        return surface
 
     def render_text_surface(self):
         """Renders the text segment onto a surface."""
@@ -371,8 +628,9 @@ class CodeBlock(pygame.sprite.Sprite):
              return fallback_surf
 
 
-    def update(self):
+    def update(self, now):
         # Update position based on velocity
+        self.previous_position.update(self.position)
         self.position += self.velocity
 
         # Wrap around screen edges
@@ -396,58 +654,208 @@ class CodeBlock(pygame.sprite.Sprite):
         """Returns the score awarded for destroying this code block."""
         return CODE_BLOCK_SCORES.get(self.size_key, 0)
 
+    def save_state(self):
+        return (
+            tuple(self.position), tuple(self.previous_position), tuple(self.velocity),
+            self.size_key, self.font_size_multiplier, self.text_segment, self.rect.center,
+        )
 
-class Particle(pygame.sprite.Sprite):
-    def __init__(self, position, velocity, text, color, lifespan):
-        super().__init__()
-        self.position = pygame.math.Vector2(position)
-        self.velocity = pygame.math.Vector2(velocity)
-        self.text = text
-        self.color = color
-        self.lifespan = lifespan
-        self.spawn_time = pygame.time.get_ticks()
-
-        # Particles are drawn directly, no .image/.rect needed for rendering,
-        # but Pygame sprite groups need a dummy image/rect for basic handling.
-        # We'll draw the text manually in the main loop's drawing section for this group.
-        # The rect is only used for position, size is irrelevant for drawing here
-        self.image = pygame.Surface((1, 1), pygame.SRCALPHA)
-        self.rect = self.image.get_rect(center=self.position)
+    @classmethod
+    def from_state(cls, state, screen_width, screen_height):
+        """A code block in the state save_state() returned."""
+        position, previous_position, velocity, size_key, font_size_multiplier, text_segment, center = state
+        block = cls(position, velocity, size_key, screen_width, screen_height, font_size_multiplier, text_segment=text_segment)
+        block.previous_position.update(previous_position)
+        block.rect.center = center
+        return block
 
 
-    def update(self):
-        self.position += self.velocity
-        # Apply a little drag
-        self.velocity *= 0.98
+class ParticleSystem:
+    """
+    Text particles stored as a struct of preallocated NumPy arrays.
 
-        # Apply a little gravity (optional, adds downward drift)
-        # self.velocity.y += 0.1
+    Every particle lives in a slot of the arrays below. Free slots are kept on
+    a stack so spawning and expiring never allocate, and the per-frame work
+    (movement, drag, expiry) is a handful of vectorised operations. Only slots
+    below the high-water mark are touched each frame.
+    """
 
-        self.rect.center = (int(self.position.x), int(self.position.y)) # Keep rect updated for group management
+    def __init__(self, capacity=PARTICLE_CAPACITY, lifespan=PARTICLE_LIFESPAN, font_size=PARTICLE_FONT_SIZE, palette=(YELLOW,), seed=None):
+        self.capacity = capacity
+        self.lifespan = lifespan
+        self.font_size = font_size
+        self.palette = [tuple(color) for color in palette]
+        self.rng = np.random.default_rng(seed)
+
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.previous_position = np.zeros((capacity, 2), dtype=np.float32) # For render interpolation
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.char_index = np.zeros(capacity, dtype=np.int16) # Index into the glyph atlas
+        self.color_index = np.zeros(capacity, dtype=np.uint8) # Index into self.palette
+        self.birth_time = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        # Free list: a stack of slot indices, lowest slots on top
+        self._free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self._free_count = capacity
+        self._high_water = 0 # One past the highest slot handed out
+        self._peak = 0 # One past the highest slot ever handed out; everything above is still zero
+
+        # Atlas surface and glyph rect per (color, char), built on first draw
+        self._glyph_surfaces = None
+        self._glyph_rects = None
+
+    def __len__(self):
+        return self.capacity - self._free_count
+
+    def clear(self):
+        """Returns every slot to the free list."""
+        self.alive[:] = False
+        self._free = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self._free_count = self.capacity
+        self._high_water = 0
+
+    def emit(self, position, text, count, now, spread=0.0, color_index=0):
+        """Spawns count particles cycling through the characters of text."""
+        count = min(count, self._free_count) # Drop what doesn't fit in the pool
+        if count <= 0:
+            return
+
+        # Pop slots off the free stack
+        top = self._free_count
+        slots = self._free[top - count:top][::-1].copy()
+        self._free_count -= count
+        self._high_water = max(self._high_water, int(slots.max()) + 1)
+        self._peak = max(self._peak, self._high_water)
+
+        # Random velocity spreading out from the position
+        angles = np.radians(self.rng.uniform(0, 360, count))
+        speeds = self.rng.uniform(PARTICLE_SPEED_MIN, PARTICLE_SPEED_MAX, count)
+        self.velocity[slots, 0] = np.cos(angles) * speeds
+        self.velocity[slots, 1] = np.sin(angles) * speeds
+
+        # Slight random offset from the center for the spawn point
+        offsets = self.rng.uniform(-spread, spread, (count, 2)) if spread else 0.0
+        self.position[slots] = np.asarray(position, dtype=np.float32) + offsets
+        self.previous_position[slots] = self.position[slots]
+
+        # Cycle through the characters (a space if the text is empty)
+        chars = [text_cache.glyph_index(char) for char in (text or " ")]
+        self.char_index[slots] = np.resize(np.array(chars, dtype=np.int16), count)
+        self.color_index[slots] = color_index
+        self.birth_time[slots] = now
+        self.alive[slots] = True
+
+    def update(self, now):
+        """Moves every particle, applies drag and frees the expired ones."""
+        n = self._high_water
+        if n == 0:
+            return
+        # Dead slots are moved too; it's cheaper than masking and they're never drawn
+        self.previous_position[:n] = self.position[:n]
+        self.position[:n] += self.velocity[:n]
+        self.velocity[:n] *= PARTICLE_DRAG
+
+        expired = np.flatnonzero(self.alive[:n] & (now - self.birth_time[:n] > self.lifespan))
+        if len(expired):
+            self.alive[expired] = False
+            top = self._free_count
+            self._free[top:top + len(expired)] = expired[::-1]
+            self._free_count += len(expired)
+
+        if self._free_count == self.capacity:
+            self.clear() # Everything expired, reset the free list ordering
+
+    def _arrays(self):
+        return (self.position, self.previous_position, self.velocity, self.char_index, self.color_index, self.birth_time, self.alive)
+
+    def save_state(self):
+        """
+        A copy of the slots below the high-water mark, plus the free list and RNG.
+
+        Slots at or above it hold nothing alive and still sit untouched at the
+        bottom of the free stack, so neither needs saving; load_state() zeroes
+        them. Once a burst has expired this is empty, however big it was.
+        """
+        n = self._high_water
+        return (
+            n, tuple(array[:n].copy() for array in self._arrays()),
+            self._free[self.capacity - n:self._free_count].copy(), self._free_count, self._high_water,
+            self.rng.bit_generator.state,
+        )
 
-        # Check lifespan
-        if pygame.time.get_ticks() - self.spawn_time > self.lifespan:
-            self.kill() # Remove from all groups
+    def digest_bytes(self):
+        """Which slots are alive and where, below the high-water mark; dead slots above it can hold anything."""
+        n = self._high_water
+        return self.alive[:n].tobytes() + self.position[:n].tobytes()
+
+    def load_state(self, state):
+        n, arrays, free, self._free_count, self._high_water, self.rng.bit_generator.state = state
+        for array, saved in zip(self._arrays(), arrays):
+            array[:n] = saved
+            array[n:self._peak] = 0
+        self._free[:self.capacity - n] = np.arange(self.capacity - 1, n - 1, -1, dtype=np.int32)
+        self._free[self.capacity - n:self._free_count] = free
+        self._peak = n
+
+    def draw(self, screen, alpha=1.0, doreturn=False):
+        """
+        Draws every live particle with a single Surface.blits() call. With
+        doreturn, returns rects covering them: one per PARTICLE_DIRTY_CELL_SIZE
+        cell with particles in it, as a burst would otherwise be hundreds.
+        """
+        n = self._high_water
+        if n == 0:
+            return [] if doreturn else None
+        if self._glyph_surfaces is None:
+            self._glyph_surfaces, self._glyph_rects = [], []
+            for color in self.palette:
+                atlas = text_cache.get_glyph_atlas(self.font_size, color, antialias=False) # No antialiasing for retro look
+                self._glyph_surfaces.extend([atlas.surface] * len(atlas.rects))
+                self._glyph_rects.extend(atlas.rects)
+            self._glyph_size = (max(rect.width for rect in self._glyph_rects), max(rect.height for rect in self._glyph_rects))
+
+        live = np.flatnonzero(self.alive[:n])
+        keys = (self.color_index[live].astype(np.int32) * text_cache.ATLAS_GLYPH_COUNT + self.char_index[live]).tolist()
+        xy = self.position[live]
+        if alpha < 1.0:
+            previous = self.previous_position[live]
+            xy = previous + (xy - previous) * alpha
+        xy = xy.astype(np.int32)
+        # zip/map keep the per-particle work in C; blits() consumes the iterator directly
+        positions = zip(xy[:, 0].tolist(), xy[:, 1].tolist())
+        screen.blits(zip(map(self._glyph_surfaces.__getitem__, keys), positions, map(self._glyph_rects.__getitem__, keys)), doreturn=False)
+        if doreturn:
+            # A glyph drawn anywhere in a cell stays inside the cell grown by one glyph
+            cell = PARTICLE_DIRTY_CELL_SIZE
+            width, height = cell + self._glyph_size[0], cell + self._glyph_size[1]
+            cells = np.ascontiguousarray(xy // cell) # int32 pairs, deduplicated as one int64 each
+            cells = np.unique(cells.view(np.int64)).view(np.int32).reshape(-1, 2)
+            return [pygame.Rect(x * cell, y * cell, width, height) for x, y in cells.tolist()]
 
 
 # --- Game Functions ---
 
-def create_initial_code_blocks_for_level(level, screen_width, screen_height, player_pos):
+def create_initial_code_blocks_for_level(level, screen_width, screen_height, player_pos, rng=random):
     """Creates code blocks for a given level, avoiding the player."""
-    code_blocks = []
+    return list(generate_code_blocks_for_level(level, screen_width, screen_height, player_pos, rng))
+
+
+def generate_code_blocks_for_level(level, screen_width, screen_height, player_pos, rng=random):
+    """Yields a level's code blocks one at a time, so creating them can be spread over several ticks."""
     # Simple scaling: Add more large blocks each level
-    count = CODE_BLOCK_START_COUNT + (level - 1) * 2
-    count = min(count, 15) # Cap the max number of initial blocks
+    count = CODE_BLOCK_START_COUNT + (level - 1) * CODE_BLOCK_COUNT_PER_LEVEL
+    count = min(count, CODE_BLOCK_MAX_COUNT) # Cap the max number of initial blocks
 
     # Potentially increase max speed slightly for higher levels
-    current_max_speed = CODE_BLOCK_SPEED_MAX + (level - 1) * 0.5
-    current_max_speed = min(current_max_speed, 8) # Cap maximum speed
+    current_max_speed = CODE_BLOCK_SPEED_MAX + (level - 1) * CODE_BLOCK_SPEED_PER_LEVEL
+    current_max_speed = min(current_max_speed, CODE_BLOCK_SPEED_CAP) # Cap maximum speed
 
     for _ in range(count):
         while True:
             pos = pygame.math.Vector2(
-                random.randrange(screen_width),
-                random.randrange(screen_height)
+                rng.randrange(screen_width),
+                rng.randrange(screen_height)
             )
             # Ensure it's a safe distance from the player spawn point
             safe_distance = max(screen_width, screen_height) / 3 - (level - 1) * 10
@@ -455,311 +863,877 @@ def create_initial_code_blocks_for_level(level, screen_width, screen_height, pla
             if (pos - player_pos).length() > safe_distance:
                 break
 
-        angle = random.uniform(0, 360)
-        speed = random.uniform(CODE_BLOCK_SPEED_MIN, current_max_speed)
+        angle = rng.uniform(0, 360)
+        speed = rng.uniform(CODE_BLOCK_SPEED_MIN, current_max_speed)
         vel = pygame.math.Vector2(math.cos(math.radians(angle)), math.sin(math.radians(angle))) * speed
 
-        code_blocks.append(CodeBlock(pos, vel, 'large', screen_width, screen_height))
-    return code_blocks
+        yield CodeBlock(pos, vel, 'large', screen_width, screen_height, rng=rng)
+
+
+# --- Input Sources ---
+# One TickInput is fed to the simulation per tick, whether it comes from the
+# keyboard or from a script, so the game logic never reads pygame events itself.
+TickInput = collections.namedtuple('TickInput', ['rotate_left', 'rotate_right', 'thrust', 'fire'])
+NO_INPUT = TickInput(False, False, False, False)
+
+# Replays store each tick as one byte: a bit per TickInput field, plus RESTART_BIT
+# when the game was restarted (sim.reset()) just before that tick
+RESTART_BIT = 1 << len(TickInput._fields)
+TICK_INPUTS_BY_BITS = [TickInput(*(bool(bits & (1 << i)) for i in range(len(TickInput._fields)))) for bits in range(RESTART_BIT)]
+
+def input_bits(tick_input):
+    return sum(1 << i for i, pressed in enumerate(tick_input) if pressed)
+
+class KeyboardInput:
+    """Turns pygame key events into one TickInput per tick."""
+
+    def __init__(self):
+        self.rotate_left = False
+        self.rotate_right = False
+        self.thrust = False
+        self._fire_pressed = False # Firing happens once per key press, not while held
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
+            pressed = event.type == pygame.KEYDOWN
+            if event.key == pygame.K_LEFT:
+                self.rotate_left = pressed
+            if event.key == pygame.K_RIGHT:
+                self.rotate_right = pressed
+            if event.key == pygame.K_UP:
+                self.thrust = pressed
+            if event.key == pygame.K_SPACE and pressed:
+                self._fire_pressed = True
+
+    def next_input(self, tick):
+        tick_input = TickInput(self.rotate_left, self.rotate_right, self.thrust, self._fire_pressed)
+        self._fire_pressed = False
+        return tick_input
+
+class ScriptedInput:
+    """Plays back a list of (duration_in_ticks, TickInput) steps, looping forever."""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self._cycle_length = sum(duration for duration, _ in steps)
+
+    def next_input(self, tick):
+        position = tick % self._cycle_length
+        for duration, tick_input in self.steps:
+            if position < duration:
+                return tick_input
+            position -= duration
+        return NO_INPUT
+
+class Replay:
+    """A recorded session: the seed plus one byte of input bits per tick."""
+
+    def __init__(self, seed, inputs=b""):
+        self.seed = seed
+        self.inputs = bytearray(inputs)
+        self._restart = False
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def restart(self):
+        """Notes that the game is reset before the next recorded tick."""
+        self._restart = True
+
+    def record(self, tick_input):
+        self.inputs.append(input_bits(tick_input) | (RESTART_BIT if self._restart else 0))
+        self._restart = False
+
+    def truncate(self, ticks):
+        """Forgets everything recorded after the first ticks, e.g. after a rewind."""
+        del self.inputs[ticks:]
+        self._restart = False
+
+    def tick(self, tick):
+        """(restart, TickInput) for one tick."""
+        bits = self.inputs[tick]
+        return bool(bits & RESTART_BIT), TICK_INPUTS_BY_BITS[bits & (RESTART_BIT - 1)]
+
+    def save(self, path):
+        # Packed before the file is opened, so a seed that doesn't fit can't truncate an existing replay
+        header = REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, len(self.inputs))
+        data = zlib.compress(bytes(self.inputs), 9) # Held keys make long runs of the same byte
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, seed, ticks = REPLAY_HEADER.unpack_from(data)
+        if magic == REPLAY_MAGIC and version == 1:
+            magic, version, seed, ticks = REPLAY_HEADER_V1.unpack_from(data)
+        elif magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} asteroid replay")
+        inputs = zlib.decompress(data[REPLAY_HEADER.size:])
+        if len(inputs) != ticks:
+            raise ValueError(f"{path} is truncated ({len(inputs)} of {ticks} ticks)")
+        return cls(seed, inputs)
+
+# Default script for headless runs: spin, thrust and fire in a loop
+DEMO_SCRIPT = [
+    (20, TickInput(True, False, False, False)),
+    (1, TickInput(True, False, False, True)),
+    (15, TickInput(False, False, True, False)),
+    (1, TickInput(False, False, False, True)),
+    (30, TickInput(False, True, False, False)),
+    (1, TickInput(False, True, False, True)),
+    (10, NO_INPUT),
+]
+
 
+class SimClock:
+    """A clock that only moves when told to, for deterministic headless runs."""
 
-def draw_game_over(screen):
-    """Draws a simple game over message."""
-    font = pygame.font.Font(None, 74) # Default font, size 74
-    text = font.render("GAME OVER", True, RED)
-    text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-    screen.blit(text, text_rect)
+    def __init__(self, tick_ms=1000 / TICK_RATE):
+        self.tick_ms = tick_ms
+        self.ticks = 0
 
-    font_small = pygame.font.Font(None, 36)
-    restart_text = font_small.render("Press R to Restart or Q to Quit", True, WHITE)
-    restart_rect = restart_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
-    screen.blit(restart_text, restart_rect)
+    def advance(self, ticks=1):
+        self.ticks += ticks
+
+    def __call__(self):
+        return int(self.ticks * self.tick_ms) # Milliseconds, like pygame.time.get_ticks()
 
 
 # --- Game Loop State Management ---
-def reset_game(screen_width, screen_height, all_sprites, code_blocks, bullets, players, particles):
-    """Resets all game variables and sprites for a new game."""
-    global score, lives, level, game_over, waiting_to_start_level, level_start_time
-
-    score = 0
-    lives = PLAYER_START_LIVES
-    level = 1
-    game_over = False
-    waiting_to_start_level = True # Start by waiting for the first level
-    level_start_time = pygame.time.get_ticks() # Start timer
-
-    # Clear existing sprites from ALL relevant groups
-    # Using empty() removes from the group and calls kill(), which removes from all_sprites
-    all_sprites.empty() # Clear all sprites first for a clean slate
-    code_blocks.empty()
-    bullets.empty()
-    players.empty()
-    particles.empty()
-
-    # Create player (player is created but invisible/invincible initially)
-    player = Player(screen_width, screen_height)
-    all_sprites.add(player)
-    players.add(player)
-
-    # Initial code blocks will be created after the wait period in start_level
-
-    return player # Return the created player instance
-
-def start_level(screen_width, screen_height, level, player, all_sprites, code_blocks, bullets, particles):
-    """Prepares for and starts a new level."""
-    global waiting_to_start_level, level_start_time
-
-    print(f"Starting Level {level}") # Debugging
-
-    waiting_to_start_level = False # Game is no longer waiting
-    level_start_time = 0 # Reset timer
-
-    # Clear old game objects by emptying their specific groups.
-    # Calling empty() on a group also removes the sprites from any other group
-    # they belong to, including all_sprites.
-    code_blocks.empty()
-    bullets.empty()
-    particles.empty()
-    # The player sprite should persist and not be removed here.
-
-    # Respawn player if needed (handled in reset_game or player_hit)
-    # Ensure player is visible and invincible for the start of the level
-    player.position = pygame.math.Vector2(screen_width // 2, screen_height // 2)
-    player.velocity = pygame.math.Vector2(0, 0)
-    player.activate_invincibility() # Grant invincibility at level start
-
-    # Create new code blocks for this level
-    initial_code_blocks = create_initial_code_blocks_for_level(level, screen_width, screen_height, player.position)
-    all_sprites.add(initial_code_blocks)
-    code_blocks.add(initial_code_blocks)
-
-
-def player_hit(player, game_state, all_sprites, code_blocks, bullets, particles):
-    """Handles the player being hit by a code block."""
-    global lives, game_over, waiting_to_start_level, level_start_time
-
-    if player.is_invincible:
-        return # Do nothing if player is invincible
-
-    lives -= 1
-    print(f"Player Hit! Lives remaining: {lives}") # Debugging
-
-    if lives <= 0:
-        game_over = True
-        waiting_to_start_level = True # Use the wait state to show Game Over
-        level_start_time = pygame.time.get_ticks()
-        player.visible = False # Hide player on death
-        # Clear remaining game objects on screen
-        # We need to clear CodeBlocks, Bullets, Particles
-        code_blocks.empty()
-        bullets.empty()
-        particles.empty()
-    else:
-        # Player loses a life but game continues
-        # Clear existing objects
-        code_blocks.empty()
-        bullets.empty()
-        particles.empty()
+class Simulation:
+    """
+    All of the game state and rules, with no window or event handling.
 
-        # Reset player position and grant temporary invincibility
-        player.position = pygame.math.Vector2(game_state['screen_width'] // 2, game_state['screen_height'] // 2)
-        player.velocity = pygame.math.Vector2(0, 0)
-        player.activate_invincibility()
+    Time comes from an injectable clock (any callable returning milliseconds,
+    e.g. pygame.time.get_ticks or a SimClock) and randomness from a seeded
+    random.Random, so a headless run with the same seed, clock and inputs
+    always ends in the same state.
+    """
 
-        waiting_to_start_level = True # Wait before next wave appears
-        level_start_time = pygame.time.get_ticks()
+    def __init__(self, screen_width, screen_height, clock=pygame.time.get_ticks, seed=None, verbose=True, warm_up=True):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.clock = clock
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.verbose = verbose # Print level/death messages
+        self.warm_up = warm_up # Build the next level's blocks during the level-start wait
+        self._next_level = None # (level, block generator, blocks built so far) while warming up
+        self._next_level_rng_state = None # self.rng's state when that generator was made, for load_state()
+
+        # Sprite groups
+        self.all_sprites = pygame.sprite.Group()   # All sprites that need update()
+        self.code_blocks = pygame.sprite.Group() # CodeBlocks (formerly asteroids) for draw() and collision
+        self.bullets = pygame.sprite.Group()       # Bullets for draw() and collision
+        self.players = pygame.sprite.Group()       # Player(s) for collision
+        self.particles = ParticleSystem(PARTICLE_CAPACITY, PARTICLE_LIFESPAN, PARTICLE_FONT_SIZE, seed=self.rng.getrandbits(32)) # Particles for draw() and update()
+        self.block_hash = SpatialHash(COLLISION_CELL_SIZE, screen_width, screen_height) # Collision broadphase for code blocks
+
+        self.ticks = 0
+        self.reset()
+
+    def reset(self):
+        """Resets all game variables and sprites for a new game."""
+        self.score = 0
+        self.lives = PLAYER_START_LIVES
+        self.level = 1
+        self.game_over = False
+        self.waiting_to_start_level = True # Start by waiting for the first level
+        self.level_start_time = self.clock() # Start timer
+        self._next_level = None
+
+        # Clear existing sprites from ALL relevant groups
+        # Using empty() removes from the group and calls kill(), which removes from all_sprites
+        self.all_sprites.empty() # Clear all sprites first for a clean slate
+        self.code_blocks.empty()
+        self.bullets.empty()
+        self.players.empty()
+        self.particles.clear()
+
+        # Create player (player is created but invisible/invincible initially)
+        self.player = Player(self.screen_width, self.screen_height)
+        self.all_sprites.add(self.player)
+        self.players.add(self.player)
+
+        # Initial code blocks will be created after the wait period in start_level
+
+    def start_level(self):
+        """Prepares for and starts a new level."""
+        if self.verbose:
+            print(f"Starting Level {self.level}") # Debugging
+
+        self.waiting_to_start_level = False # Game is no longer waiting
+        self.level_start_time = 0 # Reset timer
+
+        # Clear old game objects by emptying their specific groups.
+        # Calling empty() on a group also removes the sprites from any other group
+        # they belong to, including all_sprites.
+        self.code_blocks.empty()
+        self.bullets.empty()
+        self.particles.clear()
+        # The player sprite should persist and not be removed here.
+
+        # Ensure player is visible and invincible for the start of the level
+        player = self.player
+        player.respawn()
+        player.activate_invincibility(self.clock()) # Grant invincibility at level start
+
+        # Create new code blocks for this level, finishing off any that were warmed up during the wait
+        if self._next_level is not None and self._next_level[0] == self.level:
+            _, remaining_blocks, initial_code_blocks = self._next_level
+            initial_code_blocks.extend(remaining_blocks)
+        else:
+            initial_code_blocks = create_initial_code_blocks_for_level(self.level, self.screen_width, self.screen_height, player.position, self.rng)
+        self._next_level = None
+        self.all_sprites.add(initial_code_blocks)
+        self.code_blocks.add(initial_code_blocks)
+
+    def prepare_next_level(self):
+        """
+        Builds one of the upcoming level's code blocks per call.
+
+        Called every tick of the level-start wait, so the fonts and text
+        surfaces are cached before start_level() needs them. The blocks are
+        drawn from the same RNG in the same order as start_level() would, so
+        results don't depend on whether warm-up is on.
+        """
+        if self._next_level is None or self._next_level[0] != self.level:
+            self._start_next_level(self.level)
+        _, blocks, built = self._next_level
+        block = next(blocks, None)
+        if block is not None:
+            built.append(block)
+
+    def _start_next_level(self, level):
+        # start_level() respawns the player in the middle before placing blocks
+        spawn = pygame.math.Vector2(self.screen_width // 2, self.screen_height // 2)
+        self._next_level_rng_state = self.rng.getstate()
+        blocks = generate_code_blocks_for_level(level, self.screen_width, self.screen_height, spawn, self.rng)
+        self._next_level = (level, blocks, [])
+
+    def player_hit(self):
+        """Handles the player being hit by a code block."""
+        player = self.player
+        if player.is_invincible:
+            return # Do nothing if player is invincible
+
+        self.lives -= 1
+        if self.verbose:
+            print(f"Player Hit! Lives remaining: {self.lives}") # Debugging
 
+        # Clear existing objects
+        self.code_blocks.empty()
+        self.bullets.empty()
+        self.particles.clear()
+
+        if self.lives <= 0:
+            self.game_over = True
+            self.waiting_to_start_level = True # Use the wait state to show Game Over
+            self.level_start_time = self.clock()
+            player.visible = False # Hide player on death
+        else:
+            # Player loses a life but game continues
+            # Reset player position and grant temporary invincibility
+            player.respawn()
+            player.activate_invincibility(self.clock())
+
+            self.waiting_to_start_level = True # Wait before next wave appears
+            self.level_start_time = self.clock()
+
+    def can_restart(self):
+        """True once the game over message has been shown for long enough."""
+        return self.game_over and self.clock() - self.level_start_time > GAME_OVER_WAIT
+
+    def step(self, tick_input, frame_profiler=None):
+        """Advances the game by one tick, marking 'update' and 'collision' on a profiler.FrameProfiler if given."""
+        self.ticks += 1
+        now = self.clock()
 
-# --- Main Game Loop ---
-def main():
+        # Handle waiting state
+        if self.waiting_to_start_level:
+            if not self.game_over and now - self.level_start_time > WAIT_FOR_LEVEL_START:
+                self.start_level()
+            elif not self.game_over and self.warm_up:
+                self.prepare_next_level()
+            # If game_over, we wait until GAME_OVER_WAIT duration is over before allowing restart
+            return
+
+        # Game is in active play
+        self.apply_input(tick_input, now)
+        self.update(now)
+        if frame_profiler:
+            frame_profiler.mark('update')
+        self.check_collisions(now)
+        if frame_profiler:
+            frame_profiler.mark('collision')
+
+        # Check for level completion (all code blocks destroyed)
+        if not self.code_blocks and not self.game_over and not self.waiting_to_start_level:
+            self.level += 1 # Advance level
+            self.waiting_to_start_level = True # Enter wait state before next level
+            self.level_start_time = now
+            self.player.visible = False # Hide player during the wait
+
+    def apply_input(self, tick_input, now):
+        """Player controls, only called during active gameplay."""
+        player = self.player
+        player.rotating_left = tick_input.rotate_left
+        player.rotating_right = tick_input.rotate_right
+        player.thrusting = tick_input.thrust
+        if tick_input.fire:
+            bullet = player.shoot(now)
+            if bullet:
+                self.all_sprites.add(bullet)
+                self.bullets.add(bullet)
+
+    def update(self, now):
+        self.all_sprites.update(now) # Updates player, code blocks and bullets
+        self.particles.update(now)
+
+    def check_collisions(self, now):
+        # Check for collisions: Bullet vs CodeBlock
+        # Code blocks go into the spatial hash, so each bullet is only tested against nearby blocks
+        build_collision_hash(self.block_hash, self.code_blocks)
+        collisions = groupcollide_wrapped(self.bullets, self.block_hash, True, True)
+
+        # Process code block collisions (explode into particles and add score)
+        for bullet, hit_blocks in collisions.items():
+            for block in hit_blocks:
+                self.score += block.get_score() # Add score for destroyed block
+
+                # Create particles from the block's text segment
+                block_text = block.split() # Get the text segment from the destroyed block
+                num_particles = int(len(block_text) * PARTICLE_COUNT_MULTIPLIER)
+                # Ensure at least one particle if there was any text
+                if num_particles == 0 and len(block_text) > 0: num_particles = 1
+                # Cap max particles per explosion
+                num_particles = min(num_particles, PARTICLE_MAX_PER_BLOCK)
+
+                # Particles spread out from the block's position with a slight random offset
+                self.particles.emit(block.position, block_text, num_particles, now, spread=block.collision_radius * 0.5)
+
+        # Check for collisions: Player vs CodeBlock
+        if not self.player.is_invincible and not self.game_over:
+            if spritecollide_wrapped(self.player, self.block_hash):
+                self.player_hit()
+
+    def save_state(self):
+        """A snapshot of the whole game that load_state() can go back to."""
+        next_level = None
+        if self._next_level is not None:
+            level, _, built = self._next_level
+            next_level = (level, self._next_level_rng_state, len(built))
+        return {
+            'ticks': self.ticks,
+            'clock': self.clock.ticks if isinstance(self.clock, SimClock) else None,
+            'score': self.score,
+            'lives': self.lives,
+            'level': self.level,
+            'game_over': self.game_over,
+            'waiting_to_start_level': self.waiting_to_start_level,
+            'level_start_time': self.level_start_time,
+            'rng': self.rng.getstate(),
+            'next_level': next_level,
+            'player': self.player.save_state(),
+            'code_blocks': [block.save_state() for block in self.code_blocks],
+            'bullets': [bullet.save_state() for bullet in self.bullets],
+            'particles': self.particles.save_state(),
+        }
+
+    def load_state(self, state):
+        """Puts the game back exactly as it was when save_state() was called."""
+        self.ticks = state['ticks']
+        if state['clock'] is not None:
+            self.clock.ticks = state['clock']
+        self.score = state['score']
+        self.lives = state['lives']
+        self.level = state['level']
+        self.game_over = state['game_over']
+        self.waiting_to_start_level = state['waiting_to_start_level']
+        self.level_start_time = state['level_start_time']
+
+        # A half-built warm-up generator can't be copied, so rebuild it by
+        # replaying its draws from the RNG state it started with
+        self._next_level = None
+        if state['next_level'] is not None:
+            level, rng_state, built_count = state['next_level']
+            self.rng.setstate(rng_state)
+            self._start_next_level(level)
+            _, blocks, built = self._next_level
+            built.extend(next(blocks) for _ in range(built_count))
+        self.rng.setstate(state['rng'])
+
+        for bullet in list(self.bullets):
+            bullet.kill() # Back to the pool
+        self.all_sprites.empty()
+        self.code_blocks.empty()
+        self.player.load_state(state['player'])
+        self.all_sprites.add(self.player)
+        code_blocks = [CodeBlock.from_state(block, self.screen_width, self.screen_height) for block in state['code_blocks']]
+        self.all_sprites.add(code_blocks)
+        self.code_blocks.add(code_blocks)
+        bullets = [Bullet.from_state(bullet, self.screen_width, self.screen_height) for bullet in state['bullets']]
+        self.all_sprites.add(bullets)
+        self.bullets.add(bullets)
+        self.particles.load_state(state['particles'])
+
+    def state_digest(self):
+        """A hash of the simulation state, for checking that two runs match."""
+        digest = hashlib.sha1()
+        player = self.player
+        digest.update(repr((
+            self.ticks, self.score, self.lives, self.level, self.game_over, self.waiting_to_start_level,
+            player.position.x, player.position.y, player.velocity.x, player.velocity.y, player.angle,
+        )).encode())
+        for block in self.code_blocks:
+            digest.update(repr((block.text_segment, block.position.x, block.position.y)).encode())
+        for bullet in self.bullets:
+            digest.update(repr((bullet.position.x, bullet.position.y, bullet.spawn_time)).encode())
+        digest.update(self.particles.digest_bytes())
+        return digest.hexdigest()
+
+
+def run_headless(ticks, seed=None, input_source=None, restart_on_game_over=True, verbose=False, replay=None):
+    """
+    Steps a Simulation for a number of ticks as fast as the CPU allows.
+
+    Uses SDL's dummy video driver so no window is opened, a SimClock so game
+    time only moves one tick at a time, and a scripted input source. If a
+    Replay is given, every tick's input is recorded into it.
+    Returns (simulation, elapsed_seconds, games_played).
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
     pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Pygame Code Asteroids")
-    clock = pygame.time.Clock()
 
-    # Global game state variables
-    global score, lives, level, game_over, waiting_to_start_level, level_start_time
+    clock = SimClock()
+    sim = Simulation(WIDTH, HEIGHT, clock=clock, seed=seed, verbose=verbose)
+    if input_source is None:
+        input_source = ScriptedInput(DEMO_SCRIPT)
+
+    games_played = 1
+    start = time.perf_counter()
+    for tick in range(ticks):
+        tick_input = input_source.next_input(tick)
+        if replay is not None:
+            replay.record(tick_input)
+        clock.advance()
+        sim.step(tick_input)
+        if restart_on_game_over and sim.can_restart():
+            sim.reset()
+            if replay is not None:
+                replay.restart()
+            games_played += 1
+    elapsed = time.perf_counter() - start
+    return sim, elapsed, games_played
+
+
+class ReplayPlayer:
+    """
+    Steps a Simulation through a Replay, one recorded tick at a time.
+
+    A snapshot is kept every REPLAY_CHECKPOINT_TICKS as playback passes it,
+    so seeking restores the nearest earlier checkpoint and re-simulates the
+    rest instead of starting over from the first tick.
+    """
+
+    def __init__(self, replay, sim):
+        self.replay = replay
+        self.sim = sim
+        self.checkpoints = {sim.ticks: sim.save_state()}
+
+    @property
+    def finished(self):
+        return self.sim.ticks >= len(self.replay)
+
+    def step(self, frame_profiler=None):
+        """Plays one tick; False once the replay has run out."""
+        if self.finished:
+            return False
+        restart, tick_input = self.replay.tick(self.sim.ticks)
+        if restart:
+            self.sim.reset()
+        self.sim.clock.advance()
+        self.sim.step(tick_input, frame_profiler)
+        if self.sim.ticks % REPLAY_CHECKPOINT_TICKS == 0 and self.sim.ticks not in self.checkpoints:
+            self.checkpoints[self.sim.ticks] = self.sim.save_state()
+        return True
+
+    def seek(self, tick):
+        """Jumps to just after the given tick (clamped to the replay)."""
+        tick = max(0, min(tick, len(self.replay)))
+        checkpoint = max(t for t in self.checkpoints if t <= tick)
+        if tick < self.sim.ticks or checkpoint > self.sim.ticks:
+            self.sim.load_state(self.checkpoints[checkpoint])
+
+        # Re-simulating isn't part of any frame, so keep it out of the profiler and console
+        verbose, self.sim.verbose = self.sim.verbose, False
+        while self.sim.ticks < tick:
+            self.step()
+        self.sim.verbose = verbose
+
+
+def run_replay(replay, verbose=False):
+    """
+    Plays a whole Replay headless, as fast as the CPU allows.
+
+    Returns (simulation, elapsed_seconds); the state digest matches the
+    recorded session's.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
 
-    # Sprite groups
-    all_sprites = pygame.sprite.Group()   # All sprites that need update()
-    code_blocks = pygame.sprite.Group() # CodeBlocks (formerly asteroids) for draw() and collision
-    bullets = pygame.sprite.Group()       # Bullets for draw() and collision
-    players = pygame.sprite.Group()       # Player(s) for collision
-    particles = pygame.sprite.Group()     # Particles for draw() and update()
+    sim = Simulation(WIDTH, HEIGHT, clock=SimClock(), seed=replay.seed, verbose=verbose)
+    player = ReplayPlayer(replay, sim)
+    start = time.perf_counter()
+    player.seek(len(replay))
+    elapsed = time.perf_counter() - start
+    return sim, elapsed
+
+
+def pack_state(state):
+    """
+    Splits a Simulation.save_state() into (head, arrays) bytes: the particle
+    arrays as raw bytes, and everything else pickled along with their layout.
+    """
+    n, arrays, free, free_count, high_water, rng_state = state['particles']
+    layout = [(array.dtype.str, array.shape) for array in arrays]
+    head = pickle.dumps(dict(state, particles=(n, layout, free, free_count, high_water, rng_state)), pickle.HIGHEST_PROTOCOL)
+    return head, b''.join(array.tobytes() for array in arrays)
+
+
+def unpack_state(head, arrays):
+    """The save_state() dict pack_state() was given."""
+    state = pickle.loads(head)
+    n, layout, free, free_count, high_water, rng_state = state['particles']
+    unpacked, offset = [], 0
+    for dtype, shape in layout:
+        count = math.prod(shape)
+        unpacked.append(np.frombuffer(arrays, dtype, count, offset).reshape(shape))
+        offset += count * np.dtype(dtype).itemsize
+    state['particles'] = (n, tuple(unpacked), free, free_count, high_water, rng_state)
+    return state
+
+
+class SnapshotBuffer:
+    """
+    The last SNAPSHOT_SECONDS of a Simulation, one snapshot per tick, for
+    rewinding and for inspecting how a desync came about.
+
+    Every SNAPSHOT_KEYFRAME_TICKS-th snapshot is a keyframe, kept packed but
+    uncompressed. The others are deltas against their keyframe: the pickled
+    part is zlib'd with the keyframe's as a preset dictionary, and the
+    particle arrays are XORed with the keyframe's (unchanged bytes become
+    zeros) and zlib'd. Restoring any snapshot therefore decodes at most one
+    delta, however far back it is. When the buffer is full the oldest
+    keyframe is dropped along with its deltas, so memory stays bounded.
+    """
+
+    def __init__(self, seconds=SNAPSHOT_SECONDS, keyframe_ticks=SNAPSHOT_KEYFRAME_TICKS):
+        self.keyframe_ticks = keyframe_ticks
+        groups = max(2, math.ceil(seconds * TICK_RATE / keyframe_ticks))
+        self.capacity = groups * keyframe_ticks # Whole keyframe groups, so eviction never orphans a delta
+        self._slots = [None] * self.capacity
+        self._start = 0 # Index of the oldest snapshot (always a keyframe)
+        self._end = 0 # One past the newest
+
+    def __len__(self):
+        return self._end - self._start
+
+    def nbytes(self):
+        """Memory held by the snapshots, roughly."""
+        slots = (self._slots[index % self.capacity] for index in range(self._start, self._end))
+        return sum(len(head) + len(arrays) for head, arrays, _ in slots)
+
+    def push(self, state):
+        """Adds a Simulation.save_state() as the newest snapshot."""
+        index = self._end
+        if len(self) == self.capacity:
+            self._start += self.keyframe_ticks # Drop the oldest keyframe group
+        head, arrays = pack_state(state)
+        if index % self.keyframe_ticks == 0:
+            self._slots[index % self.capacity] = (head, arrays, None)
+        else:
+            key_head, key_arrays, _ = self._slots[(index - index % self.keyframe_ticks) % self.capacity]
+            compressor = zlib.compressobj(SNAPSHOT_COMPRESSION, zdict=key_head)
+            head = compressor.compress(head) + compressor.flush()
+            xored = len(arrays) == len(key_arrays) # Same particle high-water mark as the keyframe
+            if xored:
+                arrays = np.bitwise_xor(np.frombuffer(arrays, np.uint8), np.frombuffer(key_arrays, np.uint8)).tobytes()
+            self._slots[index % self.capacity] = (head, zlib.compress(arrays, SNAPSHOT_COMPRESSION), xored)
+        self._end += 1
+
+    def state(self, back=0):
+        """The snapshot taken back pushes before the newest, as a save_state() dict."""
+        if not 0 <= back < len(self):
+            raise IndexError(f"only {len(self)} snapshots to go back through")
+        index = self._end - 1 - back
+        head, arrays, xored = self._slots[index % self.capacity]
+        if xored is not None: # A delta
+            key_head, key_arrays, _ = self._slots[(index - index % self.keyframe_ticks) % self.capacity]
+            decompressor = zlib.decompressobj(zdict=key_head)
+            head = decompressor.decompress(head) + decompressor.flush()
+            arrays = zlib.decompress(arrays)
+            if xored:
+                arrays = np.bitwise_xor(np.frombuffer(arrays, np.uint8), np.frombuffer(key_arrays, np.uint8)).tobytes()
+        return unpack_state(head, arrays)
+
+    def rewind(self, sim, ticks):
+        """
+        Puts sim back to the snapshot from ticks ago (or the oldest there is)
+        and forgets everything newer. Returns how many ticks it went back.
+        """
+        back = min(ticks, len(self) - 1)
+        if back <= 0:
+            return 0
+        sim.load_state(self.state(back))
+        self._end -= back
+        return back
+
+
+def draw_game(screen, sim, game_hud, alpha=1.0):
+    """
+    Draws one frame of the simulation (everything except the display flip).
+
+    game_hud is the simulation's make_hud(). alpha (0..1) is how far between
+    the previous and current tick to draw moving objects, so motion stays
+    smooth whatever the render rate.
+    """
+    draw_world(screen, sim, alpha)
+    draw_hud(screen, game_hud)
+
+
+def draw_world(screen, sim, alpha=1.0, dirty=None):
+    """
+    Draws the background and every moving object.
+
+    With a DirtyRectTracker, only the regions drawn last frame are cleared
+    instead of the whole screen, and everything drawn is recorded in it.
+    """
+    if dirty is None:
+        screen.fill(BLACK) # Fill background
+    else:
+        dirty.erase(screen, BLACK) # Clear only where something was drawn last frame
+    doreturn = dirty is not None
 
-    # Dictionary to pass game state info easily
-    game_state = {
-        'screen_width': WIDTH,
-        'screen_height': HEIGHT,
-        # Add other state if needed
-    }
+    # Draw sprites that use the standard .image and .rect (CodeBlocks, Bullets)
+    # CodeBlocks now handle rendering their text onto their image surface
+    blocks = draw_interpolated(screen, sim.code_blocks, alpha, doreturn)
+    bullets = draw_interpolated(screen, sim.bullets, alpha, doreturn)
 
-    # --- Initial Game Setup ---
-    # Pass all relevant groups to reset_game
-    player = reset_game(WIDTH, HEIGHT, all_sprites, code_blocks, bullets, players, particles)
+    # Draw the player using its custom draw method
+    player = sim.player.draw(screen, alpha) # Player drawing handles its own visibility/blinking
 
+    # Draw particles in one batched blits() call
+    particles = sim.particles.draw(screen, alpha, doreturn)
 
-    running = True
-    while running:
-        # --- Event Handling ---
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+    if dirty is not None:
+        for rects in (blocks, bullets, player, particles):
+            dirty.extend(rects)
 
-            if event.type == pygame.KEYDOWN:
-                # Player controls only during active gameplay
-                if not game_over and not waiting_to_start_level:
-                    if event.key == pygame.K_LEFT:
-                        player.rotating_left = True
-                    if event.key == pygame.K_RIGHT:
-                        player.rotating_right = True
-                    if event.key == pygame.K_UP:
-                        player.thrusting = True
-                    if event.key == pygame.K_SPACE:
-                         bullet = player.shoot()
-                         if bullet:
-                             all_sprites.add(bullet)
-                             bullets.add(bullet)
-
-                # Game over restart/quit
-                if game_over:
-                    # Only allow restart/quit after the game over message has been shown for a bit
-                    if pygame.time.get_ticks() - level_start_time > GAME_OVER_WAIT:
-                        if event.key == pygame.K_r: # Restart
-                             # Pass all relevant groups to reset_game
-                            player = reset_game(WIDTH, HEIGHT, all_sprites, code_blocks, bullets, players, particles)
-                        elif event.key == pygame.K_q: # Quit
-                             running = False
-
-            if event.type == pygame.KEYUP:
-                if not game_over and not waiting_to_start_level:
-                    if event.key == pygame.K_LEFT:
-                        player.rotating_left = False
-                    if event.key == pygame.K_RIGHT:
-                        player.rotating_right = False
-                    if event.key == pygame.K_UP:
-                        player.thrusting = False
 
+def make_hud(sim):
+    """The score, lives and level, and the game over and level start messages, as widgets bound to sim."""
+    def showing_level_start():
+        # Display level number briefly at the start of a level wait, for 3/4 of the wait time
+        return (not sim.game_over and sim.waiting_to_start_level
+                and sim.clock() - sim.level_start_time < WAIT_FOR_LEVEL_START * 0.75)
 
-        # --- Game Logic (Updates) ---
+    game_hud = hud.Hud()
+    game_hud.add(hud.Text(lambda: f"Score: {sim.score}", 30, WHITE, topleft=(10, 10)))
+    game_hud.add(LivesWidget(lambda: sim.lives, LIVES_X, LIVES_Y))
+    game_hud.add(hud.Text(lambda: f"Level: {sim.level}", 30, WHITE, topleft=(10, 40)))
+    game_hud.add(hud.Label("GAME OVER", 74, RED, visible=lambda: sim.game_over, center=(WIDTH // 2, HEIGHT // 2)))
+    game_hud.add(hud.Label("Press R to Restart or Q to Quit", 36, WHITE, visible=lambda: sim.game_over, center=(WIDTH // 2, HEIGHT // 2 + 50)))
+    game_hud.add(hud.Text(lambda: f"Level {sim.level}", 74, WHITE, visible=showing_level_start, center=(WIDTH // 2, HEIGHT // 2)))
+    return game_hud
 
-        # Handle waiting state
-        if waiting_to_start_level:
-            if not game_over and pygame.time.get_ticks() - level_start_time > WAIT_FOR_LEVEL_START:
-                # Start the level, passing all relevant groups
-                start_level(WIDTH, HEIGHT, level, player, all_sprites, code_blocks, bullets, particles)
-            # If game_over, we wait until GAME_OVER_WAIT duration is over before allowing restart/quit keypresses
-        else: # Game is in active play
-            # Update all sprites
-            all_sprites.update() # Updates player, code blocks, bullets, AND particles
-
-            # Check for collisions: Bullet vs CodeBlock
-            # Use collide_circle for collision check
-            collisions = pygame.sprite.groupcollide(bullets, code_blocks, True, True, collided=pygame.sprite.collide_circle)
-
-            # Process code block collisions (explode into particles and add score)
-            for bullet, hit_blocks in collisions.items():
-                for block in hit_blocks:
-                    score += block.get_score() # Add score for destroyed block
-
-                    # Create particles from the block's text segment
-                    block_text = block.split() # Get the text segment from the destroyed block
-                    num_particles = int(len(block_text) * PARTICLE_COUNT_MULTIPLIER)
-                    # Ensure at least one particle if there was any text
-                    if num_particles == 0 and len(block_text) > 0: num_particles = 1
-                    # Cap max particles per explosion to prevent lag if a huge string somehow gets through
-                    num_particles = min(num_particles, 50)
-
-
-                    for i in range(num_particles):
-                        char_index = i % len(block_text) if len(block_text) > 0 else 0 # Cycle through characters
-                        char = block_text[char_index] if len(block_text) > 0 else " " # Use a space if text is empty
-
-                        # Random velocity spreading out from the block's position
-                        angle = random.uniform(0, 360)
-                        speed = random.uniform(PARTICLE_SPEED_MIN, PARTICLE_SPEED_MAX)
-                        vel = pygame.math.Vector2(math.cos(math.radians(angle)), math.sin(math.radians(angle))) * speed
-
-                        # Slight random offset from the center for particle spawn
-                        offset_amount = block.collision_radius * 0.5
-                        spawn_pos = block.position + pygame.math.Vector2(random.uniform(-offset_amount, offset_amount), random.uniform(-offset_amount, offset_amount))
-
-                        particle = Particle(spawn_pos, vel, char, YELLOW, PARTICLE_LIFESPAN)
-                        all_sprites.add(particle)
-                        particles.add(particle)
-
-
-            # Check for collisions: Player vs CodeBlock
-            if not player.is_invincible and not game_over:
-                player_collisions = pygame.sprite.spritecollide(player, code_blocks, False, collided=pygame.sprite.collide_circle)
-                if player_collisions:
-                    # Pass the particles group to player_hit so it can clear them
-                    player_hit(player, game_state, all_sprites, code_blocks, bullets, particles)
-
-
-            # Check for level completion (all code blocks destroyed)
-            if not code_blocks and not game_over and not waiting_to_start_level:
-                 level += 1 # Advance level
-                 waiting_to_start_level = True # Enter wait state before next level
-                 level_start_time = pygame.time.get_ticks()
-                 player.visible = False # Hide player during the wait
 
+def draw_hud(screen, game_hud):
+    """Draws a make_hud() Hud: the score, lives and level, and any game over or level start message; returns the rects drawn."""
+    return game_hud.draw(screen)
 
-        # --- Drawing ---
-        screen.fill(BLACK) # Fill background
 
-        # Draw sprites that use the standard .image and .rect (CodeBlocks, Bullets)
-        # CodeBlocks now handle rendering their text onto their image surface
-        code_blocks.draw(screen)
-        bullets.draw(screen)
+# --- Main Game Loop ---
+def main(seed=None, record_path=None, replay_path=None, seek_seconds=0, startup=None):
+    """
+    Runs the game in a window.
+
+    With record_path, the session's inputs are written there as a Replay on
+    exit. With replay_path, a recorded session is played back in real time
+    instead of reading the keyboard; Left/Right jump REPLAY_SEEK_SECONDS.
+    Otherwise every tick is kept in a SnapshotBuffer, and Backspace rewinds
+    REWIND_SECONDS. With a profiler.StartupTimer, prints the time to the
+    first frame and quits.
+    """
+    pygame.display.init() # Code Asteroids is silent, so the mixer never starts
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pygame Code Asteroids")
+    clock = pygame.time.Clock()
+    if startup is not None:
+        startup.mark('init')
 
-        # Draw the player using its custom draw method
-        player.draw(screen) # Player drawing handles its own visibility/blinking
+    # --- Initial Game Setup ---
+    # The simulation runs on its own clock at TICK_RATE; rendering just shows the latest ticks
+    sim_clock = SimClock()
+    replay = Replay.load(replay_path) if replay_path else None
+    if replay is not None:
+        seed = replay.seed
+    elif seed is None:
+        seed = random.randrange(2 ** 32) # Still random each game, but known so it can be recorded
+    sim = Simulation(WIDTH, HEIGHT, clock=sim_clock, seed=seed)
+    keyboard = KeyboardInput()
+    recording = Replay(seed) if record_path else None
+    replay_player = None
+    snapshots = None
+    if replay is not None:
+        replay_player = ReplayPlayer(replay, sim)
+        replay_player.seek(int(seek_seconds * TICK_RATE))
+    else:
+        snapshots = SnapshotBuffer()
+        snapshots.push(sim.save_state())
+    timestep = FixedTimestep(TICK_RATE, MAX_TICKS_PER_FRAME)
+    game_hud = make_hud(sim) # Rendering state stays out here, off the deterministic Simulation
+    frame_profiler = profiler.FrameProfiler('asteroid', FRAME_PHASES) # F3: overlay, F4: dump CSV
+    # Only the regions around what moved are cleared and pushed, unless that's most of the screen
+    dirty = DirtyRectTracker(screen.get_rect())
+    if startup is not None:
+        startup.mark('setup')
 
-        # Draw particles manually, as they don't have standard images for group.draw
-        # Particles draw their single character text
-        for particle in particles:
-             # Ensure the particle still exists (wasn't killed in the same frame's update)
-             if particle.alive():
-                 draw_text(screen, particle.text, 12, particle.color, particle.position.x, particle.position.y, antialias=False) # Use small font, no antialiasing for retro look
+    running = True
+    while running:
+        # --- Cap Frame Rate ---
+        frame_time = clock.tick(FPS) / 1000 # Seconds since the last frame
+        frame_profiler.begin_frame() # The wait in clock.tick() isn't charged to any phase
 
+        # --- Event Handling ---
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
 
-        # Draw UI (Score, Lives, Level)
-        draw_text(screen, f"Score: {score}", 30, WHITE, 10, 10)
-        draw_player_lives(screen, lives, WIDTH - (PLAYER_SIZE * 0.7 * 2 * PLAYER_START_LIVES + 5 * (PLAYER_START_LIVES - 1) + 10), 10) # Position lives near top right
-        draw_text(screen, f"Level: {level}", 30, WHITE, 10, 40)
+            if frame_profiler.handle_event(event):
+                continue
+
+            # Replay playback: the recording drives the game, the arrow keys seek
+            if replay_player:
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                        frame_profiler.mark('events')
+                        direction = 1 if event.key == pygame.K_RIGHT else -1
+                        replay_player.seek(sim.ticks + direction * REPLAY_SEEK_SECONDS * TICK_RATE)
+                        frame_profiler.mark('seek') # Re-simulated from the nearest checkpoint
+                    elif event.key == pygame.K_q:
+                        running = False
+                continue
+
+            keyboard.handle_event(event)
+
+            # Rewind: straight back to an earlier snapshot, nothing is re-simulated
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
+                frame_profiler.mark('events')
+                snapshots.rewind(sim, REWIND_SECONDS * TICK_RATE)
+                frame_profiler.mark('snapshot')
+                if recording is not None:
+                    recording.truncate(sim.ticks) # The rewound ticks never happened
+
+            # Game over restart/quit
+            # Only allow restart/quit after the game over message has been shown for a bit
+            if event.type == pygame.KEYDOWN and sim.can_restart():
+                if event.key == pygame.K_r: # Restart
+                    sim.reset()
+                    if recording is not None:
+                        recording.restart()
+                elif event.key == pygame.K_q: # Quit
+                    running = False
+        frame_profiler.mark('events')
 
+        # --- Game Logic (Updates) ---
+        for _ in range(timestep.advance(frame_time)):
+            if replay_player:
+                replay_player.step(frame_profiler) # Holds on the last tick once the replay ends
+                continue
+            tick_input = keyboard.next_input(sim.ticks)
+            if recording is not None:
+                recording.record(tick_input)
+            sim_clock.advance()
+            sim.step(tick_input, frame_profiler)
+            frame_profiler.mark('update') # Ticks spent waiting between levels
+            snapshots.push(sim.save_state())
+            frame_profiler.mark('snapshot')
+        frame_profiler.mark('update') # Replay ticks between levels, and checkpoints
 
-        # Draw Game Over or Level Start messages
-        if game_over:
-            draw_game_over(screen)
-        elif waiting_to_start_level:
-             # Display level number briefly at the start of a level wait
-             # Only show the message if not game over
-             if pygame.time.get_ticks() - level_start_time < WAIT_FOR_LEVEL_START * 0.75 and not game_over: # Show for 3/4 of the wait time
-                level_font = pygame.font.Font(None, 74)
-                level_text = level_font.render(f"Level {level}", True, WHITE)
-                level_rect = level_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-                screen.blit(level_text, level_rect)
 
+        # --- Drawing ---
+        draw_world(screen, sim, timestep.alpha, dirty) # Ships, rocks and bullets sit between their last two positions
+        frame_profiler.mark('draw')
+        dirty.extend(draw_hud(screen, game_hud))
+        if replay_player:
+            dirty.add(draw_text(screen, f"Replay {sim.ticks / TICK_RATE:.1f}s / {len(replay) / TICK_RATE:.1f}s", 24, GRAY, 10, HEIGHT - 30))
+        dirty.add(frame_profiler.draw(screen, 10, HEIGHT - profiler.overlay_height(FRAME_PHASES) - 10))
+        frame_profiler.mark('hud')
 
         # --- Update Display ---
-        pygame.display.flip()
-
-        # --- Cap Frame Rate ---
-        clock.tick(FPS)
-
+        dirty.present() # Changed regions only, or a full flip when they cover much of the screen
+        frame_profiler.mark('flip')
+        frame_profiler.end_frame()
+        if startup is not None:
+            startup.mark('first frame')
+            print(startup.report())
+            running = False
+
+    if recording is not None:
+        recording.save(record_path)
+        print(f"Recorded {len(recording)} ticks to {record_path}")
     pygame.quit()
     sys.exit()
 
+def seed_argument(text):
+    """argparse type for --seed: an int that fits in a replay header."""
+    seed = int(text)
+    try:
+        REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, 0)
+    except struct.error:
+        raise argparse.ArgumentTypeError(f"seed must be a signed 64-bit integer, got {text}")
+    return seed
+
+
 # --- Run the game ---
 if __name__ == "__main__":
-    # Initialize global variables before calling main
-    score = 0
-    lives = PLAYER_START_LIVES
-    level = 1
-    game_over = False
-    waiting_to_start_level = True
-    level_start_time = 0 # Will be set in reset_game
-
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pygame Code Asteroids")
+    parser.add_argument('--headless', action='store_true', help="run the simulation with no window, as fast as possible")
+    parser.add_argument('--ticks', type=int, default=TICK_RATE * 60 * 10, help="ticks to simulate in headless mode")
+    parser.add_argument('--seed', type=seed_argument, default=None, help="random seed (headless default: 0, otherwise random)")
+    parser.add_argument('--record', metavar='PATH', help="record the session's inputs to a replay file")
+    parser.add_argument('--replay', metavar='PATH', help="play back a replay file (as fast as possible with --headless)")
+    parser.add_argument('--seek', type=float, default=0, metavar='SECONDS', help="start a windowed replay this far in")
+    parser.add_argument('--measure-startup', action='store_true', help="print the time to the first frame and quit")
+    args = parser.parse_args()
+
+    if args.headless and args.replay:
+        replay = Replay.load(args.replay)
+        sim, elapsed = run_replay(replay)
+        print(f"Replayed {len(replay)} ticks in {elapsed:.2f}s ({len(replay) / max(elapsed, 1e-9):.0f} ticks/s)")
+        print(f"Score: {sim.score}  Level: {sim.level}  Lives: {sim.lives}")
+        print(f"State digest: {sim.state_digest()}")
+        pygame.quit()
+    elif args.headless:
+        seed = args.seed if args.seed is not None else 0
+        recording = Replay(seed) if args.record else None
+        sim, elapsed, games = run_headless(args.ticks, seed=seed, replay=recording)
+        print(f"Simulated {args.ticks} ticks in {elapsed:.2f}s ({args.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+        print(f"Games: {games}  Score: {sim.score}  Level: {sim.level}  Lives: {sim.lives}")
+        print(f"State digest: {sim.state_digest()}")
+        if recording is not None:
+            recording.save(args.record)
+            print(f"Recorded {len(recording)} ticks to {args.record}")
+        pygame.quit()
+    else:
+        startup = None
+        if args.measure_startup:
+            startup = profiler.StartupTimer(LAUNCH_TIME)
+            startup.mark('imports')
+        main(seed=args.seed, record_path=args.record, replay_path=args.replay, seek_seconds=args.seek, startup=startup)
@@ -0,0 +1,444 @@
+"""
+Gym-style environments around asteroid.py, for training agents.
+
+Both environments take actions as TickInput bit masks (0..ACTION_COUNT-1, the
+same bits replays use: rotate left 1, rotate right 2, thrust 4, fire 8), step
+one simulation tick at a time, and return observations as float32 NumPy
+arrays of OBS_SIZE:
+
+    player      x, y, vx, vy, cos(angle), sin(angle), invincible, lives, waiting
+    blocks      the OBS_NEAREST_BLOCKS nearest code blocks, nearest first, each as
+                present, dx, dy, vx, vy (offsets measured the short way round)
+    bullets     bullets in flight
+
+AsteroidEnv wraps one asteroid.Simulation, sprites and all. VectorAsteroidEnv
+plays num_envs games in lockstep with every game's state held in NumPy arrays,
+so a step costs the same handful of array operations whether it advances 1
+game or 1000; nothing is rendered and there are no sprites. It follows the
+Simulation's rules and constants (code block sizes included) tick for tick:
+collisions are tested between whole-pixel rect centres, and each code block
+goes to the first bullet fired that reaches it. load_game() copies a
+Simulation into one of its games, and from there the two score the same.
+Level layouts come from its own RNG stream, though, so its games don't
+match a Simulation's seed for seed. Particles aren't simulated, and a game
+holds at most BULLET_SLOTS bullets (one per tick of a bullet's lifespan).
+
+    env = VectorAsteroidEnv(256, seed=0)
+    obs, info = env.reset()
+    obs, rewards, terminated, truncated, info = env.step(actions)
+"""
+
+import math
+import os
+
+import numpy as np
+import pygame
+
+import asteroid
+import text_cache
+from spatial_hash import round_half_away
+
+ACTION_COUNT = asteroid.RESTART_BIT # Every combination of the four TickInput bits
+OBS_NEAREST_BLOCKS = 5
+PLAYER_FEATURES = 9
+BLOCK_FEATURES = 5
+OBS_SIZE = PLAYER_FEATURES + OBS_NEAREST_BLOCKS * BLOCK_FEATURES + 1
+BULLET_SLOTS = asteroid.BULLET_LIFESPAN * asteroid.TICK_RATE // 1000 + 1 # Enough to fire every tick
+SCREEN_SIZE = np.array([asteroid.WIDTH, asteroid.HEIGHT], dtype=np.float64)
+
+# Every angle the ship can face: -90 until its first turn, then 0..359 in PLAYER_ROTATION_SPEED steps.
+# Directions and nose offsets are tabled with the math and pygame calls Player uses, so they match bit for bit.
+SHIP_ANGLES = np.arange(-90, 360, asteroid.PLAYER_ROTATION_SPEED)
+SHIP_DIRECTIONS = np.array([(math.cos(math.radians(angle)), math.sin(math.radians(angle))) for angle in SHIP_ANGLES.tolist()])
+SHIP_NOSE_OFFSETS = np.array([tuple(asteroid.rotate_point(pygame.math.Vector2(0, -asteroid.PLAYER_SIZE * 1.5), angle)) for angle in SHIP_ANGLES.tolist()])
+
+
+def angle_index(angles):
+    """Rows of the SHIP_* tables for ship angles."""
+    return ((angles - SHIP_ANGLES[0]) // asteroid.PLAYER_ROTATION_SPEED).astype(np.int64)
+
+
+def init_pygame():
+    """Starts pygame headless (unless SDL drivers were picked already), as run_headless() does."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+
+
+def wrapped_delta(start, end):
+    """Shortest offsets from start to end on the wrapping screen (broadcasts)."""
+    delta = end - start
+    delta -= SCREEN_SIZE * np.round(delta / SCREEN_SIZE) # Cheaper than % for large arrays
+    return delta
+
+
+def build_observations(player_pos, player_vel, player_angle, invincible, lives, waiting, block_pos, block_vel, block_alive, bullet_count):
+    """Observations for n games from their state arrays; returns (n, OBS_SIZE) float32."""
+    n = len(player_pos)
+    obs = np.zeros((n, OBS_SIZE), dtype=np.float32)
+    obs[:, 0:2] = player_pos / SCREEN_SIZE
+    obs[:, 2:4] = player_vel / asteroid.PLAYER_MAX_SPEED
+    radians = np.radians(player_angle)
+    obs[:, 4] = np.cos(radians)
+    obs[:, 5] = np.sin(radians)
+    obs[:, 6] = invincible
+    obs[:, 7] = lives / asteroid.PLAYER_START_LIVES
+    obs[:, 8] = waiting
+
+    # Nearest live blocks first; missing ones stay zero with present = 0
+    count = min(OBS_NEAREST_BLOCKS, block_pos.shape[1])
+    if count:
+        offset = wrapped_delta(player_pos[:, None, :], block_pos)
+        distance = np.where(block_alive, (offset ** 2).sum(axis=2), np.inf)
+        nearest = np.argsort(distance, axis=1)[:, :count]
+        present = np.take_along_axis(block_alive, nearest, axis=1)
+        blocks = np.zeros((n, OBS_NEAREST_BLOCKS, BLOCK_FEATURES), dtype=np.float32)
+        blocks[:, :count, 0] = present
+        blocks[:, :count, 1:3] = np.take_along_axis(offset, nearest[:, :, None], axis=1) / SCREEN_SIZE * present[:, :, None]
+        blocks[:, :count, 3:5] = np.take_along_axis(block_vel, nearest[:, :, None], axis=1) / asteroid.CODE_BLOCK_SPEED_CAP * present[:, :, None]
+        obs[:, PLAYER_FEATURES:-1] = blocks.reshape(n, -1)
+
+    obs[:, -1] = bullet_count / BULLET_SLOTS
+    return obs
+
+
+class AsteroidEnv:
+    """One asteroid.Simulation behind reset()/step(); one step is one tick."""
+
+    def __init__(self, seed=None, max_episode_ticks=None):
+        init_pygame()
+        self.seed = seed
+        self.max_episode_ticks = max_episode_ticks
+        self.sim = None
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+        self.clock = asteroid.SimClock()
+        self.sim = asteroid.Simulation(asteroid.WIDTH, asteroid.HEIGHT, clock=self.clock, seed=self.seed, verbose=False)
+        if self.seed is not None:
+            self.seed += 1 # The next episode is a different game
+        return self.observe(), {}
+
+    def step(self, action):
+        sim = self.sim
+        score = sim.score
+        self.clock.advance()
+        sim.step(asteroid.TICK_INPUTS_BY_BITS[int(action) % ACTION_COUNT])
+        terminated = sim.game_over
+        truncated = not terminated and self.max_episode_ticks is not None and sim.ticks >= self.max_episode_ticks
+        info = {'score': sim.score, 'level': sim.level, 'lives': sim.lives}
+        return self.observe(), sim.score - score, terminated, truncated, info
+
+    def observe(self):
+        sim = self.sim
+        player = sim.player
+        blocks = sim.code_blocks.sprites()
+        return build_observations(
+            np.array([player.position], dtype=np.float64),
+            np.array([player.velocity], dtype=np.float64),
+            np.array([player.angle]),
+            np.array([player.is_invincible]),
+            np.array([sim.lives]),
+            np.array([sim.waiting_to_start_level]),
+            np.array([[block.position for block in blocks]], dtype=np.float64).reshape(1, len(blocks), 2),
+            np.array([[block.velocity for block in blocks]], dtype=np.float64).reshape(1, len(blocks), 2),
+            np.ones((1, len(blocks)), dtype=bool),
+            np.array([len(sim.bullets)]),
+        )[0]
+
+
+def segment_radius_table(size_key='large'):
+    """
+    Collision radius of every text segment a code block of this size can show.
+
+    A CodeBlock's radius comes from its rendered (outlined) text, so it
+    depends on the segment. Returns (radii, start_counts): radii[snippet,
+    start] for each snippet and segment start SnippetPool.choose() can pick,
+    and how many starts each snippet has.
+    """
+    properties = asteroid.CODE_BLOCK_SIZES[size_key]
+    font = text_cache.get_font(int(properties['base_size']))
+    texts = asteroid.SNIPPET_POOL.texts
+    start_counts = np.array([len(text) - min(properties['text_length'], len(text)) + 1 for text in texts])
+    radii = np.zeros((len(texts), start_counts.max()))
+    for index, text in enumerate(texts):
+        length = min(properties['text_length'], len(text))
+        for start in range(start_counts[index]):
+            width, height = font.size(text[start:start + length])
+            radii[index, start] = 0.5 * math.hypot(width + 4, height + 4) # The outline adds 2px a side
+    return radii, start_counts
+
+
+class VectorAsteroidEnv:
+    """
+    num_envs independent games stepped together, with all state in NumPy arrays.
+
+    Games that end (game over, or max_episode_ticks) are reset straight away
+    within step(); their final score and level are in info.
+    """
+
+    def __init__(self, num_envs, seed=None, max_episode_ticks=None):
+        init_pygame() # Fonts, to measure the code block text once
+        self.num_envs = n = num_envs
+        self.max_episode_ticks = max_episode_ticks
+        self.rng = np.random.default_rng(seed)
+        self.tick_ms = 1000 / asteroid.TICK_RATE
+        self.radii, self.start_counts = segment_radius_table()
+        blocks = self.max_blocks = asteroid.CODE_BLOCK_MAX_COUNT
+
+        # Per game
+        self.ticks = np.zeros(n, dtype=np.int64) # Like SimClock, never reset
+        self.episode_ticks = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.level = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.waiting = np.zeros(n, dtype=bool)
+        self.wait_start = np.zeros(n, dtype=np.int64)
+
+        # The player
+        self.player_pos = np.zeros((n, 2))
+        self.player_vel = np.zeros((n, 2))
+        self.player_angle = np.zeros(n)
+        self.visible = np.zeros(n, dtype=bool)
+        self.invincible = np.zeros(n, dtype=bool)
+        self.invincible_start = np.zeros(n, dtype=np.int64)
+
+        # Code blocks and bullets, in fixed slots per game
+        self.block_pos = np.zeros((n, blocks, 2))
+        self.block_vel = np.zeros((n, blocks, 2))
+        self.block_radius = np.zeros((n, blocks))
+        self.block_alive = np.zeros((n, blocks), dtype=bool)
+        self.bullet_pos = np.zeros((n, BULLET_SLOTS, 2))
+        self.bullet_center = np.zeros((n, BULLET_SLOTS, 2)) # Rect centre, taken before wrapping like Bullet.update
+        self.bullet_vel = np.zeros((n, BULLET_SLOTS, 2))
+        self.bullet_spawn = np.zeros((n, BULLET_SLOTS), dtype=np.int64)
+        self.bullet_alive = np.zeros((n, BULLET_SLOTS), dtype=bool)
+
+    def now(self):
+        return (self.ticks * self.tick_ms).astype(np.int64) # Milliseconds, like SimClock
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_games(np.arange(self.num_envs))
+        return self.observe(), {}
+
+    def step(self, actions):
+        """Advances every game by one tick; actions is one bit mask per game."""
+        actions = np.asarray(actions, dtype=np.int64) % ACTION_COUNT
+        self.ticks += 1
+        self.episode_ticks += 1
+        now = self.now()
+        score = self.score.copy()
+
+        # Games waiting between levels start the next one once the wait is over, and do nothing else this tick
+        waiting = self.waiting.copy()
+        starting = np.flatnonzero(waiting & ~self.game_over & (now - self.wait_start > asteroid.WAIT_FOR_LEVEL_START))
+        if len(starting):
+            self._start_level(starting, now)
+        active = ~waiting
+
+        self._apply_input(active, actions, now)
+        self._update(active, actions, now)
+        self._collide(active, now)
+
+        # Level complete
+        cleared = np.flatnonzero(active & ~self.waiting & ~self.game_over & ~self.block_alive.any(axis=1))
+        self.level[cleared] += 1
+        self.waiting[cleared] = True
+        self.wait_start[cleared] = now[cleared]
+        self.visible[cleared] = False
+
+        rewards = self.score - score
+        terminated = self.game_over.copy()
+        truncated = ~terminated & (self.episode_ticks >= self.max_episode_ticks) if self.max_episode_ticks else np.zeros(self.num_envs, dtype=bool)
+        info = {'final_score': np.where(terminated | truncated, self.score, 0), 'final_level': np.where(terminated | truncated, self.level, 0)}
+        done = np.flatnonzero(terminated | truncated)
+        if len(done):
+            self._reset_games(done)
+        return self.observe(), rewards, terminated, truncated, info
+
+    def observe(self):
+        return build_observations(
+            self.player_pos, self.player_vel, self.player_angle, self.invincible, self.lives, self.waiting,
+            self.block_pos, self.block_vel, self.block_alive, self.bullet_alive.sum(axis=1),
+        )
+
+    def load_game(self, game, sim):
+        """
+        Copies a Simulation's state into one game, blocks and bullets included.
+
+        The Simulation's clock must be a SimClock at this env's tick rate.
+        Stepping both with the same inputs then keeps score, lives and block
+        positions equal, up to the next level (whose layout each draws from
+        its own RNG).
+        """
+        player = sim.player
+        self.ticks[game] = sim.clock.ticks
+        self.episode_ticks[game] = sim.ticks
+        self.score[game] = sim.score
+        self.lives[game] = sim.lives
+        self.level[game] = sim.level
+        self.game_over[game] = sim.game_over
+        self.waiting[game] = sim.waiting_to_start_level
+        self.wait_start[game] = sim.level_start_time
+        self.player_pos[game] = player.position
+        self.player_vel[game] = player.velocity
+        self.player_angle[game] = player.angle
+        self.visible[game] = player.visible
+        self.invincible[game] = player.is_invincible
+        self.invincible_start[game] = player.invincibility_start_time
+
+        blocks = sim.code_blocks.sprites()[:self.max_blocks]
+        self.block_alive[game] = np.arange(self.max_blocks) < len(blocks)
+        for slot, block in enumerate(blocks):
+            self.block_pos[game, slot] = block.position
+            self.block_vel[game, slot] = block.velocity
+            self.block_radius[game, slot] = asteroid.sprite_radius(block)
+
+        bullets = sim.bullets.sprites()[:BULLET_SLOTS] # In the order they were fired
+        self.bullet_alive[game] = np.arange(BULLET_SLOTS) < len(bullets)
+        for slot, bullet in enumerate(bullets):
+            self.bullet_pos[game, slot] = bullet.position
+            self.bullet_center[game, slot] = bullet.rect.center
+            self.bullet_vel[game, slot] = bullet.velocity
+            self.bullet_spawn[game, slot] = bullet.spawn_time
+
+    def _reset_games(self, games):
+        """Simulation.reset() for these games: level 1, waiting to start."""
+        self.episode_ticks[games] = 0
+        self.score[games] = 0
+        self.lives[games] = asteroid.PLAYER_START_LIVES
+        self.level[games] = 1
+        self.game_over[games] = False
+        self.waiting[games] = True
+        self.wait_start[games] = self.now()[games]
+        self.player_angle[games] = -90 # Pointing up
+        self.visible[games] = True
+        self.invincible[games] = False
+        self._respawn(games)
+        self.block_alive[games] = False
+        self.bullet_alive[games] = False
+
+    def _respawn(self, games):
+        self.player_pos[games] = SCREEN_SIZE // 2
+        self.player_vel[games] = 0
+
+    def _start_level(self, games, now):
+        """Simulation.start_level() for these games: respawn and place the level's blocks."""
+        self.waiting[games] = False
+        self.bullet_alive[games] = False
+        self._respawn(games)
+        self.visible[games] = True
+        self.invincible[games] = True
+        self.invincible_start[games] = now[games]
+
+        level = self.level[games]
+        count = np.minimum(asteroid.CODE_BLOCK_START_COUNT + (level - 1) * asteroid.CODE_BLOCK_COUNT_PER_LEVEL, self.max_blocks)
+        max_speed = np.minimum(asteroid.CODE_BLOCK_SPEED_MAX + (level - 1) * asteroid.CODE_BLOCK_SPEED_PER_LEVEL, asteroid.CODE_BLOCK_SPEED_CAP)
+        safe_distance = np.maximum(max(asteroid.WIDTH, asteroid.HEIGHT) / 3 - (level - 1) * 10, 100)
+        shape = (len(games), self.max_blocks)
+
+        # Random whole-pixel positions, redrawn until they're a safe distance from the spawn point
+        position = np.zeros(shape + (2,))
+        unsafe = np.ones(shape, dtype=bool)
+        while unsafe.any():
+            position[unsafe] = self.rng.integers(0, SCREEN_SIZE.astype(np.int64), (unsafe.sum(), 2))
+            unsafe = np.hypot(*(position - SCREEN_SIZE // 2).transpose(2, 0, 1)) <= safe_distance[:, None]
+
+        angle = np.radians(self.rng.uniform(0, 360, shape))
+        speed = self.rng.uniform(asteroid.CODE_BLOCK_SPEED_MIN, max_speed[:, None], shape)
+        snippet = self.rng.integers(0, len(self.start_counts), shape)
+        start = (self.rng.random(shape) * self.start_counts[snippet]).astype(np.int64)
+
+        self.block_pos[games] = position
+        self.block_vel[games] = np.stack([np.cos(angle), np.sin(angle)], axis=2) * speed[:, :, None]
+        self.block_radius[games] = self.radii[snippet, start]
+        self.block_alive[games] = np.arange(self.max_blocks) < count[:, None]
+
+    def _apply_input(self, active, actions, now):
+        """Player.shoot() for active games whose action has the fire bit."""
+        firing = np.flatnonzero(active & self.visible & (actions & 8 > 0))
+        if not len(firing):
+            return
+        free = ~self.bullet_alive[firing]
+        has_slot = free.any(axis=1) # A full magazine drops the shot
+        firing, slot = firing[has_slot], free[has_slot].argmax(axis=1)
+        angles = angle_index(self.player_angle[firing])
+        nose = round_half_away(SHIP_NOSE_OFFSETS[angles] + self.player_pos[firing]) # Bullet.reset snaps to its rect centre
+        self.bullet_pos[firing, slot] = nose
+        self.bullet_center[firing, slot] = nose
+        self.bullet_vel[firing, slot] = SHIP_DIRECTIONS[angles] * asteroid.BULLET_SPEED
+        self.bullet_spawn[firing, slot] = now[firing]
+        self.bullet_alive[firing, slot] = True
+
+    def _update(self, active, actions, now):
+        """Player, block and bullet update() for the active games."""
+        moving = active & self.visible
+        rotation = (moving & (actions & 1 > 0)).astype(np.float64) - (moving & (actions & 2 > 0))
+        self.player_angle[moving] = (self.player_angle[moving] + rotation[moving] * asteroid.PLAYER_ROTATION_SPEED) % 360
+
+        thrusting = moving & (actions & 4 > 0)
+        self.player_vel[thrusting] += SHIP_DIRECTIONS[angle_index(self.player_angle[thrusting])] * asteroid.PLAYER_THRUST
+        self.player_vel[moving] *= 0.995
+        speed = np.sqrt(self.player_vel[:, 0] * self.player_vel[:, 0] + self.player_vel[:, 1] * self.player_vel[:, 1]) # As Vector2.length()
+        too_fast = moving & (speed > asteroid.PLAYER_MAX_SPEED)
+        self.player_vel[too_fast] *= (asteroid.PLAYER_MAX_SPEED / speed[too_fast])[:, None]
+        self.player_pos[moving] = (self.player_pos[moving] + self.player_vel[moving]) % SCREEN_SIZE
+        self.invincible[moving & self.invincible & (now - self.invincible_start > asteroid.PLAYER_INVINCIBILITY_DURATION)] = False
+
+        self.block_pos[active] = (self.block_pos[active] + self.block_vel[active]) % SCREEN_SIZE
+        moved = self.bullet_pos[active] + self.bullet_vel[active]
+        self.bullet_center[active] = np.trunc(moved) # int() of the unwrapped position
+        self.bullet_pos[active] = moved % SCREEN_SIZE
+        self.bullet_alive &= ~(active[:, None] & (now[:, None] - self.bullet_spawn > asteroid.BULLET_LIFESPAN))
+
+    def _collide(self, active, now):
+        """Simulation.check_collisions() for the active games."""
+        # Collisions are between whole-pixel rect centres, as collide_circle_wrapped() measures them
+        block_center = np.trunc(self.block_pos)
+
+        # Bullets against blocks: only the live bullets, each tested against its own game's blocks
+        games, slots = np.nonzero(self.bullet_alive & (active & self.block_alive.any(axis=1))[:, None])
+        if len(games):
+            offset = wrapped_delta(self.bullet_center[games, slots][:, None, :], block_center[games])
+            reach = asteroid.BULLET_RADIUS + self.block_radius[games]
+            hits = ((offset ** 2).sum(axis=2) <= reach ** 2) & self.block_alive[games]
+            bullet, block = np.nonzero(hits)
+            if len(bullet):
+                # groupcollide goes through the bullets in the order they were fired, and a block
+                # only goes once: it's the first bullet that reaches it which is spent on it
+                target = games[bullet] * self.max_blocks + block
+                order = np.lexsort((self.bullet_spawn[games[bullet], slots[bullet]], target))
+                targets, first = np.unique(target[order], return_index=True)
+                spent = bullet[order[first]]
+                self.block_alive.reshape(-1)[targets] = False
+                np.add.at(self.score, targets // self.max_blocks, asteroid.CODE_BLOCK_SCORES.get('large', 0))
+                self.bullet_alive[games[spent], slots[spent]] = False
+
+        # The player against blocks
+        games = np.flatnonzero(active & ~self.invincible & ~self.game_over)
+        if len(games):
+            offset = wrapped_delta(np.trunc(self.player_pos[games])[:, None, :], block_center[games])
+            reach = asteroid.PLAYER_COLLISION_RADIUS + self.block_radius[games]
+            hit = (((offset ** 2).sum(axis=2) <= reach ** 2) & self.block_alive[games]).any(axis=1)
+            self._player_hit(games[hit], now)
+
+    def _player_hit(self, games, now):
+        """Simulation.player_hit() for these games."""
+        self.lives[games] -= 1
+        self.block_alive[games] = False
+        self.bullet_alive[games] = False
+        self.waiting[games] = True
+        self.wait_start[games] = now[games]
+
+        over = games[self.lives[games] <= 0]
+        self.game_over[over] = True
+        self.visible[over] = False
+
+        alive = games[self.lives[games] > 0]
+        self._respawn(alive)
+        self.invincible[alive] = True
+        self.invincible_start[alive] = now[alive]
@@ -0,0 +1,246 @@
+"""
+Batch simulation of asteroid.py games, for balance tuning.
+
+Runs many headless games in parallel across a ProcessPoolExecutor. Each game
+gets its own seed and is flown by an autopilot instead of the keyboard, and
+plays until game over (or a tick limit). Per-game stats are collected and
+aggregated into a summary, optionally written as JSON:
+
+    python batch.py --games 2000 --autopilot aim
+    python batch.py --games 500 --set CODE_BLOCK_MAX_COUNT=20 --set "CODE_BLOCK_SCORES={'large': 40}"
+    python batch.py --output results.json
+
+--set overrides an asteroid.py constant (a Python literal) in every worker,
+e.g. CODE_BLOCK_SCORES or the CODE_BLOCK_*_PER_LEVEL level scaling. Constants
+asteroid.py only reads while it's being imported can't be overridden this
+way; they're skipped with a warning and listed as ignored in the JSON.
+"""
+
+import argparse
+import ast
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+asteroid = None # Imported in each worker, once the SDL environment is set up
+
+STATS = ('score', 'level', 'lives_lost', 'ticks', 'peak_code_blocks', 'peak_bullets', 'peak_particles', 'ticks_per_second')
+DEFAULT_MAX_MINUTES = 10 # Game time before a game that hasn't ended is stopped
+
+# asteroid.py constants that are copied into other values as it's imported, so
+# setting them afterwards doesn't reach the game (PLAYER_SIZE, for instance, also
+# sets PLAYER_COLLISION_RADIUS). TICK_RATE, CODE_BLOCK_SIZES, PYTHON_CODE_SNIPPETS
+# and the PARTICLE_* settings are baked in too, but the workers pick them up again.
+IMPORT_TIME_CONSTANTS = (
+    'PLAYER_SIZE', 'LIFE_ICON_SCALE', 'LIFE_ICON_SPACING', 'CODE_BLOCK_SURFACE_CACHE_SIZE',
+    'SNAPSHOT_SECONDS', 'SNAPSHOT_KEYFRAME_TICKS', 'REPLAY_CHECKPOINT_TICKS', 'RESTART_BIT', 'NO_INPUT',
+)
+
+
+# --- Autopilots ---
+# An autopilot is made per game with the Simulation and a seeded RNG, and
+# hands out one TickInput per tick through next_input(tick), like the
+# keyboard and scripted input sources in asteroid.py.
+
+class ScriptAutopilot:
+    """The headless demo script: spin, thrust and fire in a loop."""
+
+    def __init__(self, sim, rng):
+        self.script = asteroid.ScriptedInput(asteroid.DEMO_SCRIPT)
+
+    def next_input(self, tick):
+        return self.script.next_input(tick)
+
+
+class RandomAutopilot:
+    """Holds a random combination of controls for a random number of ticks."""
+    HOLD_TICKS = (5, 40)
+
+    def __init__(self, sim, rng):
+        self.rng = rng
+        self.tick_input = asteroid.NO_INPUT
+        self.hold = 0
+
+    def next_input(self, tick):
+        if self.hold <= 0:
+            rotate = self.rng.choice((None, 'left', 'right'))
+            self.tick_input = asteroid.TickInput(rotate == 'left', rotate == 'right', self.rng.random() < 0.3, False)
+            self.hold = self.rng.randint(*self.HOLD_TICKS)
+        self.hold -= 1
+        return self.tick_input._replace(fire=self.rng.random() < 0.1)
+
+
+class AimAutopilot:
+    """Turns towards where the nearest code block is heading and fires once lined up."""
+    FIRE_INTERVAL = 2 # Ticks between shots
+    FIRE_ANGLE = 8 # Degrees off target that still counts as lined up
+    THRUST_DISTANCE = 300 # Close the gap on targets further away than this
+
+    def __init__(self, sim, rng):
+        self.sim = sim
+
+    def next_input(self, tick):
+        sim = self.sim
+        player = sim.player
+        target = None
+        for block in sim.code_blocks:
+            # The block hash knows the screen wraps, so this is the short way round
+            offset = asteroid.pygame.math.Vector2(sim.block_hash.delta(
+                block.position.x, block.position.y, player.position.x, player.position.y))
+            distance = offset.length()
+            if target is None or distance < target[0]:
+                target = (distance, offset, block)
+        if target is None:
+            return asteroid.NO_INPUT
+
+        # Lead the target by the bullet's travel time
+        distance, offset, block = target
+        aim = offset + block.velocity * (distance / asteroid.BULLET_SPEED)
+        difference = (math.degrees(math.atan2(aim.y, aim.x)) - player.angle + 180) % 360 - 180
+        lined_up = abs(difference) < self.FIRE_ANGLE
+        return asteroid.TickInput(
+            difference > asteroid.PLAYER_ROTATION_SPEED / 2, # Rotating left increases the angle
+            difference < -asteroid.PLAYER_ROTATION_SPEED / 2,
+            lined_up and distance > self.THRUST_DISTANCE,
+            lined_up and tick % self.FIRE_INTERVAL == 0,
+        )
+
+
+AUTOPILOTS = {'script': ScriptAutopilot, 'random': RandomAutopilot, 'aim': AimAutopilot}
+
+
+# --- Workers ---
+
+def init_worker(overrides):
+    """Sets up pygame headless and applies the --set overrides, once per process."""
+    global asteroid
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import asteroid as module
+    asteroid = module
+    asteroid.pygame.init()
+    for name, value in overrides.items():
+        setattr(asteroid, name, value)
+    if {'CODE_BLOCK_SIZES', 'PYTHON_CODE_SNIPPETS'} & set(overrides):
+        asteroid.SNIPPET_POOL = asteroid.make_snippet_pool()
+
+
+def play_game(job):
+    """Plays one game to the end and returns its stats."""
+    seed, autopilot, max_minutes = job
+    max_ticks = int(max_minutes * 60 * asteroid.TICK_RATE) # After any TICK_RATE override
+    clock = asteroid.SimClock(1000 / asteroid.TICK_RATE)
+    sim = asteroid.Simulation(asteroid.WIDTH, asteroid.HEIGHT, clock=clock, seed=seed, verbose=False)
+    pilot = AUTOPILOTS[autopilot](sim, random.Random(seed))
+
+    peak_blocks = peak_bullets = peak_particles = 0
+    start = time.perf_counter()
+    for tick in range(max_ticks):
+        clock.advance()
+        sim.step(pilot.next_input(tick))
+        peak_blocks = max(peak_blocks, len(sim.code_blocks))
+        peak_bullets = max(peak_bullets, len(sim.bullets))
+        peak_particles = max(peak_particles, len(sim.particles))
+        if sim.game_over:
+            break
+    elapsed = time.perf_counter() - start
+
+    return {
+        'seed': seed,
+        'score': sim.score,
+        'level': sim.level,
+        'lives_lost': asteroid.PLAYER_START_LIVES - sim.lives,
+        'ticks': sim.ticks,
+        'game_over': sim.game_over,
+        'peak_code_blocks': peak_blocks,
+        'peak_bullets': peak_bullets,
+        'peak_particles': peak_particles,
+        'ticks_per_second': sim.ticks / max(elapsed, 1e-9),
+    }
+
+
+# --- Reporting ---
+
+def summarise(games, elapsed):
+    """Mean, spread and percentiles of each stat across games, plus overall throughput."""
+    summary = {'games': len(games), 'finished': sum(game['game_over'] for game in games), 'elapsed': round(elapsed, 3)}
+    for stat in STATS:
+        values = np.array([game[stat] for game in games], dtype=float)
+        summary[stat] = {
+            'mean': round(float(values.mean()), 3),
+            'std': round(float(values.std()), 3),
+            'min': float(values.min()),
+            'p50': float(np.percentile(values, 50)),
+            'p95': float(np.percentile(values, 95)),
+            'max': float(values.max()),
+        }
+    levels = np.bincount([game['level'] for game in games])
+    summary['levels_reached'] = {level: int(count) for level, count in enumerate(levels) if count}
+    summary['total_ticks_per_second'] = round(sum(game['ticks'] for game in games) / max(elapsed, 1e-9))
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{summary['games']} games ({summary['finished']} reached game over) in {summary['elapsed']:.1f}s, "
+          f"{summary['total_ticks_per_second']:,} ticks/s across all workers")
+    print(f"  {'stat':<18}{'mean':>10}{'std':>10}{'min':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+    for stat in STATS:
+        values = summary[stat]
+        print(f"  {stat:<18}" + ''.join(f"{values[key]:>10.1f}" for key in ('mean', 'std', 'min', 'p50', 'p95', 'max')))
+    print("  levels reached: " + ", ".join(f"{level}: {count}" for level, count in summary['levels_reached'].items()))
+
+
+def parse_override(text):
+    name, _, value = text.partition('=')
+    try:
+        return name.strip(), ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        raise argparse.ArgumentTypeError(f"expected NAME=<python literal>, got {text!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many headless asteroid.py games in parallel and summarise the results.")
+    parser.add_argument('--games', type=int, default=1000, help="number of games to play")
+    parser.add_argument('--autopilot', choices=list(AUTOPILOTS), default='aim', help="what flies the ship")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument('--max-minutes', type=float, default=DEFAULT_MAX_MINUTES, help="game time before a game is stopped")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--set', type=parse_override, action='append', default=[], metavar='NAME=VALUE', help="override an asteroid.py constant")
+    parser.add_argument('--output', help="where to write the per-game results and summary as JSON")
+    args = parser.parse_args()
+
+    overrides = dict(args.set)
+    init_worker({}) # The parent only checks the overrides
+    for name in overrides:
+        if not hasattr(asteroid, name):
+            parser.error(f"asteroid.py has no constant {name!r}")
+    ignored = {name: overrides.pop(name) for name in IMPORT_TIME_CONSTANTS if name in overrides}
+    for name in ignored:
+        print(f"Ignoring --set {name}: asteroid.py only reads it at import time")
+
+    jobs = [(args.seed + i, args.autopilot, args.max_minutes) for i in range(args.games)]
+    print(f"Playing {args.games} games with the {args.autopilot!r} autopilot on {args.workers} workers")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(overrides,)) as executor:
+        # Games are short, so hand them out in batches to keep the pipes quiet
+        chunksize = max(1, args.games // (args.workers * 8))
+        games = list(executor.map(play_game, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    summary = summarise(games, elapsed)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'autopilot': args.autopilot, 'overrides': overrides, 'ignored_overrides': ignored, 'summary': summary, 'games': games}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
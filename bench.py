@@ -0,0 +1,386 @@
+"""
+Stress-scenario benchmarks for the games.
+
+Each scenario builds a heavily loaded version of one game and runs it for a
+fixed number of frames, timing the events, update, collision, draw and flip
+phases separately. The report gives p50/p95/p99 per phase in milliseconds and
+is written as JSON, so frame budgets can be tracked from change to change:
+
+    python bench.py                               # every scenario
+    python bench.py asteroid mine --frames 300
+    python bench.py --output after.json --compare before.json
+
+Scenarios run on SDL's dummy video driver (and arcade's headless mode) unless
+--window is given.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+PHASES = ('events', 'update', 'collision', 'draw', 'flip')
+PERCENTILES = (50, 95, 99)
+
+
+class Scenario:
+    """A canned stress setup. Subclasses fill in whichever phases they use."""
+    name = ''
+    description = ''
+
+    def setup(self):
+        pass
+
+    def before_frame(self):
+        """Untimed housekeeping, e.g. topping entity counts back up."""
+        pass
+
+    def events(self):
+        pass
+
+    def update(self):
+        pass
+
+    def collision(self):
+        pass
+
+    def draw(self):
+        pass
+
+    def flip(self):
+        pass
+
+    def teardown(self):
+        pass
+
+
+class AsteroidScenario(Scenario):
+    name = 'asteroid'
+    description = "asteroid.py with 500 CodeBlocks and 10k particles"
+    BLOCKS = 500
+    PARTICLES = 10000
+
+    def setup(self):
+        import pygame
+        import asteroid
+        self.pygame = pygame
+        self.asteroid = asteroid
+
+        pygame.init()
+        self.screen = pygame.display.set_mode((asteroid.WIDTH, asteroid.HEIGHT))
+        self.clock = asteroid.SimClock()
+        self.sim = asteroid.Simulation(asteroid.WIDTH, asteroid.HEIGHT, clock=self.clock, seed=0, verbose=False)
+        self.sim.start_level()
+        # Never let a block hit the ship, or every group gets cleared
+        self.sim.player.invincibility_start_time = float('inf')
+        self.hud = asteroid.make_hud(self.sim)
+        self.inputs = asteroid.ScriptedInput(asteroid.DEMO_SCRIPT)
+        self.tick_input = asteroid.NO_INPUT
+        self.frame = 0
+
+    def before_frame(self):
+        asteroid = self.asteroid
+        sim = self.sim
+        self.clock.advance()
+        self.now = self.clock()
+
+        # Keep the block count steady as bullets destroy them
+        rng = sim.rng
+        while len(sim.code_blocks) < self.BLOCKS:
+            angle = rng.uniform(0, 2 * np.pi)
+            speed = rng.uniform(asteroid.CODE_BLOCK_SPEED_MIN, asteroid.CODE_BLOCK_SPEED_MAX)
+            block = asteroid.CodeBlock(
+                (rng.randrange(asteroid.WIDTH), rng.randrange(asteroid.HEIGHT)),
+                (np.cos(angle) * speed, np.sin(angle) * speed),
+                'large', asteroid.WIDTH, asteroid.HEIGHT, rng=rng,
+            )
+            sim.all_sprites.add(block)
+            sim.code_blocks.add(block)
+
+        # ...and the particle count, as particles expire
+        missing = self.PARTICLES - len(sim.particles)
+        while missing > 0:
+            count = min(missing, asteroid.PARTICLE_MAX_PER_BLOCK)
+            position = (rng.randrange(asteroid.WIDTH), rng.randrange(asteroid.HEIGHT))
+            sim.particles.emit(position, "def update(self): pass", count, self.now, spread=20)
+            missing -= count
+
+    def events(self):
+        self.pygame.event.pump()
+        self.tick_input = self.inputs.next_input(self.frame)
+        self.frame += 1
+
+    def update(self):
+        self.sim.apply_input(self.tick_input, self.now)
+        self.sim.update(self.now)
+
+    def collision(self):
+        self.sim.check_collisions(self.now)
+
+    def draw(self):
+        self.asteroid.draw_game(self.screen, self.sim, self.hud)
+
+    def flip(self):
+        self.pygame.display.flip()
+
+
+class MineScenario(Scenario):
+    name = 'mine'
+    description = "mine.py with 1,000 Enemy cats chasing the player"
+    ENEMIES = 1000
+
+    def setup(self):
+        import pygame
+        import mine
+        self.pygame = pygame
+        self.game = mine.Game()
+        self.game.setup(enemy_count=self.ENEMIES)
+
+    def before_frame(self):
+        # Contact damage would end the game within a couple of seconds
+        self.game.player.health = 100
+
+    def events(self):
+        self.game.events()
+
+    def update(self):
+        self.game.update_sprites()
+
+    def collision(self):
+        self.game.check_collisions()
+
+    def draw(self):
+        self.game.draw()
+
+    def flip(self):
+        self.game.present()
+
+
+class MineWorldScenario(MineScenario):
+    name = 'mine-world'
+    description = "mine.py --world with 200 cats per chunk, most of them off screen"
+    ENEMIES = 200 # Per loaded chunk
+
+    def setup(self):
+        import pygame
+        import mine
+        self.pygame = pygame
+        self.game = mine.Game(world=True, seed=0)
+        self.game.setup(enemy_count=self.ENEMIES)
+
+
+class ArcadeRectanglesScenario(Scenario):
+    name = 'arcade'
+    description = "bouncing_rectangle.py Items, 10k rectangles"
+    RECTANGLES = 10000
+
+    def setup(self):
+        import random
+        import arcade
+        import bouncing_rectangle
+        self.window = arcade.Window(bouncing_rectangle.WINDOW_WIDTH, bouncing_rectangle.WINDOW_HEIGHT, self.description)
+
+        rng = random.Random(0)
+        self.items = []
+        for _ in range(self.RECTANGLES):
+            item = bouncing_rectangle.Item()
+            item.center_x = rng.uniform(bouncing_rectangle.RECT_WIDTH, bouncing_rectangle.WINDOW_WIDTH - bouncing_rectangle.RECT_WIDTH)
+            item.center_y = rng.uniform(bouncing_rectangle.RECT_HEIGHT, bouncing_rectangle.WINDOW_HEIGHT - bouncing_rectangle.RECT_HEIGHT)
+            item.change_x = rng.uniform(-3, 3)
+            item.change_y = rng.uniform(-3, 3)
+            self.items.append(item)
+
+    def events(self):
+        self.window.dispatch_events()
+
+    def update(self):
+        for item in self.items:
+            item.update()
+
+    def draw(self):
+        self.window.clear()
+        for item in self.items:
+            item.draw()
+
+    def flip(self):
+        self.window.flip()
+
+    def teardown(self):
+        self.window.close()
+
+
+class SwarmScenario(Scenario):
+    name = 'swarm'
+    description = "bouncing_rectangle.py ItemArray, 10k rectangles (same load as arcade)"
+    RECTANGLES = 10000
+
+    def setup(self):
+        import arcade
+        import bouncing_rectangle
+        self.window = arcade.Window(bouncing_rectangle.WINDOW_WIDTH, bouncing_rectangle.WINDOW_HEIGHT, self.description)
+        self.swarm = bouncing_rectangle.ItemArray(self.RECTANGLES)
+
+    def events(self):
+        self.window.dispatch_events()
+
+    def update(self):
+        self.swarm.update()
+
+    def draw(self):
+        self.window.clear()
+        self.swarm.draw()
+
+    def flip(self):
+        self.window.flip()
+
+    def teardown(self):
+        self.window.close()
+
+
+class TanksScenario(Scenario):
+    name = 'tanks'
+    description = "tanks.py shape list with 10k stress rectangles"
+    RECTANGLES = 10000
+
+    def setup(self):
+        import tanks
+        self.window = tanks.RectangleDrawingGame(tanks.SCREEN_WIDTH, tanks.SCREEN_HEIGHT, self.description, stress_count=self.RECTANGLES)
+        self.window.setup()
+
+    def events(self):
+        self.window.dispatch_events()
+
+    def draw(self):
+        self.window.on_draw()
+
+    def flip(self):
+        self.window.flip()
+
+    def teardown(self):
+        self.window.close()
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (AsteroidScenario, MineScenario, MineWorldScenario, ArcadeRectanglesScenario, SwarmScenario, TanksScenario)}
+
+
+def run_scenario(scenario, frames, warmup):
+    """Runs a scenario and returns the per-phase timings in nanoseconds."""
+    samples = {phase: np.zeros(frames, dtype=np.int64) for phase in PHASES}
+    phase_calls = [(phase, getattr(scenario, phase)) for phase in PHASES]
+    perf_counter_ns = time.perf_counter_ns
+
+    scenario.setup()
+    try:
+        for frame in range(warmup + frames):
+            scenario.before_frame()
+            for phase, call in phase_calls:
+                start = perf_counter_ns()
+                call()
+                elapsed = perf_counter_ns() - start
+                if frame >= warmup:
+                    samples[phase][frame - warmup] = elapsed
+    finally:
+        scenario.teardown()
+    return samples
+
+
+def summarise(samples):
+    """p50/p95/p99 and mean per phase (plus the whole frame), in milliseconds."""
+    total = sum(samples.values())
+    summary = {}
+    for phase, values in list(samples.items()) + [('frame', total)]:
+        ms = values / 1e6
+        stats = {f'p{p}': round(float(np.percentile(ms, p)), 4) for p in PERCENTILES}
+        stats['mean'] = round(float(ms.mean()), 4)
+        summary[phase] = stats
+    return summary
+
+
+def print_summary(name, summary):
+    print(f"\n{name}: {SCENARIOS[name].description}")
+    print(f"  {'phase':<10}" + ''.join(f"{'p%d' % p:>10}" for p in PERCENTILES) + f"{'mean':>10}")
+    for phase, stats in summary.items():
+        print(f"  {phase:<10}" + ''.join(f"{stats['p%d' % p]:>10.3f}" for p in PERCENTILES) + f"{stats['mean']:>10.3f}")
+
+
+def compare(results, baseline, tolerance):
+    """Prints p95 changes against a baseline report; returns the regressed phases."""
+    regressions = []
+    for name, scenario in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        for phase, stats in scenario['phases'].items():
+            before = base['phases'].get(phase, {}).get('p95')
+            if not before:
+                continue
+            change = (stats['p95'] - before) / before
+            marker = ''
+            if change > tolerance:
+                marker = '  <-- regression'
+                regressions.append(f"{name}.{phase}")
+            print(f"  {name}.{phase:<10} p95 {before:8.3f} -> {stats['p95']:8.3f} ms ({change:+.1%}){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run stress-scenario benchmarks and report per-phase frame times.")
+    parser.add_argument('scenarios', nargs='*', metavar='scenario', help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--frames', type=int, default=300, help="timed frames per scenario")
+    parser.add_argument('--warmup', type=int, default=60, help="untimed frames before measuring")
+    parser.add_argument('--output', default='bench_results.json', help="where to write the JSON report")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON report to compare p95 times against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed p95 slowdown before flagging a regression")
+    parser.add_argument('--window', action='store_true', help="render to a real window instead of headless drivers")
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+
+    if not args.window:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'frames': args.frames,
+            'warmup': args.warmup,
+            'headless': not args.window,
+        },
+        'scenarios': {},
+    }
+
+    import pool # After the SDL environment is set up, as it imports pygame
+
+    for name in args.scenarios or list(SCENARIOS):
+        pool.reset_stats()
+        samples = run_scenario(SCENARIOS[name](), args.frames, args.warmup)
+        summary = summarise(samples)
+        pools = {pool_name: stats for pool_name, stats in pool.all_stats().items() if stats['created'] or stats['reused']}
+        results['scenarios'][name] = {'description': SCENARIOS[name].description, 'phases': summary, 'pools': pools}
+        print_summary(name, summary)
+        for pool_name, stats in pools.items():
+            print(f"  pool {pool_name}: {stats['created']} created, {stats['reused']} reused, {stats['free']} free")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparing against {args.compare}:")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,18 @@ on the screen.
 If Python and Arcade are installed, this example can be run
 from the command line with:
 python -m arcade.examples.bouncing_rectangle
+
+Press S to switch between the single rectangle and a swarm of SWARM_SIZE
+rectangles that move in NumPy arrays and are drawn in one instanced call.
+python bouncing_rectangle.py --benchmark times the swarm's update step alone.
 """
 
+import argparse
+import time
+
 import arcade
+import numpy as np
+from arcade.gl import BufferDescription
 
 # --- Set up the constants
 
@@ -23,6 +32,42 @@ RECT_COLOR = arcade.color.DARK_BROWN
 
 BACKGROUND_COLOR = arcade.color.ALMOND
 
+# Swarm mode
+SWARM_SIZE = 100000
+SWARM_MAX_SPEED = 3 # Pixels per frame along each axis
+
+# Draws one rectangle per instance: a unit quad scaled to the rectangle
+# size and moved to that instance's centre
+SWARM_VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform vec2 size;
+
+in vec2 in_vert;
+in vec2 in_center;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_center + in_vert * size, 0.0, 1.0);
+}
+"""
+
+SWARM_FRAGMENT_SHADER = """
+#version 330
+
+uniform vec4 color;
+
+out vec4 fragColor;
+
+void main() {
+    fragColor = color;
+}
+"""
+
 
 class Item:
     """ This class represents our rectangle """
@@ -62,10 +107,59 @@ class Item:
             arcade.rect.XYWH(self.center_x, self.center_y, RECT_WIDTH, RECT_HEIGHT), RECT_COLOR)
 
 
+class ItemArray:
+    """ Many rectangles at once, with their centres and velocities in NumPy arrays """
+
+    def __init__(self, count, seed=0):
+        rng = np.random.default_rng(seed)
+        half_size = np.array([RECT_WIDTH / 2, RECT_HEIGHT / 2], dtype=np.float32)
+
+        # Bounce limits for the centres, as in Item.update
+        self.low = half_size
+        self.high = np.array([WINDOW_WIDTH, WINDOW_HEIGHT], dtype=np.float32) - half_size
+
+        # Where we are, and where we are going (float32 so they go straight to the GPU)
+        self.centers = rng.uniform(self.low, self.high, (count, 2)).astype(np.float32)
+        self.changes = rng.uniform(-SWARM_MAX_SPEED, SWARM_MAX_SPEED, (count, 2)).astype(np.float32)
+
+        self._geometry = None # GL objects, made on the first draw()
+
+    def __len__(self):
+        return len(self.centers)
+
+    def update(self):
+        # Move every rectangle
+        self.centers += self.changes
+        # Bounce the ones past any edge (per axis, like Item.update)
+        self.changes[(self.centers > self.high) | (self.centers < self.low)] *= -1
+
+    def draw(self):
+        # Draw every rectangle in one instanced call
+        if self._geometry is None:
+            self._create_geometry()
+        self._center_buffer.write(self.centers)
+        self._geometry.render(self._program, instances=len(self))
+
+    def _create_geometry(self):
+        ctx = arcade.get_window().ctx
+        self._program = ctx.program(vertex_shader=SWARM_VERTEX_SHADER, fragment_shader=SWARM_FRAGMENT_SHADER)
+        self._program['size'] = (RECT_WIDTH, RECT_HEIGHT)
+        self._program['color'] = tuple(channel / 255 for channel in RECT_COLOR)
+        quad = ctx.buffer(data=np.array([-0.5, -0.5, 0.5, -0.5, -0.5, 0.5, 0.5, 0.5], dtype=np.float32))
+        self._center_buffer = ctx.buffer(reserve=self.centers.nbytes)
+        self._geometry = ctx.geometry(
+            [
+                BufferDescription(quad, '2f', ['in_vert']),
+                BufferDescription(self._center_buffer, '2f', ['in_center'], instanced=True),
+            ],
+            mode=ctx.TRIANGLE_STRIP,
+        )
+
+
 class GameView(arcade.View):
     """ Main application class. """
 
-    def __init__(self):
+    def __init__(self, swarm_size=SWARM_SIZE, swarm=False):
         super().__init__()
 
         # Create our rectangle
@@ -75,29 +169,91 @@ class GameView(arcade.View):
         self.item.change_x = 2
         self.item.change_y = 3
 
+        # The swarm is only built the first time it's shown
+        self.swarm_size = swarm_size
+        self.swarm = None
+        self.swarm_mode = False
+        self.mode_text = arcade.Text("", 10, WINDOW_HEIGHT - 20, arcade.color.BLACK, 12)
+        self.set_swarm_mode(swarm)
+
         # Set background color
         self.background_color = BACKGROUND_COLOR
 
+    def set_swarm_mode(self, swarm_mode):
+        self.swarm_mode = swarm_mode
+        if swarm_mode and self.swarm is None:
+            self.swarm = ItemArray(self.swarm_size)
+        if swarm_mode:
+            self.mode_text.text = f"Swarm: {self.swarm_size:,} rectangles (S for one)"
+        else:
+            self.mode_text.text = "Single rectangle (S for the swarm)"
+
+    def on_key_press(self, key, modifiers):
+        if key == arcade.key.S:
+            self.set_swarm_mode(not self.swarm_mode)
+
     def on_update(self, delta_time):
-        # Move the rectangle
-        self.item.update()
+        # Move the rectangle(s)
+        if self.swarm_mode:
+            self.swarm.update()
+        else:
+            self.item.update()
 
     def on_draw(self):
         """ Render the screen. """
 
         # Clear screen
         self.clear()
-        # Draw the rectangle
-        self.item.draw()
+        # Draw the rectangle(s)
+        if self.swarm_mode:
+            self.swarm.draw()
+        else:
+            self.item.draw()
+        self.mode_text.draw()
+
+
+def benchmark_update(count, frames=100):
+    """ Times ItemArray.update() alone, with no window or drawing """
+    swarm = ItemArray(count)
+    start = time.perf_counter()
+    for _ in range(frames):
+        swarm.update()
+    elapsed = (time.perf_counter() - start) / frames
+    print(f"ItemArray.update: {count:,} rectangles in {elapsed * 1000:.3f} ms per frame ({count / elapsed / 1e6:.1f}M rectangles/s)")
+
+    # The same work one Item at a time, for comparison (fewer frames, it's slow)
+    items = []
+    for center, change in zip(swarm.centers.tolist(), swarm.changes.tolist()):
+        item = Item()
+        item.center_x, item.center_y = center
+        item.change_x, item.change_y = change
+        items.append(item)
+    scalar_frames = max(1, frames // 10)
+    start = time.perf_counter()
+    for _ in range(scalar_frames):
+        for item in items:
+            item.update()
+    elapsed = (time.perf_counter() - start) / scalar_frames
+    print(f"Item.update:      {count:,} rectangles in {elapsed * 1000:.3f} ms per frame")
 
 
 def main():
     """ Main function """
+    parser = argparse.ArgumentParser(description=WINDOW_TITLE)
+    parser.add_argument('--swarm', action='store_true', help="start in swarm mode")
+    parser.add_argument('--count', type=int, default=SWARM_SIZE, help="rectangles in the swarm")
+    parser.add_argument('--benchmark', action='store_true', help="time the swarm's update step headless and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_update(args.count)
+        return
+
     # Create a window class. This is what actually shows up on screen
     window = arcade.Window(WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_TITLE)
 
     # Create the GameView
-    game = GameView()
+    game = GameView(swarm_size=args.count, swarm=args.swarm)
 
     # Show GameView on screen
     window.show_view(game)
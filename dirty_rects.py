@@ -0,0 +1,75 @@
+"""
+Dirty-rect bookkeeping for redrawing only the parts of the screen that change.
+
+Each frame, the regions drawn last frame are restored from the background,
+everything is drawn again and its bounds recorded, and only last frame's and
+this frame's regions are pushed to the display with
+pygame.display.update(rects). When the changed area gets large, one full
+flip is cheaper than many small updates, so the tracker falls back to that.
+"""
+
+import pygame
+
+# Above this fraction of the screen, push the whole frame instead of rects
+FULL_UPDATE_RATIO = 0.5
+
+
+class DirtyRectTracker:
+    """Remembers what was drawn last frame so only changed regions are cleared and pushed."""
+
+    def __init__(self, screen_rect, full_update_ratio=FULL_UPDATE_RATIO):
+        self.screen_rect = pygame.Rect(screen_rect)
+        self.full_update_ratio = full_update_ratio
+        self.previous = [] # Drawn last frame: erased this frame
+        self.current = [] # Drawn this frame
+        self.full_redraw = True # Next present() pushes the whole screen
+        # Stats for profiling
+        self.full_updates = 0
+        self.partial_updates = 0
+
+    def invalidate(self):
+        """Forces the next frame to be pushed in full (e.g. after an overlay)."""
+        self.full_redraw = True
+
+    def reset(self, screen, background):
+        """Repaints the whole background and forgets every region, e.g. after an overlay."""
+        if isinstance(background, pygame.Surface):
+            screen.blit(background, (0, 0))
+        else:
+            screen.fill(background)
+        self.previous = []
+        self.current = []
+        self.full_redraw = True
+
+    def erase(self, screen, background):
+        """Restores last frame's regions. background is a Surface or a fill color."""
+        if isinstance(background, pygame.Surface):
+            for rect in self.previous:
+                screen.blit(background, rect, rect)
+        else:
+            for rect in self.previous:
+                screen.fill(background, rect)
+
+    def add(self, rect):
+        """Records a region drawn this frame."""
+        rect = self.screen_rect.clip(rect)
+        if rect.width and rect.height:
+            self.current.append(rect)
+
+    def extend(self, rects):
+        for rect in rects:
+            self.add(rect)
+
+    def present(self):
+        """Pushes this frame to the display and rolls the regions over to the next frame."""
+        rects = self.previous + self.current
+        dirty_area = sum(rect.width * rect.height for rect in rects)
+        if self.full_redraw or dirty_area > self.full_update_ratio * self.screen_rect.width * self.screen_rect.height:
+            pygame.display.flip()
+            self.full_updates += 1
+        elif rects:
+            pygame.display.update(rects)
+            self.partial_updates += 1
+        self.previous = self.current
+        self.current = []
+        self.full_redraw = False
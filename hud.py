@@ -0,0 +1,136 @@
+"""
+Retained-mode HUD widgets shared by the pygame games.
+
+Each widget is bound to a value (a callable, read once per frame) and keeps
+the surface it last rendered. It only renders again when that value changes,
+so a static label costs one render for the whole game and a score counter
+one per change. The Hud draws every visible widget with a single blits()
+call and returns the rects it touched, for dirty-rect tracking:
+
+    hud = Hud()
+    hud.add(Label("CRAB HEALTH", 18, WHITE, face='arial', midtop=(85, 35)))
+    hud.add(Text(lambda: f"Score: {sim.score}", 30, WHITE, topleft=(10, 10)))
+    hud.add(Bar(lambda: player.health / 100, 150, 20, GREEN, topleft=(10, 10)))
+    rects = hud.draw(screen)
+
+Positions are given as one pygame.Rect keyword (topleft=, midtop=, center=, ...).
+"""
+
+import pygame
+
+import text_cache
+
+OUTLINE_COLOR = (255, 255, 255)
+
+_UNSET = object()
+_bar_surfaces = {} # (length, height, color, fill width, outline, border) -> Surface
+
+
+def bar_surface(length, height, color, fill_width, outline=OUTLINE_COLOR, border=2):
+    """A bar filled fill_width pixels from the left, outlined; cached, so draw it as often as you like."""
+    key = (length, height, tuple(color), fill_width, tuple(outline), border)
+    surface = _bar_surfaces.get(key)
+    if surface is None:
+        surface = pygame.Surface((length, height), pygame.SRCALPHA) # Unfilled part stays see-through
+        pygame.draw.rect(surface, color, (0, 0, fill_width, height))
+        pygame.draw.rect(surface, outline, (0, 0, length, height), border)
+        _bar_surfaces[key] = surface
+    return surface
+
+
+def bar_fill_width(fraction, length, height):
+    """Filled pixels for a fraction (clamped to 0..1), as a Rect of that float width would have."""
+    fraction = min(max(fraction, 0), 1)
+    return pygame.Rect(0, 0, fraction * length, height).width
+
+
+class Widget:
+    """A HUD element that keeps its rendered surface until its value changes."""
+
+    def __init__(self, value, visible=None, **anchor):
+        self.value = value if callable(value) else (lambda: value)
+        self.visible = visible # Optional callable; hidden widgets aren't refreshed or drawn
+        self.anchor = anchor
+        self.surface = None
+        self.rect = None
+        self.renders = 0 # For profiling
+        self._key = _UNSET
+
+    def key(self, value):
+        """What decides whether to re-render; widgets can coarsen the value here."""
+        return value
+
+    def render(self, key):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Re-renders if the bound value changed; returns (surface, rect)."""
+        key = self.key(self.value())
+        if key != self._key:
+            self._key = key
+            self.surface = self.render(key)
+            self.rect = self.surface.get_rect(**self.anchor)
+            self.renders += 1
+        return self.surface, self.rect
+
+
+class Text(Widget):
+    """A line of text, re-rendered when the string changes."""
+
+    def __init__(self, value, size, color, face=None, antialias=True, visible=None, **anchor):
+        super().__init__(value, visible, **anchor)
+        self.size = size
+        self.color = color
+        self.face = face
+        self.antialias = antialias
+
+    def key(self, value):
+        return str(value)
+
+    def render(self, text):
+        return text_cache.get_font(self.size, self.face).render(text, self.antialias, self.color)
+
+
+class Label(Text):
+    """Text that never changes."""
+
+    def __init__(self, text, size, color, face=None, antialias=True, visible=None, **anchor):
+        super().__init__(text, size, color, face, antialias, visible, **anchor)
+
+
+class Bar(Widget):
+    """An outlined bar bound to a fraction (0..1); re-rendered only when the fill changes by a pixel."""
+
+    def __init__(self, value, length, height, color, outline=OUTLINE_COLOR, border=2, visible=None, **anchor):
+        super().__init__(value, visible, **anchor)
+        self.length = length
+        self.height = height
+        self.color = color
+        self.outline = outline
+        self.border = border
+
+    def key(self, fraction):
+        return bar_fill_width(fraction, self.length, self.height)
+
+    def render(self, fill_width):
+        return bar_surface(self.length, self.height, self.color, fill_width, self.outline, self.border)
+
+
+class Hud:
+    """Widgets drawn together, in the order they were added."""
+
+    def __init__(self):
+        self.widgets = []
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        return widget
+
+    def draw(self, surf, extra=()):
+        """
+        Draws every visible widget, then any extra (surface, position) blits,
+        in one blits() call. Returns the rects drawn.
+        """
+        blits = [widget.refresh() for widget in self.widgets if widget.visible is None or widget.visible()]
+        blits.extend(extra)
+        return surf.blits(blits)
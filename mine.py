@@ -1,11 +1,31 @@
-import pygame
-import random
-import math
+import time
+LAUNCH_TIME = time.perf_counter() # See profiler.StartupTimer
+
+import pygame # noqa: E402
+import random # noqa: E402
+import argparse # noqa: E402
+import itertools # noqa: E402
+import math # noqa: E402
+from collections import deque # noqa: E402
+
+import numpy as np # noqa: E402
+
+import hud # noqa: E402
+import profiler # noqa: E402
+import text_cache # noqa: E402
+from dirty_rects import DirtyRectTracker # noqa: E402
+from pool import PooledSprite, SpritePool # noqa: E402
+from spatial_hash import GridIndex, round_half_away # noqa: E402
+from timestep import FixedTimestep # noqa: E402
 
 # --- Constants ---
 SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 768
-FPS = 60
+FPS = 60 # Render frame cap
+TICK_RATE = 60 # Simulation ticks per second, independent of FPS
+MAX_TICKS_PER_FRAME = 5 # Catch-up cap so one slow frame can't snowball
+
+FONT_FACE = 'arial' # HUD and message text
 
 # Colors
 WHITE = (255, 255, 255)
@@ -20,6 +40,34 @@ YELLOW = (255, 255, 0)
 # Player properties
 PLAYER_SPEED = 5
 
+# Dungeon tiles (walls are built from these)
+TILE_SIZE = 32
+TILE_KEY_OFFSET = 1 << 20 # tile_key() packs (col, row) into one int64; this keeps negative tiles apart
+TILE_KEY_STRIDE = 1 << 21
+
+# Enemies spawned by Game.new()
+ENEMY_COUNT = 5
+ENEMY_SIZE = 45
+ENEMY_TILE_SPAN = (ENEMY_SIZE - 1) // TILE_SIZE + 2 # Most tiles a cat can overlap along one axis
+ENEMY_VISION_RADIUS = 250 # How close the player needs to be for a cat to see them
+ENEMY_INDEX_CELL_SIZE = 128 # Grid cell size for finding the cats in view
+ENEMY_DRAW_MARGIN = ENEMY_SIZE # A cat this far outside the view can still overlap it
+ENEMY_HEALTH_BAR_MARGIN = 150 + ENEMY_SIZE # ...and its health bar reaches further
+
+# Large streamed world (--world): a grid of screen-sized chunks generated on demand
+CHUNK_COLS = SCREEN_WIDTH // TILE_SIZE # tiles
+CHUNK_ROWS = SCREEN_HEIGHT // TILE_SIZE
+CHUNK_WIDTH = CHUNK_COLS * TILE_SIZE # pixels
+CHUNK_HEIGHT = CHUNK_ROWS * TILE_SIZE
+WORLD_CHUNKS = (16, 16) # 256 screens
+CHUNK_LOAD_RADIUS = 1 # Chunks this close to the player's (in chunks) are kept loaded
+CHUNK_EVICT_RADIUS = 2 # ...and dropped once further than this, so crossing an edge back and forth doesn't thrash
+CHUNK_DOOR_TILES = 4 # Width of the doorway into each neighbouring chunk
+CHUNK_OBSTACLES = (3, 7) # Min/max obstacle walls per chunk
+
+# Enemy pathfinding: the flow field covers this many tiles either side of the player
+FLOW_FIELD_RADIUS = ENEMY_VISION_RADIUS // TILE_SIZE * 2 + 2
+
 # --- Game Classes ---
 
 class Player(pygame.sprite.Sprite):
@@ -40,6 +88,7 @@ class Player(pygame.sprite.Sprite):
         self.rect.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
         
         self.pos = pygame.math.Vector2(self.rect.center)
+        self.prev_pos = pygame.math.Vector2(self.pos) # For render interpolation
         self.vel = pygame.math.Vector2(0, 0)
         
         self.health = 100
@@ -69,6 +118,7 @@ class Player(pygame.sprite.Sprite):
             self.vel *= 0.7071
 
     def update(self):
+        self.prev_pos.update(self.pos)
         self.get_keys() # This handles movement input
         
         # ---!!! NEW CODE: COMBAT INPUT !!!---
@@ -90,7 +140,7 @@ class Player(pygame.sprite.Sprite):
         self.collide_with_walls('y')
 
     def collide_with_walls(self, dir):
-        hits = pygame.sprite.spritecollide(self, self.game.walls, False)
+        hits = self.game.wall_grid.collide_rect(self.rect)
         if hits:
             if dir == 'x':
                 if self.vel.x > 0:
@@ -106,20 +156,20 @@ class Player(pygame.sprite.Sprite):
                 self.pos.y = self.rect.centery
 
     def shoot(self):
-        now = pygame.time.get_ticks()
+        now = self.game.now
         if now - self.last_shot > self.shot_delay:
             self.last_shot = now
-            bubble = WaterBubble(self.rect.centerx, self.rect.centery, self.direction)
+            bubble = WaterBubble.pool.acquire(self.game, self.rect.centerx, self.rect.centery, self.direction)
             self.game.all_sprites.add(bubble)
             self.game.projectiles.add(bubble)
             
     def melee_attack(self):
-        now = pygame.time.get_ticks()
+        now = self.game.now
         if now - self.last_melee > self.melee_delay:
             self.last_melee = now
             # Create a hitbox in the direction the player is facing
             hitbox_pos = self.pos + self.direction * 30
-            ClawSwipe(self.game, hitbox_pos)
+            ClawSwipe.pool.acquire(self.game, hitbox_pos)
             
     def take_damage(self, amount):
         self.health -= amount
@@ -127,100 +177,438 @@ class Player(pygame.sprite.Sprite):
             self.kill()
 
 class Enemy(pygame.sprite.Sprite):
-    """ The enemy character (The Cat Menace) - WITH CHASE AI """
+    """ The enemy character (The Cat Menace) - WITH CHASE AI
+
+    The chase AI runs for the whole horde at once in EnemyManager. The sprite
+    keeps the image and the rect used for hit tests, and its position, speed
+    and health live in the manager's arrays.
+    """
     def __init__(self, game, x, y):
         super().__init__()
         self.game = game
-        self.image = pygame.Surface((45, 45))
+        self.image = pygame.Surface((ENEMY_SIZE, ENEMY_SIZE))
         self.image.set_colorkey(BLACK)
         pygame.draw.rect(self.image, (128, 128, 128), self.image.get_rect()) # Body
         pygame.draw.circle(self.image, (200,200,0), (10,10), 5) # Left Eye
         pygame.draw.circle(self.image, (200,200,0), (35,10), 5) # Right Eye
         
         self.rect = self.image.get_rect()
-        self.pos = pygame.math.Vector2(x, y)
-        self.rect.center = self.pos
+        self.rect.center = (x, y)
         
-        self.speed = random.uniform(2.5, 4.0)
-        self.health = 100
-        self.vision_radius = 250 # How close the player needs to be for the cat to see them
+        self.manager = game.enemy_manager
+        self.index = None # Slot in the manager's arrays, None once removed
+        self.manager.add(self, x, y, speed=random.uniform(2.5, 4.0), vision_radius=ENEMY_VISION_RADIUS, health=100)
 
-    def update(self):
-        # Basic Chase AI
-        if self.game.player.alive():
-            player_vec = self.game.player.pos
-            enemy_vec = self.pos
-            dist = player_vec.distance_to(enemy_vec)
-            
-            if dist < self.vision_radius:
-                direction = (player_vec - enemy_vec).normalize()
-                self.pos += direction * self.speed
-        
-        self.rect.centerx = self.pos.x
-        self.collide_with_walls('x')
-        self.rect.centery = self.pos.y
-        self.collide_with_walls('y')
-            
-    def collide_with_walls(self, dir):
-        # Similar collision logic to player to prevent walking through walls
-        hits = pygame.sprite.spritecollide(self, self.game.walls, False)
-        if hits:
-            if dir == 'x':
-                if self.pos.x > hits[0].rect.centerx: # coming from right
-                    self.rect.left = hits[0].rect.right
-                else: # coming from left
-                    self.rect.right = hits[0].rect.left
-                self.pos.x = self.rect.centerx
-            if dir == 'y':
-                if self.pos.y > hits[0].rect.centery: # coming from bottom
-                    self.rect.top = hits[0].rect.bottom
-                else: # coming from top
-                    self.rect.bottom = hits[0].rect.top
-                self.pos.y = self.rect.centery
+    # Reads go to the manager's arrays; a removed cat keeps its last values
+    @property
+    def pos(self):
+        if self.index is None:
+            return pygame.math.Vector2(self._pos)
+        return pygame.math.Vector2(self.manager.pos[self.index].tolist())
+
+    @property
+    def prev_pos(self):
+        if self.index is None:
+            return pygame.math.Vector2(self._pos)
+        return pygame.math.Vector2(self.manager.prev_pos[self.index].tolist())
+
+    @property
+    def health(self):
+        if self.index is None:
+            return self._health
+        return self.manager.health[self.index].item()
+
+    @health.setter
+    def health(self, value):
+        if self.index is None:
+            self._health = value # Removed: writing through would hit every cat's slot
+        else:
+            self.manager.health[self.index] = value
 
     def take_damage(self, amount):
         self.health -= amount
         if self.health <= 0:
             self.kill()
 
-class WaterBubble(pygame.sprite.Sprite):
-    """ The player's ranged projectile """
-    def __init__(self, x, y, direction):
+    def kill(self):
+        self.manager.remove(self)
+        super().kill()
+
+class EnemyManager:
+    """
+    Position, speed, vision radius and health of every cat in NumPy arrays.
+
+    update() moves the whole horde in one vectorised pass: vision check,
+    chase step and wall push-out, with the same results as running the old
+    per-cat Enemy.update() in turn. The sprites' rects are synced afterwards
+    so pygame's hit tests and drawing still work on them. The arrays are kept
+    packed: removing a cat moves the last one into its slot.
+    """
+    def __init__(self, game, capacity=64):
+        self.game = game
+        self.count = 0
+        self.sprites = [] # Index -> Enemy
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2)) # For render interpolation
+        self.rect_pos = np.zeros((capacity, 2), dtype=np.int64) # Rect top-left, as pygame rounds it
+        self.speed = np.zeros(capacity)
+        self.vision_radius = np.zeros(capacity)
+        self.health = np.zeros(capacity, dtype=np.int64)
+        self.grid = GridIndex(ENEMY_INDEX_CELL_SIZE) # Rebuilt from pos when first queried after a change
+        self._grid_stale = False
+        self.set_walls([])
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        for name in ('pos', 'prev_pos', 'rect_pos', 'speed', 'vision_radius', 'health'):
+            array = getattr(self, name)
+            grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add(self, enemy, x, y, speed, vision_radius, health):
+        if self.count == len(self.pos):
+            self._grow()
+        index = self.count
+        self.count += 1
+        self.sprites.append(enemy)
+        enemy.index = index
+        self.pos[index] = self.prev_pos[index] = (x, y)
+        self.rect_pos[index] = enemy.rect.topleft
+        self.speed[index] = speed
+        self.vision_radius[index] = vision_radius
+        self.health[index] = health
+        self._grid_stale = True
+
+    def remove(self, enemy):
+        index = enemy.index
+        if index is None:
+            return
+        enemy._pos = tuple(self.pos[index].tolist())
+        enemy._health = self.health[index].item()
+        enemy.index = None
+
+        last = self.count - 1
+        if index != last:
+            moved = self.sprites[last]
+            self.sprites[index] = moved
+            moved.index = index
+            for array in (self.pos, self.prev_pos, self.rect_pos, self.speed, self.vision_radius, self.health):
+                array[index] = array[last]
+        self.sprites.pop()
+        self.count = last
+        self._grid_stale = True
+
+    def clear(self):
+        for enemy in self.sprites:
+            enemy.index = None
+            enemy._pos = (0, 0)
+            enemy._health = 0
+        self.sprites = []
+        self.count = 0
+        self._grid_stale = True
+
+    def set_walls(self, walls):
+        """
+        Copies the wall rects (in the order hits should be resolved) into
+        arrays, and files each wall's index under every tile it covers, like
+        TileGrid, so a cat is only tested against the walls on its own tiles.
+        """
+        rects = np.array([tuple(wall.rect) for wall in walls], dtype=np.int64).reshape(-1, 4)
+        # Per axis: (near edge, far edge, centre), matching Rect.left/right/centerx etc.
+        self._walls_lo = rects[:, 0:2]
+        self._walls_hi = rects[:, 0:2] + rects[:, 2:4]
+        self._walls_center = rects[:, 0:2] + rects[:, 2:4] // 2
+
+        # One (tile, wall) pair per tile each wall covers, sorted by tile then wall
+        first_tile = self._walls_lo // TILE_SIZE
+        tile_counts = (self._walls_hi - 1) // TILE_SIZE - first_tile + 1
+        per_wall = tile_counts[:, 0] * tile_counts[:, 1]
+        wall_index = np.repeat(np.arange(len(rects)), per_wall)
+        local = np.arange(len(wall_index)) - np.repeat(np.cumsum(per_wall) - per_wall, per_wall)
+        rows = tile_counts[wall_index, 1]
+        keys = tile_key(first_tile[wall_index, 0] + local // rows, first_tile[wall_index, 1] + local % rows)
+        order = np.lexsort((wall_index, keys))
+        self._tile_keys, self._tile_start, self._tile_count = np.unique(keys[order], return_index=True, return_counts=True)
+        self._tile_walls = wall_index[order]
+
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        pos = self.pos[:n]
+        self.prev_pos[:n] = pos
+
+        # Chase AI: every cat that can see the player steps toward them, following
+        # the flow field around walls, or straight at them once there's no wall between
+        player = self.game.player
+        if player.alive():
+            offset = np.array((player.pos.x, player.pos.y)) - pos
+            dist = np.sqrt(offset[:, 0] * offset[:, 0] + offset[:, 1] * offset[:, 1])
+            chasing = np.flatnonzero((dist < self.vision_radius[:n]) & (dist > 0))
+            direction = offset[chasing] / dist[chasing, None]
+            flow_field = self.game.flow_field
+            flow_field.update(player.pos)
+            field_direction, on_field = flow_field.sample(pos[chasing])
+            direction[on_field] = field_direction[on_field]
+            pos[chasing] += direction * self.speed[chasing, None]
+
+        self._collide_walls(0)
+        self._collide_walls(1)
+
+        for enemy, topleft in zip(self.sprites, self.rect_pos[:n].tolist()):
+            enemy.rect.topleft = topleft
+        self._grid_stale = True
+
+    def _collide_walls(self, axis):
+        """Moves every rect to its new position along one axis and pushes it out of walls."""
+        n = self.count
+        half = ENEMY_SIZE // 2
+        coord = self.pos[:n, axis]
+        rect_pos = self.rect_pos[:n]
+        rect_pos[:, axis] = round_half_away(coord) - half # rect.centerx = pos.x
+        if not len(self._walls_lo):
+            return
+
+        # Candidate (cat, wall) pairs: the walls filed under each tile a cat covers
+        first_tile = rect_pos // TILE_SIZE
+        last_tile = (rect_pos + ENEMY_SIZE - 1) // TILE_SIZE
+        cats, cols, rows = [], [], []
+        for dx in range(ENEMY_TILE_SPAN):
+            for dy in range(ENEMY_TILE_SPAN):
+                inside = np.flatnonzero((first_tile[:, 0] + dx <= last_tile[:, 0]) & (first_tile[:, 1] + dy <= last_tile[:, 1]))
+                cats.append(inside)
+                cols.append(first_tile[inside, 0] + dx)
+                rows.append(first_tile[inside, 1] + dy)
+        cats = np.concatenate(cats)
+        keys = tile_key(np.concatenate(cols), np.concatenate(rows))
+        slots = np.minimum(np.searchsorted(self._tile_keys, keys), len(self._tile_keys) - 1)
+        found = self._tile_keys[slots] == keys
+        cats, slots = cats[found], slots[found]
+        counts = self._tile_count[slots]
+        cats = np.repeat(cats, counts)
+        starts = np.repeat(self._tile_start[slots] - (np.cumsum(counts) - counts), counts)
+        walls = self._tile_walls[starts + np.arange(len(cats))]
+
+        # The same rect overlap test as before, on just those pairs
+        left = rect_pos[cats, 0]
+        top = rect_pos[cats, 1]
+        overlap = ((left < self._walls_hi[walls, 0]) & (left + ENEMY_SIZE > self._walls_lo[walls, 0])
+                   & (top < self._walls_hi[walls, 1]) & (top + ENEMY_SIZE > self._walls_lo[walls, 1]))
+        first = np.full(n, len(self._walls_lo))
+        np.minimum.at(first, cats[overlap], walls[overlap]) # Like hits[0]: the earliest wall added
+        hit = np.flatnonzero(first < len(self._walls_lo))
+        if not hit.size:
+            return
+        first = first[hit]
+        # Coming from the far side: snap to the wall's far edge, otherwise to its near edge
+        from_far = coord[hit] > self._walls_center[first, axis]
+        pushed = np.where(from_far, self._walls_hi[first, axis], self._walls_lo[first, axis] - ENEMY_SIZE)
+        rect_pos[hit, axis] = pushed
+        coord[hit] = pushed + half # pos.x = rect.centerx
+
+    def render_topleft(self, alpha, indices=slice(None)):
+        """Where to draw the cats, between their last two tick positions."""
+        n = self.count
+        prev = self.prev_pos[:n][indices]
+        centers = prev + (self.pos[:n][indices] - prev) * alpha
+        return round_half_away(centers).astype(np.int64) - ENEMY_SIZE // 2
+
+    def grid_index(self):
+        """A GridIndex of where the cats are now, for finding the ones in view."""
+        if self._grid_stale:
+            self.grid.build(self.pos[:self.count])
+            self._grid_stale = False
+        return self.grid
+
+    def blit_sequence(self, alpha, offset=(0, 0), indices=None):
+        """(image, screen position) pairs for Surface.blits(), for every cat or just those indices."""
+        if indices is None:
+            indices = np.arange(self.count)
+        topleft = self.render_topleft(alpha, indices) + offset
+        sprites = self.sprites
+        return list(zip([sprites[index].image for index in indices.tolist()], map(tuple, topleft.tolist())))
+
+    def damaged(self, indices=None):
+        """Indices of cats that have lost health, out of every cat or just those indices."""
+        if indices is None:
+            return np.flatnonzero(self.health[:self.count] < 100)
+        return indices[self.health[indices] < 100]
+
+class WaterBubble(PooledSprite):
+    """ The player's ranged projectile, recycled through WaterBubble.pool """
+    shared_image = None # One image for every bubble, drawn on first use
+
+    def __init__(self, game, x, y, direction):
         super().__init__()
-        self.image = pygame.Surface((15, 15))
-        self.image.set_colorkey(BLACK)
-        pygame.draw.circle(self.image, BLUE, (8, 8), 7)
+        if WaterBubble.shared_image is None:
+            WaterBubble.shared_image = pygame.Surface((15, 15))
+            WaterBubble.shared_image.set_colorkey(BLACK)
+            pygame.draw.circle(WaterBubble.shared_image, BLUE, (8, 8), 7)
+        self.image = WaterBubble.shared_image
         self.rect = self.image.get_rect()
-        self.pos = pygame.math.Vector2(x, y)
+        self.pos = pygame.math.Vector2()
+        self.prev_pos = pygame.math.Vector2() # For render interpolation
+        self.vel = pygame.math.Vector2()
+        self.reset(game, x, y, direction)
+
+    def reset(self, game, x, y, direction):
+        self.game = game
+        self.pos.update(x, y)
+        self.prev_pos.update(self.pos)
         self.rect.center = self.pos
-        self.vel = direction * 10 # Speed of 10 in the given direction
-        self.spawn_time = pygame.time.get_ticks()
+        self.vel.update(direction * 10) # Speed of 10 in the given direction
+        self.spawn_time = game.now
 
     def update(self):
+        self.prev_pos.update(self.pos)
         self.pos += self.vel
         self.rect.center = self.pos
         # Kill after 1 second to prevent them flying forever
-        if pygame.time.get_ticks() - self.spawn_time > 1000:
+        if self.game.now - self.spawn_time > 1000:
             self.kill()
 
-class ClawSwipe(pygame.sprite.Sprite):
-    """ A short-lived hitbox for the player's melee attack """
+class ClawSwipe(PooledSprite):
+    """ A short-lived hitbox for the player's melee attack, recycled through ClawSwipe.pool """
+    shared_image = None # One image for every swipe, drawn on first use
+
     def __init__(self, game, pos):
-        self.groups = game.all_sprites, game.melee_hits
-        pygame.sprite.Sprite.__init__(self, self.groups)
-        self.game = game
-        self.image = pygame.Surface((30, 30))
-        self.image.set_colorkey(BLACK)
-        pygame.draw.circle(self.image, YELLOW, (15,15), 15)
+        super().__init__()
+        if ClawSwipe.shared_image is None:
+            ClawSwipe.shared_image = pygame.Surface((30, 30))
+            ClawSwipe.shared_image.set_colorkey(BLACK)
+            pygame.draw.circle(ClawSwipe.shared_image, YELLOW, (15,15), 15)
+        self.image = ClawSwipe.shared_image
         self.rect = self.image.get_rect()
-        self.rect.center = pos
-        self.spawn_time = pygame.time.get_ticks()
         self.lifetime = 100 # lives for 100ms
+        self.reset(game, pos)
+
+    def reset(self, game, pos):
+        self.game = game
+        self.add(game.all_sprites, game.melee_hits)
+        self.rect.center = pos
+        self.spawn_time = game.now
 
     def update(self):
-        if pygame.time.get_ticks() - self.spawn_time > self.lifetime:
+        if self.game.now - self.spawn_time > self.lifetime:
             self.kill()
 
+WaterBubble.pool = SpritePool('mine.WaterBubble', WaterBubble)
+ClawSwipe.pool = SpritePool('mine.ClawSwipe', ClawSwipe)
+
+class FlowField:
+    """
+    Which way to walk from every tile to reach the player, shared by all cats.
+
+    One breadth-first search over the tiles, starting from the player's
+    tile, gives each nearby tile its walking distance to the player. A tile
+    only counts as open if a cat (clearance pixels wide) centred on it would
+    not touch a wall. Each tile then points at the centre of its neighbour
+    with the smallest distance (diagonals only where neither side is blocked,
+    so nothing cuts a corner). The search covers a window of FLOW_FIELD_RADIUS
+    tiles around the player and is only redone when the player steps onto a
+    different tile, so a cat looking up its direction is one array read
+    however many cats there are.
+    """
+    # Orthogonal steps first, then diagonals
+    NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+    def __init__(self, wall_grid, clearance=ENEMY_SIZE, radius=FLOW_FIELD_RADIUS):
+        self.wall_grid = wall_grid
+        self.tile_size = wall_grid.tile_size
+        self.clearance = clearance
+        self.radius = radius
+        self.size = radius * 2 + 1
+        self.target = None # Player's (col, row) the field was built for
+        self.origin = (0, 0) # (col, row) of the window's top-left tile
+        self.waypoints = np.zeros((self.size, self.size, 2)) # [row, col] -> centre of the next tile
+        self.has_waypoint = np.zeros((self.size, self.size), dtype=bool)
+        self._open = {} # (col, row) -> whether a cat fits there, the walls don't move
+        self.rebuilds = 0 # For profiling
+
+    def invalidate(self, area=None):
+        """Forces a rebuild on the next update() after walls change, in area (a world rect) or anywhere."""
+        self.target = None
+        if area is None:
+            self._open.clear()
+            return
+        # A cat centred on a tile reaches into the next one, so widen the area by a tile
+        size = self.tile_size
+        area = pygame.Rect(area).inflate(size * 2, size * 2)
+        for tile in [tile for tile in self._open if area.collidepoint(tile[0] * size, tile[1] * size)]:
+            del self._open[tile]
+
+    def is_open(self, col, row):
+        tile = (col, row)
+        is_open = self._open.get(tile)
+        if is_open is None:
+            rect = pygame.Rect(0, 0, self.clearance, self.clearance)
+            rect.center = ((col + 0.5) * self.tile_size, (row + 0.5) * self.tile_size)
+            is_open = self._open[tile] = not self.wall_grid.collide_rect(rect)
+        return is_open
+
+    def update(self, pos):
+        """Rebuilds the field if the player has moved onto another tile."""
+        size = self.tile_size
+        target = (int(pos.x // size), int(pos.y // size))
+        if target != self.target:
+            self.target = target
+            self._rebuild()
+
+    def _rebuild(self):
+        self.rebuilds += 1
+        radius, size = self.radius, self.size
+        target_col, target_row = self.target
+        first_col, first_row = target_col - radius, target_row - radius
+        self.origin = (first_col, first_row)
+
+        # Breadth-first search outward from the player's tile
+        is_open = self.is_open
+        unreached = size * size
+        dist = [[unreached] * size for _ in range(size)]
+        dist[radius][radius] = 0
+        queue = deque([(radius, radius)])
+        while queue:
+            col, row = queue.popleft()
+            step = dist[row][col] + 1
+            for dcol, drow in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                c, r = col + dcol, row + drow
+                if 0 <= c < size and 0 <= r < size and dist[r][c] == unreached and is_open(first_col + c, first_row + r):
+                    dist[r][c] = step
+                    queue.append((c, r))
+
+        # Point every tile at its closest neighbour. Tiles just outside the
+        # search (e.g. a cat squeezed against a wall) still lead back onto it.
+        dist = np.array(dist)
+        padded = np.pad(dist, 1, constant_values=unreached)
+        best = dist.copy()
+        steps = np.zeros((size, size, 2), dtype=np.int64)
+        for dcol, drow in self.NEIGHBOURS:
+            neighbour = padded[1 + drow:1 + drow + size, 1 + dcol:1 + dcol + size]
+            better = neighbour < best
+            if dcol and drow:
+                better &= padded[1 + drow:1 + drow + size, 1:1 + size] < unreached
+                better &= padded[1:1 + size, 1 + dcol:1 + dcol + size] < unreached
+            best = np.where(better, neighbour, best)
+            steps[better] = (dcol, drow)
+        cols, rows = np.meshgrid(np.arange(size), np.arange(size))
+        tiles = np.stack((cols, rows), axis=-1) + self.origin + steps
+        self.waypoints = (tiles + 0.5) * self.tile_size
+        self.has_waypoint = best < dist
+
+    def sample(self, positions):
+        """Unit directions for an (n, 2) array of positions, and which of them are on the field."""
+        tiles = np.floor_divide(positions, self.tile_size).astype(np.int64) - self.origin
+        cols, rows = tiles[:, 0], tiles[:, 1]
+        on_field = (cols >= 0) & (cols < self.size) & (rows >= 0) & (rows < self.size)
+        on_field[on_field] = self.has_waypoint[rows[on_field], cols[on_field]]
+        directions = np.zeros((len(positions), 2))
+        offset = self.waypoints[rows[on_field], cols[on_field]] - positions[on_field]
+        directions[on_field] = offset / np.hypot(offset[:, 0], offset[:, 1])[:, None]
+        return directions, on_field
+
 class Wall(pygame.sprite.Sprite):
     """ A Wall block for the dungeon """
     def __init__(self, x, y, w, h):
@@ -231,58 +619,248 @@ class Wall(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
 
+class TileGrid:
+    """
+    Walls filed under every tile they cover.
+
+    Finding the walls touching a rect only looks at the handful of tiles the
+    rect overlaps instead of every wall in the dungeon. Hits come back in the
+    order the walls were added, the same order spritecollide() would give.
+    """
+    def __init__(self, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self.cells = {} # (col, row) -> walls overlapping that tile
+        self._order = {} # wall -> insertion index
+        self._next_order = itertools.count() # Never reused, even after removals
+
+    def tiles_for(self, rect):
+        """The (col, row) of every tile a rect overlaps."""
+        size = self.tile_size
+        cols = range(rect.left // size, (rect.right - 1) // size + 1)
+        rows = range(rect.top // size, (rect.bottom - 1) // size + 1)
+        return [(col, row) for col in cols for row in rows]
+
+    def add(self, wall):
+        self._order[wall] = next(self._next_order)
+        for tile in self.tiles_for(wall.rect):
+            self.cells.setdefault(tile, []).append(wall)
+
+    def remove(self, wall):
+        for tile in self.tiles_for(wall.rect):
+            walls = self.cells.get(tile)
+            if walls and wall in walls:
+                walls.remove(wall)
+                if not walls:
+                    del self.cells[tile]
+        self._order.pop(wall, None)
+
+    def is_blocked(self, col, row):
+        return (col, row) in self.cells
+
+    def collide_rect(self, rect):
+        """Walls overlapping rect, in the order they were added."""
+        cells = self.cells
+        hits = set()
+        for tile in self.tiles_for(rect):
+            walls = cells.get(tile)
+            if walls:
+                for wall in walls:
+                    if rect.colliderect(wall.rect):
+                        hits.add(wall)
+        if len(hits) > 1:
+            return sorted(hits, key=self._order.__getitem__)
+        return list(hits)
+
+class DungeonGenerator:
+    """
+    Seeded, chunk-at-a-time layout for the large world.
+
+    Every chunk is a room walled on all sides, with a doorway in the middle
+    of each side that has a neighbour, and a few obstacle walls inside. Each
+    chunk's Random is seeded from the world seed and the chunk's position,
+    so a chunk comes out the same whenever it is (re)generated, in any order.
+    """
+    def __init__(self, seed, world_chunks=WORLD_CHUNKS):
+        self.seed = seed
+        self.world_chunks = world_chunks
+
+    def contains(self, chunk):
+        cols, rows = self.world_chunks
+        return 0 <= chunk[0] < cols and 0 <= chunk[1] < rows
+
+    def chunk_rng(self, chunk):
+        return random.Random(f"{self.seed}:{chunk[0]}:{chunk[1]}")
+
+    def wall_rects(self, chunk, rng):
+        """The chunk's walls as (x, y, w, h) in world pixels."""
+        col, row = chunk
+        cols, rows = CHUNK_COLS, CHUNK_ROWS
+        tiles = [] # (col, row, w, h) in tiles, relative to the chunk
+
+        # Outer walls, split around a doorway wherever there's a neighbour
+        door_col = (cols - CHUNK_DOOR_TILES) // 2
+        door_row = (rows - CHUNK_DOOR_TILES) // 2
+        for neighbour, edge_row in (((col, row - 1), 0), ((col, row + 1), rows - 1)):
+            if self.contains(neighbour):
+                tiles.append((0, edge_row, door_col, 1))
+                tiles.append((door_col + CHUNK_DOOR_TILES, edge_row, cols - door_col - CHUNK_DOOR_TILES, 1))
+            else:
+                tiles.append((0, edge_row, cols, 1))
+        for neighbour, edge_col in (((col - 1, row), 0), ((col + 1, row), cols - 1)):
+            if self.contains(neighbour):
+                tiles.append((edge_col, 1, 1, door_row - 1))
+                tiles.append((edge_col, door_row + CHUNK_DOOR_TILES, 1, rows - 1 - door_row - CHUNK_DOOR_TILES))
+            else:
+                tiles.append((edge_col, 1, 1, rows - 2))
+
+        # Obstacles, kept off the middle of the room so the doorways stay connected
+        middle = pygame.Rect(door_col, door_row, CHUNK_DOOR_TILES, CHUNK_DOOR_TILES)
+        for _ in range(rng.randint(*CHUNK_OBSTACLES)):
+            length = rng.randint(2, 6)
+            w, h = (length, 1) if rng.random() < 0.5 else (1, length)
+            obstacle = pygame.Rect(rng.randint(3, cols - 3 - w), rng.randint(3, rows - 3 - h), w, h)
+            if not obstacle.colliderect(middle.inflate(4, 4)):
+                tiles.append(tuple(obstacle))
+
+        x0, y0 = col * CHUNK_WIDTH, row * CHUNK_HEIGHT
+        return [(x0 + c * TILE_SIZE, y0 + r * TILE_SIZE, w * TILE_SIZE, h * TILE_SIZE) for c, r, w, h in tiles]
+
+class Chunk:
+    """ One loaded piece of the large world """
+    def __init__(self, key, walls):
+        self.key = key # (col, row) in chunks
+        self.walls = walls
+        self.rect = pygame.Rect(key[0] * CHUNK_WIDTH, key[1] * CHUNK_HEIGHT, CHUNK_WIDTH, CHUNK_HEIGHT)
+
+def chunk_of(x, y):
+    """The (col, row) of the chunk containing a world position."""
+    return (int(x // CHUNK_WIDTH), int(y // CHUNK_HEIGHT))
+
+class Camera:
+    """ The part of the world on screen: follows the player, but never past the world's edges """
+    def __init__(self, width, height, world_rect):
+        self.rect = pygame.Rect(0, 0, width, height)
+        self.world_rect = pygame.Rect(world_rect)
+
+    def follow(self, center):
+        """Centres on a world position. Returns True if the view moved."""
+        old = self.rect.topleft
+        self.rect.center = center
+        self.rect.clamp_ip(self.world_rect)
+        return self.rect.topleft != old
+
+    @property
+    def offset(self):
+        """What to add to a world position to get a screen position."""
+        return (-self.rect.x, -self.rect.y)
+
+    def query(self, index, margin=0):
+        """Indices of the points in a GridIndex within about margin pixels of the view."""
+        view = self.rect
+        return index.query_rect(view.left - margin, view.top - margin, view.right + margin, view.bottom + margin)
+
+    def visible_sprites(self, sprites, alpha):
+        """(image, screen rect) pairs for the sprites that overlap the view."""
+        view = self.rect
+        ox, oy = self.offset
+        visible = []
+        for sprite in sprites:
+            rect = render_rect(sprite, alpha)
+            if rect.colliderect(view):
+                visible.append((sprite.image, rect.move(ox, oy)))
+        return visible
+
 # --- UI Functions ---
-def draw_health_bar(surf, x, y, pct, color):
-    if pct < 0: pct = 0
-    BAR_LENGTH, BAR_HEIGHT = 150, 20
-    fill = (pct / 100) * BAR_LENGTH
-    outline_rect = pygame.Rect(x, y, BAR_LENGTH, BAR_HEIGHT)
-    fill_rect = pygame.Rect(x, y, fill, BAR_HEIGHT)
-    pygame.draw.rect(surf, color, fill_rect)
-    pygame.draw.rect(surf, WHITE, outline_rect, 2)
-
-def draw_cooldown_bar(surf, x, y, pct, color):
-    if pct > 1: pct = 1
-    if pct < 0: pct = 0
-    BAR_LENGTH, BAR_HEIGHT = 100, 15
-    fill = pct * BAR_LENGTH
-    outline_rect = pygame.Rect(x, y, BAR_LENGTH, BAR_HEIGHT)
-    fill_rect = pygame.Rect(x, y, fill, BAR_HEIGHT)
-    pygame.draw.rect(surf, color, fill_rect)
-    pygame.draw.rect(surf, WHITE, outline_rect, 2)
+HEALTH_BAR_SIZE = (150, 20)
+COOLDOWN_BAR_SIZE = (100, 15)
+
+def health_bar_surface(pct, color):
+    """The (cached) health bar image for pct (0-100) health."""
+    fill = hud.bar_fill_width(pct / 100, *HEALTH_BAR_SIZE)
+    return hud.bar_surface(*HEALTH_BAR_SIZE, color, fill, WHITE)
+
+def render_rect(sprite, alpha):
+    """Where to draw a sprite, between its previous and current tick positions."""
+    if not hasattr(sprite, 'prev_pos'):
+        return sprite.rect # Doesn't move
+    rect = sprite.rect.copy()
+    rect.center = sprite.prev_pos.lerp(sprite.pos, alpha)
+    return rect
+
+def tile_key(cols, rows):
+    """One int64 per (col, row) tile, for sorting and searching tiles in arrays."""
+    return (np.asarray(cols, dtype=np.int64) + TILE_KEY_OFFSET) * TILE_KEY_STRIDE + (np.asarray(rows, dtype=np.int64) + TILE_KEY_OFFSET)
 
 def draw_text(surf, text, size, x, y, color):
-    font = pygame.font.Font(pygame.font.match_font('arial'), size)
-    text_surface = font.render(text, True, color)
+    text_surface = text_cache.render_text(text, size, color, face=FONT_FACE) # Font lookup is cached
     text_rect = text_surface.get_rect()
     text_rect.midtop = (x, y)
     surf.blit(text_surface, text_rect)
+    return text_rect
 
 class Game:
     """ The main Game class to orchestrate everything """
-    def __init__(self):
-        pygame.init()
-        pygame.mixer.init()
+    def __init__(self, world=False, seed=None, startup=None):
+        pygame.display.init() # The font module starts inside text_cache when the HUD first needs it
+        text_cache.resolve_fonts([FONT_FACE]) # From the paths saved by the last launch, if any
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Crab's Dungeon")
         self.clock = pygame.time.Clock()
+        self.timestep = FixedTimestep(TICK_RATE, MAX_TICKS_PER_FRAME)
+        self.dirty = DirtyRectTracker(self.screen.get_rect()) # Only changed regions get redrawn and pushed
+        self.hud = self.make_hud()
+        self.profiler = profiler.FrameProfiler('mine') # F3: overlay, F4: dump CSV
         self.running = True
         self.game_over = False
+        self.world = world # Stream a large chunked dungeon instead of the single-screen one
+        self.seed = seed # World seed, random if None
+        self.startup = startup # profiler.StartupTimer for --measure-startup: quit after the first frame
+        if startup is not None:
+            startup.mark('init')
 
     def new(self):
+        self.setup()
+        if self.startup is not None:
+            self.startup.mark('setup')
+        self.run()
+
+    def make_hud(self):
+        """The player's health and cooldown bars and their labels; each re-renders only when it changes."""
+        game_hud = hud.Hud()
+        game_hud.add(hud.Bar(lambda: self.player.health / 100, *HEALTH_BAR_SIZE, GREEN, WHITE, topleft=(10, 10)))
+        game_hud.add(hud.Label("CRAB HEALTH", 18, WHITE, face=FONT_FACE, midtop=(85, 35)))
+        game_hud.add(hud.Bar(lambda: (self.now - self.player.last_shot) / self.player.shot_delay, *COOLDOWN_BAR_SIZE, BLUE, WHITE, topleft=(10, 60)))
+        game_hud.add(hud.Label("Bubble Shot (F)", 15, WHITE, face=FONT_FACE, midtop=(60, 80)))
+        game_hud.add(hud.Bar(lambda: (self.now - self.player.last_melee) / self.player.melee_delay, *COOLDOWN_BAR_SIZE, YELLOW, WHITE, topleft=(10, 100)))
+        game_hud.add(hud.Label("Claw Swipe (Space)", 15, WHITE, face=FONT_FACE, midtop=(75, 120)))
+        return game_hud
+
+    def setup(self, enemy_count=ENEMY_COUNT):
+        # Game time, advanced one fixed tick at a time
+        self.ticks = 0
+        self.now = 0 # milliseconds
+        self.timestep.reset()
+
         # Group setup
         self.all_sprites = pygame.sprite.Group()
         self.walls = pygame.sprite.Group()
+        self.wall_grid = TileGrid() # Walls indexed by tile for collision lookups
         self.enemies = pygame.sprite.Group()
         self.projectiles = pygame.sprite.Group()
         self.melee_hits = pygame.sprite.Group()
+        self.enemy_manager = EnemyManager(self) # Moves every cat in one vectorised pass
 
         # Player
         self.player = Player(self)
         self.all_sprites.add(self.player)
 
+        if self.world:
+            self.setup_world(enemy_count)
+            return
+
         # Dungeon layout
-        wall_size = 32
+        self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT, self.screen.get_rect()) # The whole dungeon fits on screen
+        wall_size = TILE_SIZE
         for x in range(0, SCREEN_WIDTH, wall_size):
             self.make_wall(x, 0, wall_size, wall_size) # Top wall
             self.make_wall(x, SCREEN_HEIGHT - wall_size, wall_size, wall_size) # Bottom wall
@@ -294,34 +872,169 @@ class Game:
         self.make_wall(600, 500, wall_size * 5, wall_size)
         self.make_wall(200, 600, wall_size, wall_size * 4)
 
+        self.enemy_manager.set_walls(self.walls)
+        self.flow_field = FlowField(self.wall_grid) # Shared pathfinding toward the player
+
+        # The dungeon never changes, so bake it into the background once
+        self.background = self.bake_background()
+        self.dirty.reset(self.screen, self.background)
+
         # Enemies
-        for i in range(5):
+        for i in range(enemy_count):
             x = random.randrange(wall_size * 2, SCREEN_WIDTH - wall_size * 2)
             y = random.randrange(wall_size * 2, SCREEN_HEIGHT - wall_size * 2)
-            enemy = Enemy(self, x, y)
-            self.all_sprites.add(enemy)
+            enemy = Enemy(self, x, y) # Moved and drawn by the enemy manager, not all_sprites
             self.enemies.add(enemy)
 
-        self.run()
+    def setup_world(self, enemy_count):
+        """Starts the player in the middle of a large world, streamed in chunk by chunk."""
+        seed = random.randrange(2 ** 32) if self.seed is None else self.seed
+        self.dungeon = DungeonGenerator(seed)
+        self.chunks = {} # (col, row) -> Chunk, only those near the player
+        self.chunk_enemies = {} # Cats left in evicted chunks, restored when they load again
+        self.chunk_enemy_count = enemy_count # Cats in a chunk the first time it loads
+        self.player_chunk = None
+        world_cols, world_rows = WORLD_CHUNKS
+        self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, world_cols * CHUNK_WIDTH, world_rows * CHUNK_HEIGHT))
+
+        start = ((world_cols // 2 + 0.5) * CHUNK_WIDTH, (world_rows // 2 + 0.5) * CHUNK_HEIGHT)
+        player = self.player
+        player.pos.update(start)
+        player.prev_pos.update(start)
+        player.rect.center = player.pos
+
+        self.enemy_manager.set_walls(self.walls)
+        self.flow_field = FlowField(self.wall_grid)
+        self.stream_chunks()
+        self.camera.follow(player.rect.center)
+        self.background = pygame.Surface(self.screen.get_size()).convert() # Redrawn whenever the camera moves
+        self.compose_background()
+        self.dirty.reset(self.screen, self.background)
+
+    def stream_chunks(self):
+        """Loads the chunks around the player and evicts far ones, when the player changes chunk."""
+        center = chunk_of(self.player.pos.x, self.player.pos.y)
+        if center == self.player_chunk:
+            return
+        self.player_chunk = center
+
+        changed = [key for key in self.chunks if max(abs(key[0] - center[0]), abs(key[1] - center[1])) > CHUNK_EVICT_RADIUS]
+        for key in changed:
+            self.evict_chunk(key)
+        radius = CHUNK_LOAD_RADIUS
+        for row in range(center[1] - radius, center[1] + radius + 1):
+            for col in range(center[0] - radius, center[0] + radius + 1):
+                key = (col, row)
+                if key not in self.chunks and self.dungeon.contains(key):
+                    self.load_chunk(key)
+                    changed.append(key)
+        if not changed:
+            return
+
+        # The walls changed, so redo everything built from them
+        self.enemy_manager.set_walls(self.walls)
+        for key in changed:
+            self.flow_field.invalidate((key[0] * CHUNK_WIDTH, key[1] * CHUNK_HEIGHT, CHUNK_WIDTH, CHUNK_HEIGHT))
+        self.camera_moved = True
+
+    def load_chunk(self, key):
+        rng = self.dungeon.chunk_rng(key)
+        walls = [self.make_wall(*rect) for rect in self.dungeon.wall_rects(key, rng)]
+        chunk = self.chunks[key] = Chunk(key, walls)
+
+        # Cats go anywhere in the room that they don't overlap a wall
+        for i in range(self.chunk_enemies.pop(key, self.chunk_enemy_count)):
+            for attempt in range(20):
+                x = rng.randrange(chunk.rect.left + TILE_SIZE * 2, chunk.rect.right - TILE_SIZE * 2)
+                y = rng.randrange(chunk.rect.top + TILE_SIZE * 2, chunk.rect.bottom - TILE_SIZE * 2)
+                rect = pygame.Rect(0, 0, ENEMY_SIZE, ENEMY_SIZE)
+                rect.center = (x, y)
+                if not self.wall_grid.collide_rect(rect):
+                    self.enemies.add(Enemy(self, x, y))
+                    break
+
+    def evict_chunk(self, key):
+        """Drops a chunk's walls and the cats inside it, remembering how many cats there were."""
+        chunk = self.chunks.pop(key)
+        for wall in chunk.walls:
+            self.wall_grid.remove(wall)
+            wall.kill()
+        left = [enemy for enemy in self.enemies if chunk_of(enemy.rect.centerx, enemy.rect.centery) == key]
+        for enemy in left:
+            enemy.kill()
+        self.chunk_enemies[key] = len(left)
 
     def make_wall(self, x, y, w, h):
+        # Walls are static: they live in the baked background, not all_sprites
         wall = Wall(x,y,w,h)
-        self.all_sprites.add(wall)
         self.walls.add(wall)
+        self.wall_grid.add(wall)
+        return wall
+
+    def bake_background(self):
+        """Renders the floor and every wall into one surface."""
+        background = pygame.Surface(self.screen.get_size()).convert()
+        background.fill(DARK_GREY)
+        self.walls.draw(background)
+        return background
+
+    def compose_background(self):
+        """Redraws the background with the floor and the walls in view of the scrolling camera."""
+        background = self.background
+        background.fill(DARK_GREY)
+        view = self.camera.rect
+        ox, oy = self.camera.offset
+        background.blits([(wall.image, wall.rect.move(ox, oy)) for wall in self.walls if wall.rect.colliderect(view)], False)
 
     def run(self):
         self.playing = True
         while self.playing:
-            self.clock.tick(FPS)
+            frame_time = self.clock.tick(FPS) / 1000 # Seconds since the last frame
+            frame_profiler = self.profiler
+            frame_profiler.begin_frame()
             self.events()
-            self.update()
-            self.draw()
+            frame_profiler.mark('events')
+            for _ in range(self.timestep.advance(frame_time)):
+                self.update()
+            alpha = self.timestep.alpha # The camera and every sprite use the same blend, so the view doesn't shimmer
+            self.draw_world(alpha)
+            frame_profiler.mark('draw')
+            self.draw_hud(alpha)
+            self.dirty.add(frame_profiler.draw(self.screen, TILE_SIZE + 10, SCREEN_HEIGHT - TILE_SIZE - profiler.OVERLAY_HEIGHT - 10))
+            frame_profiler.mark('hud')
+            if self.game_over:
+                self.show_game_over_screen()
+                self.dirty.reset(self.screen, self.background) # The overlay covered everything
+                frame_profiler.skip() # Waiting for a key isn't frame time
+            self.present()
+            frame_profiler.mark('flip')
+            frame_profiler.end_frame()
+            if self.startup is not None:
+                self.startup.mark('first frame')
+                print(self.startup.report())
+                self.playing = self.running = False
+
+    def present(self):
+        """Pushes the frame to the display, only the regions that changed if they're small."""
+        self.dirty.present()
 
     def update(self):
         if self.game_over: return
             
+        self.update_sprites()
+        self.profiler.mark('update')
+        self.check_collisions()
+        self.profiler.mark('collision')
+
+    def update_sprites(self):
+        self.ticks += 1
+        self.now = self.ticks * 1000 / TICK_RATE
         self.all_sprites.update()
+        if self.world:
+            self.stream_chunks()
+        self.enemy_manager.update() # After the player, so cats chase its new position
 
+    def check_collisions(self):
         # Projectile hits enemy
         hits = pygame.sprite.groupcollide(self.enemies, self.projectiles, False, True)
         for enemy in hits:
@@ -344,7 +1057,7 @@ class Game:
             self.game_over = True
             self.winner = "Cats"
             
-        if not self.enemies:
+        if not self.enemies and not self.world: # A streamed world always has more cats
             self.game_over = True
             self.winner = "Crab"
 
@@ -353,6 +1066,8 @@ class Game:
             if event.type == pygame.QUIT:
                 self.playing = False
                 self.running = False
+            if self.profiler.handle_event(event):
+                continue
             # ---!!! CODE CHANGED !!!---
             # Melee attack was removed from here.
             # Ranged attack is a special ability, so it stays as a single press event.
@@ -361,34 +1076,43 @@ class Game:
                     self.player.shoot()
             # ---!!! END OF CHANGE !!!---
 
-    def draw(self):
-        self.screen.fill(DARK_GREY)
-        self.all_sprites.draw(self.screen)
-        
-        # UI
-        draw_health_bar(self.screen, 10, 10, self.player.health, GREEN)
-        draw_text(self.screen, "CRAB HEALTH", 18, 85, 35, WHITE)
-        
-        # Ranged Cooldown UI
-        now = pygame.time.get_ticks()
-        shot_pct = (now - self.player.last_shot) / self.player.shot_delay
-        draw_cooldown_bar(self.screen, 10, 60, shot_pct, BLUE)
-        draw_text(self.screen, "Bubble Shot (F)", 15, 60, 80, WHITE)
-
-        # Melee Cooldown UI (visual feedback for player)
-        melee_pct = (now - self.player.last_melee) / self.player.melee_delay
-        draw_cooldown_bar(self.screen, 10, 100, melee_pct, YELLOW)
-        draw_text(self.screen, "Claw Swipe (Space)", 15, 75, 120, WHITE)
-
-        # Enemy Health Bars (above their heads)
-        for enemy in self.enemies:
-            if enemy.health < 100: # Only show if damaged
-                draw_health_bar(self.screen, enemy.rect.x, enemy.rect.y - 20, enemy.health, RED)
-        
-        if self.game_over:
-            self.show_game_over_screen()
-        
-        pygame.display.flip()
+    def draw(self, alpha=1.0):
+        self.draw_world(alpha)
+        self.draw_hud(alpha)
+
+    def draw_world(self, alpha=1.0):
+        dirty = self.dirty
+        if self.world:
+            # Scrolling: the whole background changes, so repaint it and push the full frame
+            moved = self.camera.follow(render_rect(self.player, alpha).center)
+            if moved or self.camera_moved:
+                self.camera_moved = False
+                self.compose_background()
+                dirty.reset(self.screen, self.background)
+
+        # Put the background back wherever something was drawn last frame
+        dirty.erase(self.screen, self.background)
+
+        # Moving sprites are drawn between their last two tick positions,
+        # and only those in view: the cats are looked up in a grid index
+        camera = self.camera
+        manager = self.enemy_manager
+        in_view = camera.query(manager.grid_index(), ENEMY_DRAW_MARGIN)
+        dirty.extend(self.screen.blits(manager.blit_sequence(alpha, camera.offset, in_view)))
+        dirty.extend(self.screen.blits(camera.visible_sprites(self.all_sprites, alpha)))
+
+    def draw_hud(self, alpha=1.0):
+        # Enemy Health Bars (above their heads), from the same cached bar images
+        manager = self.enemy_manager
+        damaged = manager.damaged(self.camera.query(manager.grid_index(), ENEMY_HEALTH_BAR_MARGIN)) # Only show if damaged and in view
+        ox, oy = self.camera.offset
+        enemy_bars = [
+            (health_bar_surface(health, RED), (x + ox, y + oy - 20))
+            for (x, y), health in zip(manager.render_topleft(alpha, damaged).tolist(), manager.health[damaged].tolist())
+        ]
+
+        # Player bars and labels, then the cats' bars, in one pass
+        self.dirty.extend(self.hud.draw(self.screen, enemy_bars))
         
     def show_game_over_screen(self):
         s = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
@@ -423,8 +1147,22 @@ class Game:
                         self.game_over = False
 
 # --- Start the game ---
-g = Game()
-while g.running:
-    g.new()
+def main():
+    parser = argparse.ArgumentParser(description="Crab's Dungeon")
+    parser.add_argument('--world', action='store_true', help=f"explore a {WORLD_CHUNKS[0]}x{WORLD_CHUNKS[1]}-screen dungeon streamed in chunk by chunk")
+    parser.add_argument('--seed', type=int, help="dungeon seed for --world (random by default)")
+    parser.add_argument('--measure-startup', action='store_true', help="print the time to the first frame and quit")
+    args = parser.parse_args()
+
+    startup = None
+    if args.measure_startup:
+        startup = profiler.StartupTimer(LAUNCH_TIME)
+        startup.mark('imports')
+    g = Game(world=args.world, seed=args.seed, startup=startup)
+    while g.running:
+        g.new()
+
+    pygame.quit()
 
-pygame.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Object pools for short-lived sprites such as projectiles and hitboxes.
+
+Firing a bullet every few frames and dropping it a second later means a
+steady stream of Surfaces and Vector2s for the allocator and the garbage
+collector. A pooled sprite goes back to its class's pool when it is killed,
+and the next acquire() hands it out again, re-initialised through reset(),
+instead of building a new one.
+
+    class Bullet(PooledSprite):
+        def __init__(self, *args):
+            super().__init__()
+            self.reset(*args)
+
+        def reset(self, *args):
+            ...
+
+    Bullet.pool = SpritePool('Bullet', Bullet)
+    bullet = Bullet.pool.acquire(*args)
+"""
+
+import pygame
+
+POOLS = {} # name -> SpritePool, for reporting
+
+
+class SpritePool:
+    """Killed sprites of one class, waiting to be handed out again."""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory # Builds a new sprite when the pool is empty
+        self._free = []
+        # Stats for profiling
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        POOLS[name] = self
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self, *args, **kwargs):
+        """A sprite set up with these arguments, recycled if one is free."""
+        if self._free:
+            sprite = self._free.pop()
+            sprite.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            sprite = self.factory(*args, **kwargs)
+            self.created += 1
+        sprite.pooled = False
+        return sprite
+
+    def release(self, sprite):
+        if sprite.pooled:
+            return # Killed twice
+        sprite.pooled = True
+        self._free.append(sprite)
+        self.released += 1
+
+    def clear(self):
+        self._free.clear()
+
+    def reset_stats(self):
+        self.created = self.reused = self.released = 0
+
+    def stats(self):
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'released': self.released,
+            'free': len(self._free),
+        }
+
+
+def all_stats():
+    """Stats for every pool, by name."""
+    return {name: pool.stats() for name, pool in POOLS.items()}
+
+
+def reset_stats():
+    for pool in POOLS.values():
+        pool.reset_stats()
+
+
+class PooledSprite(pygame.sprite.Sprite):
+    """A sprite that returns to its class's pool when killed."""
+    pool = None # Each subclass sets its own SpritePool
+    pooled = False
+
+    def reset(self, *args, **kwargs):
+        """Re-initialises a recycled sprite; takes the same arguments as __init__."""
+        raise NotImplementedError
+
+    def kill(self):
+        super().kill()
+        if self.pool is not None:
+            self.pool.release(self)
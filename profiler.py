@@ -0,0 +1,216 @@
+"""
+In-game frame profiler shared by the pygame games.
+
+The game loop calls begin_frame(), then mark(phase) right after each phase
+finishes; the time since the previous mark is charged to that phase. Marks
+can repeat within a frame (e.g. several fixed ticks), their times add up.
+Finished frames go into a fixed-size ring buffer.
+
+Hotkeys (passed through handle_event):
+    F3  toggle the on-screen graph of recent frames and per-phase averages
+    F4  dump the ring buffer to a CSV file in the working directory
+
+StartupTimer does the same for launch: phases from process start up to the
+first frame on screen, for the games' --measure-startup flag.
+"""
+
+import csv
+import time
+
+import numpy as np
+import pygame
+
+import text_cache
+
+PHASES = ('events', 'update', 'collision', 'draw', 'hud', 'flip')
+PHASE_COLORS = {
+    'events': (120, 120, 255),
+    'seek': (255, 255, 0),
+    'update': (0, 200, 0),
+    'collision': (255, 165, 0),
+    'snapshot': (255, 105, 180),
+    'draw': (200, 0, 200),
+    'hud': (0, 200, 200),
+    'flip': (200, 200, 200),
+}
+
+HISTORY_FRAMES = 600 # Frames kept in the ring buffer
+GRAPH_FRAMES = 120 # Frames shown in the overlay graph
+GRAPH_HEIGHT = 80 # pixels
+GRAPH_BUDGET_MS = 1000 / 60 # The frame budget line
+GRAPH_SCALE_MS = GRAPH_BUDGET_MS * 2 # Time shown at the top of the graph
+AVERAGE_REFRESH_FRAMES = 15 # Re-render the averages text this often
+TEXT_SIZE = 14
+LINE_HEIGHT = 12 # pixels
+
+
+def overlay_height(phases=PHASES):
+    """Height in pixels of the overlay for a profiler with these phases."""
+    return GRAPH_HEIGHT + 2 + (len(phases) + 1) * LINE_HEIGHT
+
+
+OVERLAY_HEIGHT = overlay_height() # With the default PHASES
+
+TOGGLE_KEY = pygame.K_F3
+DUMP_KEY = pygame.K_F4
+
+
+class FrameProfiler:
+    """Per-phase frame timings in a ring buffer, with an overlay and CSV export."""
+
+    def __init__(self, name, phases=PHASES, capacity=HISTORY_FRAMES):
+        self.name = name # Used in CSV file names
+        self.phases = phases
+        self.capacity = capacity
+        self._phase_index = {phase: index for index, phase in enumerate(phases)}
+        self.samples = np.zeros((capacity, len(phases)), dtype=np.int64) # nanoseconds
+        self.frames = 0 # Frames recorded so far (the ring position is frames % capacity)
+
+        self._current = np.zeros(len(phases), dtype=np.int64)
+        self._last_mark = time.perf_counter_ns()
+
+        self.visible = False
+        self._graph = None # Scrolling graph surface, one column per frame
+        self._averages = [] # Rendered averages text, refreshed every AVERAGE_REFRESH_FRAMES
+
+    # --- Timing ---
+    def begin_frame(self):
+        self._current[:] = 0
+        self._last_mark = time.perf_counter_ns()
+
+    def mark(self, phase):
+        """Charges the time since the previous mark to phase."""
+        now = time.perf_counter_ns()
+        self._current[self._phase_index[phase]] += now - self._last_mark
+        self._last_mark = now
+
+    def skip(self):
+        """Drops the time since the previous mark, e.g. a blocking menu."""
+        self._last_mark = time.perf_counter_ns()
+
+    def end_frame(self):
+        self.samples[self.frames % self.capacity] = self._current
+        self.frames += 1
+        if self.visible:
+            self._add_graph_column(self._current)
+
+    def history(self, count=None):
+        """The recorded frames, oldest first, as an array of nanoseconds per phase."""
+        stored = min(self.frames, self.capacity)
+        if count is not None:
+            stored = min(stored, count)
+        end = self.frames % self.capacity
+        indices = np.arange(end - stored, end) % self.capacity
+        return self.samples[indices]
+
+    def averages(self, count=GRAPH_FRAMES):
+        """Mean milliseconds per phase over the last count frames."""
+        recent = self.history(count)
+        if not len(recent):
+            return {phase: 0.0 for phase in self.phases}
+        means = recent.mean(axis=0) / 1e6
+        return dict(zip(self.phases, means.tolist()))
+
+    # --- Hotkeys ---
+    def handle_event(self, event):
+        """Handles the profiler hotkeys. Returns True if the event was used."""
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == TOGGLE_KEY:
+            self.visible = not self.visible
+            self._graph = None # Rebuilt from history when shown
+            return True
+        if event.key == DUMP_KEY:
+            print(f"Profiler: wrote {self.dump_csv()}")
+            return True
+        return False
+
+    def dump_csv(self, path=None):
+        """Writes the ring buffer to CSV, one row per frame in milliseconds."""
+        if path is None:
+            path = f"profile_{self.name}_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+        history = self.history()
+        first_frame = self.frames - len(history)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame'] + [f'{phase}_ms' for phase in self.phases] + ['total_ms'])
+            for offset, row in enumerate(history):
+                ms = row / 1e6
+                writer.writerow([first_frame + offset] + [f'{value:.4f}' for value in ms] + [f'{ms.sum():.4f}'])
+        return path
+
+    # --- Overlay ---
+    def _add_graph_column(self, row):
+        """Scrolls the graph left one column and draws the newest frame as a stacked bar."""
+        if self._graph is None:
+            self._graph = pygame.Surface((GRAPH_FRAMES, GRAPH_HEIGHT))
+            for old_row in self.history(GRAPH_FRAMES - 1)[:-1]:
+                self._draw_column(old_row)
+        self._draw_column(row)
+
+    def _draw_column(self, row):
+        graph = self._graph
+        graph.scroll(-1, 0)
+        x = GRAPH_FRAMES - 1
+        graph.fill((0, 0, 0), (x, 0, 1, GRAPH_HEIGHT))
+        y = GRAPH_HEIGHT
+        for phase, ns in zip(self.phases, row.tolist()):
+            height = int(ns / 1e6 / GRAPH_SCALE_MS * GRAPH_HEIGHT)
+            if height:
+                y -= height
+                graph.fill(PHASE_COLORS.get(phase, (255, 255, 255)), (x, y, 1, height))
+        budget_y = GRAPH_HEIGHT - int(GRAPH_BUDGET_MS / GRAPH_SCALE_MS * GRAPH_HEIGHT)
+        graph.set_at((x, budget_y), (255, 0, 0))
+
+    def draw(self, surf, x, y):
+        """Draws the overlay with its top-left at (x, y). Returns the rect it covered."""
+        if not self.visible:
+            return pygame.Rect(x, y, 0, 0)
+        if self._graph is None:
+            self._graph = pygame.Surface((GRAPH_FRAMES, GRAPH_HEIGHT))
+            for row in self.history(GRAPH_FRAMES):
+                self._draw_column(row)
+
+        if not self._averages or self.frames % AVERAGE_REFRESH_FRAMES == 0:
+            averages = self.averages()
+            lines = [f"{phase:<9}{ms:6.2f} ms" for phase, ms in averages.items()]
+            lines.append(f"{'total':<9}{sum(averages.values()):6.2f} ms")
+            self._averages = [
+                text_cache.get_font(TEXT_SIZE).render(line, True, PHASE_COLORS.get(phase, (255, 255, 255)))
+                for line, phase in zip(lines, list(self.phases) + ['total'])
+            ]
+
+        covered = pygame.Rect(x, y, GRAPH_FRAMES, GRAPH_HEIGHT)
+        surf.blit(self._graph, (x, y))
+        line_y = y + GRAPH_HEIGHT + 2
+        for text_surface in self._averages:
+            covered.union_ip(surf.blit(text_surface, (x, line_y)))
+            line_y += LINE_HEIGHT
+        return covered
+
+
+class StartupTimer:
+    """
+    Time from launch to the first frame, split into phases by mark(phase).
+
+    So that imports count towards it, a game takes its start time as
+    LAUNCH_TIME in its very first lines, ahead of its other imports (which
+    are marked noqa: E402 for it).
+    """
+
+    def __init__(self, start):
+        self.start = start # time.perf_counter() at launch
+        self._last_mark = start
+        self.phases = {} # phase -> seconds, in order
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0) + now - self._last_mark
+        self._last_mark = now
+
+    def total(self):
+        return self._last_mark - self.start
+
+    def report(self):
+        phases = ", ".join(f"{phase} {seconds * 1000:.1f}" for phase, seconds in self.phases.items())
+        return f"Startup: {self.total() * 1000:.1f} ms to first frame ({phases} ms)"
@@ -0,0 +1,154 @@
+"""
+A uniform-grid spatial hash used as a collision broadphase.
+
+Items are inserted into every grid cell their bounding box touches, and
+queries only look at the cells the query area touches, so finding nearby
+items costs roughly the same however many items are in the world.
+
+If the playfield wraps around (like asteroid.py's screen), pass its width and
+height and bounding boxes that cross an edge are also filed under the cells
+on the opposite side.
+
+GridIndex is the bulk counterpart for points kept in NumPy arrays, and
+round_half_away() turns array positions into the whole pixels a Rect would
+hold.
+"""
+
+import math
+
+import numpy as np
+
+
+def round_half_away(values):
+    """Rounds like pygame does when a float is assigned to a Rect (halves away from zero)."""
+    return np.where(values >= 0, np.floor(values + 0.5), np.ceil(values - 0.5))
+
+
+class SpatialHash:
+    """Uniform grid of cells, each holding the items that overlap it."""
+
+    def __init__(self, cell_size, width=None, height=None):
+        self.cell_size = cell_size
+        self.width = width
+        self.height = height
+        self.wrap = width is not None and height is not None
+        if self.wrap:
+            self.cols = math.ceil(width / cell_size)
+            self.rows = math.ceil(height / cell_size)
+        self._cells = {} # (col, row) -> list of item indices
+        self._items = [] # Insertion order, so query results are stable
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._cells.clear()
+        self._items.clear()
+
+    def _span(self, lo, hi, size, count):
+        """Cell indices covering [lo, hi] along one axis."""
+        cell = self.cell_size
+        if not self.wrap:
+            return range(math.floor(lo / cell), math.floor(hi / cell) + 1)
+        extent = hi - lo
+        if extent >= size:
+            return range(count)
+        lo %= size
+        hi = lo + extent
+        first = int(lo // cell)
+        if hi < size:
+            return range(first, min(int(hi // cell), count - 1) + 1)
+        # Crosses the far edge: the rest of this side plus the start of the other
+        return list(range(first, count)) + list(range(0, min(int((hi - size) // cell), first - 1) + 1))
+
+    def _cells_for(self, left, top, right, bottom):
+        cols = self._span(left, right, self.width, self.cols if self.wrap else None)
+        rows = self._span(top, bottom, self.height, self.rows if self.wrap else None)
+        return [(col, row) for col in cols for row in rows]
+
+    def insert_rect(self, item, left, top, right, bottom):
+        """Files an item under every cell its bounding box overlaps."""
+        index = len(self._items)
+        self._items.append(item)
+        cells = self._cells
+        for key in self._cells_for(left, top, right, bottom):
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [index]
+            else:
+                bucket.append(index)
+
+    def insert_circle(self, item, x, y, radius):
+        self.insert_rect(item, x - radius, y - radius, x + radius, y + radius)
+
+    def query_rect(self, left, top, right, bottom):
+        """Items whose cells overlap the box, unique and in insertion order."""
+        found = set()
+        cells = self._cells
+        for key in self._cells_for(left, top, right, bottom):
+            bucket = cells.get(key)
+            if bucket:
+                found.update(bucket)
+        items = self._items
+        return [items[index] for index in sorted(found)]
+
+    def query_circle(self, x, y, radius):
+        return self.query_rect(x - radius, y - radius, x + radius, y + radius)
+
+    def delta(self, ax, ay, bx, by):
+        """Shortest (dx, dy) from b to a, going around the edges if the grid wraps."""
+        dx = ax - bx
+        dy = ay - by
+        if self.wrap:
+            dx = (dx + self.width / 2) % self.width - self.width / 2
+            dy = (dy + self.height / 2) % self.height - self.height / 2
+        return dx, dy
+
+
+class GridIndex:
+    """
+    Points bucketed into a uniform grid, built in one vectorised pass.
+
+    Where SpatialHash is filled one item at a time, this takes an (n, 2)
+    NumPy array of positions and sorts the point indices by cell, with cells
+    numbered row by row. A rectangle query is then one slice of the sorted
+    array per row of cells it covers, so it costs about the same however many
+    points lie outside the rectangle. Rebuild it whenever the points move.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.build(np.zeros((0, 2)))
+
+    def __len__(self):
+        return len(self._order)
+
+    def build(self, positions):
+        cells = np.floor_divide(positions, self.cell_size).astype(np.int64)
+        if len(cells):
+            self._first = cells.min(axis=0) # (col, row) of the top-left cell in use
+            self._cols = int(cells[:, 0].max() - self._first[0]) + 1
+            self._rows = int(cells[:, 1].max() - self._first[1]) + 1
+        else:
+            self._first = np.zeros(2, dtype=np.int64)
+            self._cols = self._rows = 0
+        cells -= self._first
+        keys = cells[:, 1] * self._cols + cells[:, 0]
+        self._order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._order]
+
+    def query_rect(self, left, top, right, bottom):
+        """Indices of the points in the cells the box overlaps, in ascending order."""
+        size = self.cell_size
+        first_col, first_row = self._first.tolist()
+        col0 = max(math.floor(left / size) - first_col, 0)
+        col1 = min(math.floor(right / size) - first_col, self._cols - 1)
+        row0 = max(math.floor(top / size) - first_row, 0)
+        row1 = min(math.floor(bottom / size) - first_row, self._rows - 1)
+        if col0 > col1 or row0 > row1:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.arange(row0, row1 + 1) * self._cols
+        starts = np.searchsorted(self._keys, rows + col0, side='left')
+        ends = np.searchsorted(self._keys, rows + col1, side='right')
+        order = self._order
+        return np.sort(np.concatenate([order[start:end] for start, end in zip(starts.tolist(), ends.tolist())]))
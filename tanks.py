@@ -1,14 +1,61 @@
+import argparse
+import random
+import time
+
 import arcade
 
+try:
+    # Arcade 3.x keeps the retained-mode shapes in arcade.shape_list
+    from arcade.shape_list import ShapeElementList, create_rectangle_filled, create_rectangle_outline, create_rectangles_filled_with_colors
+except ImportError:
+    # Arcade 2.x has them at the top level
+    from arcade import ShapeElementList, create_rectangle_filled, create_rectangle_outline, create_rectangles_filled_with_colors
+
 # --- Constants ---
 SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 400
 SCREEN_TITLE = "Rectangle Drawing Test"
 
+# The test rectangles: (center_x, center_y, width, height, color, border_width)
+# A border_width of None means filled
+RECTANGLES = [
+    (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, 100, 150, arcade.color.RED, None), # Filled red rectangle in the center-ish
+    (150, 100, 80, 50, arcade.color.BLUE, None), # Another filled blue rectangle
+    (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 100, 120, 70, arcade.color.GREEN, 5), # Outlined green rectangle
+    (450, 300, 60, 100, arcade.color.YELLOW, 3), # Outlined yellow rectangle
+]
+
+# Stress mode (--stress N) adds N random filled rectangles
+STRESS_RECT_SIZE = (4, 16) # Min/max side length in pixels
+
+
+def create_rectangle(center_x, center_y, width, height, color, border_width=None):
+    """ One rectangle as a retained shape, filled or (with a border width) outlined """
+    if border_width is None:
+        return create_rectangle_filled(center_x, center_y, width, height, color)
+    return create_rectangle_outline(center_x, center_y, width, height, color, border_width=border_width)
+
+
+def create_stress_rectangles(count, width, height, seed=0):
+    """ count random filled rectangles inside width x height, all in a single shape """
+    rng = random.Random(seed)
+    points = []
+    colors = []
+    for _ in range(count):
+        x = rng.uniform(0, width)
+        y = rng.uniform(0, height)
+        half_w = rng.uniform(*STRESS_RECT_SIZE) / 2
+        half_h = rng.uniform(*STRESS_RECT_SIZE) / 2
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256), 255)
+        points += [(x - half_w, y - half_h), (x + half_w, y - half_h), (x + half_w, y + half_h), (x - half_w, y + half_h)]
+        colors += [color] * 4
+    return create_rectangles_filled_with_colors(points, colors)
+
+
 class RectangleDrawingGame(arcade.Window):
     """ Simple game to test drawing rectangles. """
 
-    def __init__(self, width, height, title):
+    def __init__(self, width, height, title, stress_count=0):
         """ Initializer """
         # Call the parent class initializer
         super().__init__(width, height, title)
@@ -16,77 +63,45 @@ class RectangleDrawingGame(arcade.Window):
         # Set the background color (optional - clear will use this)
         arcade.set_background_color(arcade.color.AMAZON)
 
+        self.stress_count = stress_count
+        self.shapes = None # Every rectangle, built once in setup()
+
+        # Draw timing, reported once when the game ends
+        self.frames_drawn = 0
+        self.draw_time = 0.0
+
     def setup(self):
         """ Set up the game here. This is called once when the game starts. """
-        pass
+        # The rectangles never change, so build them into one shape list now
+        # and let the GPU draw the whole batch each frame
+        start = time.perf_counter()
+        self.shapes = ShapeElementList()
+        for rectangle in RECTANGLES:
+            self.shapes.append(create_rectangle(*rectangle))
+        if self.stress_count:
+            self.shapes.append(create_stress_rectangles(self.stress_count, self.width, self.height))
+        elapsed = time.perf_counter() - start
+        print(f"Built {len(RECTANGLES) + self.stress_count} rectangles into one shape list in {elapsed * 1000:.1f} ms")
 
     def on_draw(self):
         """ Render the screen. """
+        start = time.perf_counter()
 
-        # This command should clear the screen before we start drawing
         # In an arcade.Window subclass, use self.clear() instead of arcade.start_render()
         self.clear()
 
         # --- Drawing Rectangles ---
+        # One call draws every rectangle
+        self.shapes.draw()
 
-        # Draw a filled red rectangle in the center-ish
-        try:
-            arcade.draw_rectangle_filled(
-                center_x=SCREEN_WIDTH / 2,
-                center_y=SCREEN_HEIGHT / 2,
-                width=100,
-                height=150,
-                color=arcade.color.RED
-            )
-            print("Successfully called arcade.draw_rectangle_filled (RED)")
-        except AttributeError as e:
-            print(f"AttributeError when calling draw_rectangle_filled (RED): {e}")
-
-
-        # Draw another filled blue rectangle
-        try:
-            arcade.draw_rectangle_filled(
-                center_x=150,
-                center_y=100,
-                width=80,
-                height=50,
-                color=arcade.color.BLUE
-            )
-            print("Successfully called arcade.draw_rectangle_filled (BLUE)")
-        except AttributeError as e:
-             print(f"AttributeError when calling draw_rectangle_filled (BLUE): {e}")
-
-
-        # Draw an outlined green rectangle
-        try:
-            arcade.draw_rectangle_outline(
-                center_x=SCREEN_WIDTH - 150,
-                center_y=SCREEN_HEIGHT - 100,
-                width=120,
-                height=70,
-                color=arcade.color.GREEN,
-                border_width=5 # Thickness of the outline
-            )
-            print("Successfully called arcade.draw_rectangle_outline (GREEN)")
-        except AttributeError as e:
-             print(f"AttributeError when calling draw_rectangle_outline (GREEN): {e}")
-
-        # Draw another outlined yellow rectangle
-        try:
-            arcade.draw_rectangle_outline(
-                center_x=450,
-                center_y=300,
-                width=60,
-                height=100,
-                color=arcade.color.YELLOW,
-                border_width=3
-            )
-            print("Successfully called arcade.draw_rectangle_outline (YELLOW)")
-        except AttributeError as e:
-             print(f"AttributeError when calling draw_rectangle_outline (YELLOW): {e}")
-
-        # arcade.finish_render() # You also don't call finish_render() in on_draw
+        self.draw_time += time.perf_counter() - start
+        self.frames_drawn += 1
 
+    def report(self):
+        """ Prints the average draw time, once. """
+        if self.frames_drawn:
+            average = self.draw_time / self.frames_drawn * 1000
+            print(f"Drew {self.frames_drawn} frames, {average:.2f} ms per frame on average")
 
     def on_update(self, delta_time):
         """ Movement and game logic. (Not used in this example)"""
@@ -103,10 +118,15 @@ class RectangleDrawingGame(arcade.Window):
 
 def main():
     """ Main function to start the game. """
-    game = RectangleDrawingGame(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument('--stress', type=int, default=0, metavar='N', help="also draw N random rectangles (e.g. 10000)")
+    args = parser.parse_args()
+
+    game = RectangleDrawingGame(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, stress_count=args.stress)
     game.setup()
     arcade.run()
+    game.report()
 
 # Run the main function when the script is executed
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The games run headless under test, and are imported from the repository root
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['XDG_CACHE_HOME'] = tempfile.mkdtemp() # Keep saved font paths out of the real cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,130 @@
+import statistics
+import struct
+import time
+import zlib
+
+import pytest
+
+import asteroid
+
+
+def play(sim, ticks, start=0):
+    """Steps sim through the demo script, returning the state digest after each tick."""
+    script = asteroid.ScriptedInput(asteroid.DEMO_SCRIPT)
+    digests = []
+    for tick in range(start, start + ticks):
+        sim.clock.advance()
+        sim.step(script.next_input(tick))
+        digests.append(sim.state_digest())
+    return digests
+
+
+def new_simulation(seed):
+    asteroid.pygame.init()
+    return asteroid.Simulation(asteroid.WIDTH, asteroid.HEIGHT, clock=asteroid.SimClock(), seed=seed, verbose=False)
+
+
+def test_same_seed_same_digest():
+    first, _, _ = asteroid.run_headless(1500, seed=3)
+    second, _, _ = asteroid.run_headless(1500, seed=3)
+    other, _, _ = asteroid.run_headless(1500, seed=4)
+    assert first.state_digest() == second.state_digest()
+    assert first.state_digest() != other.state_digest()
+
+
+def test_replay_round_trip(tmp_path):
+    replay = asteroid.Replay(7)
+    recorded, _, _ = asteroid.run_headless(1500, seed=7, replay=replay)
+    path = tmp_path / 'session.astr'
+    replay.save(path)
+
+    loaded = asteroid.Replay.load(path)
+    assert (loaded.seed, loaded.inputs) == (replay.seed, replay.inputs)
+    played, _ = asteroid.run_replay(loaded)
+    assert played.ticks == recorded.ticks
+    assert played.state_digest() == recorded.state_digest()
+
+
+def test_replay_seek():
+    replay = asteroid.Replay(5)
+    asteroid.run_headless(1500, seed=5, replay=replay)
+    player = asteroid.ReplayPlayer(replay, new_simulation(5))
+    digests = []
+    while player.step():
+        digests.append(player.sim.state_digest())
+
+    for tick in (1400, 100, 1000, 650, len(replay)):
+        player.seek(tick)
+        assert player.sim.ticks == tick
+        assert player.sim.state_digest() == digests[tick - 1]
+
+
+def test_snapshot_rewind():
+    sim = new_simulation(9)
+    snapshots = asteroid.SnapshotBuffer(seconds=5, keyframe_ticks=20)
+    snapshots.push(sim.save_state())
+    script = asteroid.ScriptedInput(asteroid.DEMO_SCRIPT)
+    digests = []
+    for tick in range(1000): # More than the buffer holds, so old keyframes get dropped
+        sim.clock.advance()
+        sim.step(script.next_input(tick))
+        snapshots.push(sim.save_state())
+        digests.append(sim.state_digest())
+    assert len(snapshots) <= snapshots.capacity
+
+    assert snapshots.rewind(sim, 37) == 37
+    assert sim.ticks == 1000 - 37
+    assert sim.state_digest() == digests[sim.ticks - 1]
+
+    # Going forward again from the restored snapshot replays the same ticks
+    assert play(sim, 37, start=sim.ticks) == digests[-37:]
+
+    # Rewinding past the oldest snapshot stops there
+    snapshots.rewind(sim, 10 ** 6)
+    assert len(snapshots) == 1
+    assert sim.state_digest() == digests[sim.ticks - 1]
+
+
+def test_snapshot_push_after_burst():
+    sim = new_simulation(11)
+    particles = sim.particles
+    snapshots = asteroid.SnapshotBuffer(seconds=5, keyframe_ticks=20)
+
+    def push_ms(count):
+        """Median milliseconds per push over count ticks of particle updates."""
+        times = []
+        for _ in range(count):
+            sim.clock.advance()
+            particles.update(sim.clock())
+            start = time.perf_counter()
+            snapshots.push(sim.save_state())
+            times.append((time.perf_counter() - start) * 1000)
+        return statistics.median(times)
+
+    particles.emit((asteroid.WIDTH / 2, asteroid.HEIGHT / 2), "burst", particles.capacity, sim.clock())
+    assert len(particles) == particles.capacity
+    full = push_ms(10)
+
+    # Once the burst has expired the snapshots no longer carry its slots
+    while len(particles):
+        sim.clock.advance()
+        particles.update(sim.clock())
+    empty = push_ms(10)
+    assert empty < full / 10
+    assert sim.save_state()['particles'][0] == 0
+
+
+def test_replay_seeds(tmp_path):
+    path = tmp_path / 'session.astr'
+    asteroid.Replay(-1, b'\x01\x02').save(path)
+    assert asteroid.Replay.load(path).seed == -1
+
+    # A seed that doesn't fit fails before the old file is touched
+    with pytest.raises(struct.error):
+        asteroid.Replay(2 ** 63, b'\x03').save(path)
+    assert asteroid.Replay.load(path).inputs == b'\x01\x02'
+
+    # Version 1 files stored the seed unsigned
+    inputs = zlib.compress(b'\x04')
+    path.write_bytes(asteroid.REPLAY_HEADER_V1.pack(asteroid.REPLAY_MAGIC, 1, 2 ** 63, 1) + inputs)
+    assert asteroid.Replay.load(path).seed == 2 ** 63
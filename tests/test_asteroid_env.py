@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+
+import asteroid
+import asteroid_env
+
+
+def test_vector_env_matches_simulation():
+    """A VectorAsteroidEnv game loaded from a Simulation stays in step with it under the same inputs."""
+    asteroid_env.init_pygame()
+    clock = asteroid.SimClock()
+    sim = asteroid.Simulation(asteroid.WIDTH, asteroid.HEIGHT, clock=clock, seed=3, verbose=False)
+    env = asteroid_env.VectorAsteroidEnv(1, seed=0)
+    env.reset()
+    inputs = random.Random(3)
+
+    compared = 0
+    for _ in range(3000):
+        action = inputs.randrange(asteroid_env.ACTION_COUNT)
+        was_waiting = sim.waiting_to_start_level
+        clock.advance()
+        sim.step(asteroid.TICK_INPUTS_BY_BITS[action])
+        env.step([action])
+        if sim.game_over:
+            break
+        if was_waiting and not sim.waiting_to_start_level:
+            env.load_game(0, sim) # Each level's layout comes from a different RNG
+            continue
+
+        assert (env.score[0], env.lives[0], env.level[0], env.waiting[0]) == (sim.score, sim.lives, sim.level, sim.waiting_to_start_level)
+        assert tuple(env.player_pos[0]) == tuple(sim.player.position)
+        assert sorted(map(tuple, env.block_pos[0][env.block_alive[0]])) == sorted(tuple(block.position) for block in sim.code_blocks)
+        assert env.bullet_alive[0].sum() == len(sim.bullets)
+        compared += 1
+
+    assert compared > 1000
+    assert sim.score > 0
+
+
+def test_one_bullet_per_block():
+    """Two bullets reaching the same block in one tick score it once, and only the first is spent."""
+    env = asteroid_env.VectorAsteroidEnv(1, seed=0)
+    env.reset()
+    env.waiting[:] = False
+    env.invincible[:] = True
+    env.block_alive[0] = False
+    env.block_alive[0, 0] = True
+    env.block_pos[0, 0] = (100, 100)
+    env.block_vel[0, 0] = 0
+    env.block_radius[0, 0] = 20
+    env.bullet_alive[0, :2] = True
+    env.bullet_pos[0, :2] = env.bullet_center[0, :2] = (100, 100)
+    env.bullet_vel[0, :2] = 0
+    env.bullet_spawn[0, :2] = (env.now()[0] + 1, env.now()[0])
+
+    env.step(np.zeros(1, dtype=np.int64))
+
+    assert env.score[0] == asteroid.CODE_BLOCK_SCORES['large']
+    assert env.bullet_alive[0, :2].tolist() == [True, False]
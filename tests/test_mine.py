@@ -0,0 +1,165 @@
+import random
+
+import numpy as np
+import pygame
+
+import mine
+
+
+def new_game(world=False, seed=None, enemy_count=0):
+    """A Game set up but not run: the dungeon, its walls and cats, with no frames drawn."""
+    game = mine.Game(world=world, seed=seed)
+    game.setup(enemy_count)
+    return game
+
+
+def random_rects(rng, count, area=(mine.SCREEN_WIDTH, mine.SCREEN_HEIGHT)):
+    return [pygame.Rect(rng.randrange(-40, area[0]), rng.randrange(-40, area[1]), rng.randrange(1, 120), rng.randrange(1, 120)) for _ in range(count)]
+
+
+def assert_same_hits(grid, walls, rects):
+    probe = pygame.sprite.Sprite()
+    for rect in rects:
+        probe.rect = rect
+        assert grid.collide_rect(rect) == pygame.sprite.spritecollide(probe, walls, False)
+
+
+def test_tile_grid_matches_spritecollide():
+    """collide_rect() finds the same walls as spritecollide() on the wall group, in the same order."""
+    game = new_game()
+    rng = random.Random(1)
+    for rect in random_rects(rng, 40): # Overlapping walls, so a rect often hits several
+        game.make_wall(*rect)
+    assert_same_hits(game.wall_grid, game.walls, random_rects(rng, 2000))
+
+
+def test_tile_grid_order_after_removals():
+    """Walls added after others were removed still come back in the order spritecollide() gives."""
+    game = new_game()
+    rng = random.Random(2)
+    walls = [game.make_wall(*rect) for rect in random_rects(rng, 60)]
+    for wall in rng.sample(walls, 30):
+        game.wall_grid.remove(wall)
+        wall.kill()
+    for rect in random_rects(rng, 30):
+        game.make_wall(*rect)
+    assert_same_hits(game.wall_grid, game.walls, random_rects(rng, 2000))
+
+
+def test_enemy_manager_matches_per_cat_update():
+    """EnemyManager.update() moves and bounces every cat exactly as stepping them one by one does."""
+    random.seed(3)
+    game = new_game(enemy_count=80)
+    # A few more cats dropped onto the obstacles, so the push-out is exercised from every side
+    for x, y in ((310, 215), (440, 190), (620, 520), (205, 640), (230, 700), (760, 505)):
+        game.enemies.add(mine.Enemy(game, x, y))
+    manager = game.enemy_manager
+
+    # The per-cat update, one cat at a time, on copies of the cats' state
+    cats = [(pygame.math.Vector2(pos), speed, vision, pygame.Rect(enemy.rect))
+            for pos, speed, vision, enemy in zip(manager.pos[:manager.count].tolist(), manager.speed.tolist(),
+                                                 manager.vision_radius.tolist(), manager.sprites)]
+
+    def collide_with_walls(pos, rect, axis):
+        hits = game.wall_grid.collide_rect(rect)
+        if not hits:
+            return False
+        wall = hits[0].rect
+        if axis == 'x':
+            if pos.x > wall.centerx:
+                rect.left = wall.right
+            else:
+                rect.right = wall.left
+            pos.x = rect.centerx
+        else:
+            if pos.y > wall.centery:
+                rect.top = wall.bottom
+            else:
+                rect.bottom = wall.top
+            pos.y = rect.centery
+        return True
+
+    # The player stands inside an obstacle, out of the flow field's reach, so the cats run straight into its sides
+    player = game.player.pos
+    bounces = 0
+    for tick in range(300):
+        player.update((380, 216) if tick < 150 else (216, 680))
+        game.flow_field.update(player)
+        for pos, speed, vision, rect in cats:
+            dist = player.distance_to(pos)
+            if 0 < dist < vision:
+                direction = (player - pos).normalize()
+                field_direction, on_field = game.flow_field.sample(np.array([tuple(pos)]))
+                if on_field[0]:
+                    direction = pygame.math.Vector2(field_direction[0].tolist())
+                pos += direction * speed
+            rect.centerx = pos.x
+            bounces += collide_with_walls(pos, rect, 'x')
+            rect.centery = pos.y
+            bounces += collide_with_walls(pos, rect, 'y')
+
+        manager.update()
+        assert manager.pos[:manager.count].tolist() == [list(pos) for pos, _, _, _ in cats]
+        assert [enemy.rect for enemy in manager.sprites] == [rect for _, _, _, rect in cats]
+    assert bounces > 100
+
+
+def test_flow_field_routes_around_a_wall():
+    """A cat following the flow field walks around a wall between it and the player, never into it."""
+    grid = mine.TileGrid()
+    size = mine.TILE_SIZE
+    grid.add(mine.Wall(16 * size, 8 * size, size, 23 * size)) # Columns 16, rows 8 to 30
+    field = mine.FlowField(grid)
+    player = pygame.math.Vector2(20.5 * size, 20.5 * size)
+    field.update(player)
+
+    pos = np.array([[12.5 * size, 20.5 * size]])
+    straight = player - pygame.math.Vector2(pos[0].tolist())
+    direction, on_field = field.sample(pos)
+    assert on_field[0]
+    assert abs(pygame.math.Vector2(direction[0].tolist()).angle_to(straight)) > 20 # Not straight at the wall
+
+    cat = pygame.Rect(0, 0, mine.ENEMY_SIZE, mine.ENEMY_SIZE)
+    for step in range(1000):
+        direction, on_field = field.sample(pos)
+        if not on_field[0]:
+            break
+        pos += direction * 3
+        cat.center = pos[0].tolist()
+        assert not grid.collide_rect(cat)
+    assert tuple(np.floor_divide(pos[0], size).astype(int)) == field.target
+
+
+def chunk_walls(game):
+    """Each loaded chunk's wall rects, and every wall rect in the tile grid."""
+    chunks = {key: sorted(tuple(wall.rect) for wall in chunk.walls) for key, chunk in game.chunks.items()}
+    in_grid = {tuple(wall.rect) for walls in game.wall_grid.cells.values() for wall in walls}
+    return chunks, in_grid
+
+
+def move_player(game, chunk):
+    player = game.player
+    player.pos.update((chunk[0] + 0.5) * mine.CHUNK_WIDTH, (chunk[1] + 0.5) * mine.CHUNK_HEIGHT)
+    player.rect.center = player.pos
+    game.stream_chunks()
+    game.camera.follow(player.rect.center)
+
+
+def test_chunk_streaming_is_repeatable():
+    """Chunks evicted and loaded again as the camera moves come back with the same walls, for the same seed."""
+    game = new_game(world=True, seed=11)
+    seen = {}
+    for chunk in ((8, 8), (9, 8), (12, 8), (12, 12), (8, 12), (8, 8), (4, 3), (9, 8)):
+        move_player(game, chunk)
+        chunks, in_grid = chunk_walls(game)
+        assert all(max(abs(key[0] - chunk[0]), abs(key[1] - chunk[1])) <= mine.CHUNK_EVICT_RADIUS for key in chunks)
+        assert in_grid == {rect for walls in chunks.values() for rect in walls} # Evicted walls left the grid
+        for key, walls in chunks.items():
+            assert seen.setdefault(key, walls) == walls
+
+    # A fresh game with the same seed lays out a chunk the same, whatever it loaded before
+    other = new_game(world=True, seed=11)
+    move_player(other, (4, 3))
+    chunks, _ = chunk_walls(other)
+    assert all(seen[key] == walls for key, walls in chunks.items() if key in seen)
+
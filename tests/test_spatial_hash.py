@@ -0,0 +1,63 @@
+import math
+import random
+
+import numpy as np
+import pygame
+
+from spatial_hash import GridIndex, SpatialHash, round_half_away
+
+
+def test_spatial_hash_finds_every_overlap_on_a_wrapping_screen():
+    """Every circle a brute-force wrapped distance test says overlaps the query is in query_circle()."""
+    rng = random.Random(1)
+    width, height = 800, 600
+    grid = SpatialHash(100, width, height)
+    circles = [(rng.uniform(0, width), rng.uniform(0, height), rng.uniform(2, 60)) for _ in range(300)]
+    for index, (x, y, radius) in enumerate(circles):
+        grid.insert_circle(index, x, y, radius)
+
+    for _ in range(200):
+        x, y, radius = rng.uniform(0, width), rng.uniform(0, height), rng.uniform(2, 60)
+        found = grid.query_circle(x, y, radius)
+        assert found == sorted(set(found))
+        for index, (cx, cy, cradius) in enumerate(circles):
+            dx, dy = grid.delta(x, y, cx, cy)
+            if math.hypot(dx, dy) <= radius + cradius:
+                assert index in found
+
+
+def test_grid_index_matches_brute_force():
+    """query_rect() returns every point inside the box, and nothing outside the cells it covers."""
+    rng = np.random.default_rng(2)
+    points = rng.uniform(-500, 1500, (2000, 2))
+    index = GridIndex(64)
+    index.build(points)
+    assert len(index) == len(points)
+
+    for _ in range(200):
+        left, top = rng.uniform(-600, 1500, 2)
+        right, bottom = left + rng.uniform(0, 400), top + rng.uniform(0, 400)
+        found = index.query_rect(left, top, right, bottom)
+        assert np.all(np.diff(found) > 0)
+
+        inside = (points[:, 0] >= left) & (points[:, 0] <= right) & (points[:, 1] >= top) & (points[:, 1] <= bottom)
+        assert set(np.flatnonzero(inside)) <= set(found.tolist())
+        cells = np.floor_divide(points[found], 64)
+        assert np.all(cells[:, 0] >= math.floor(left / 64)) and np.all(cells[:, 0] <= math.floor(right / 64))
+        assert np.all(cells[:, 1] >= math.floor(top / 64)) and np.all(cells[:, 1] <= math.floor(bottom / 64))
+
+
+def test_empty_grid_index():
+    index = GridIndex(32)
+    assert len(index) == 0
+    assert len(index.query_rect(0, 0, 100, 100)) == 0
+
+
+def test_round_half_away_matches_rect():
+    values = np.concatenate([np.arange(-10, 10, 0.25), np.random.default_rng(3).uniform(-1000, 1000, 500)])
+    rect = pygame.Rect(0, 0, 1, 1)
+    expected = []
+    for value in values.tolist():
+        rect.x = value
+        expected.append(rect.x)
+    assert round_half_away(values).tolist() == expected
@@ -0,0 +1,27 @@
+import json
+
+import text_cache
+
+
+def test_missing_fonts_are_remembered_until_the_font_dirs_change(tmp_path):
+    path = str(tmp_path / 'font_paths.json')
+    fonts = text_cache.FontCache()
+    assert fonts.resolve('no such face at all') is None
+    fonts.save_paths(path)
+
+    # The next launch trusts the saved miss, so nothing is looked up or saved again
+    fonts = text_cache.FontCache()
+    fonts.load_paths(path)
+    assert fonts.resolve('no such face at all') is None
+    assert not fonts.unsaved
+
+    # Once the font directories look different, the face is looked up again
+    with open(path) as f:
+        saved = json.load(f)
+    saved['stamp'] = {'/nowhere': 1}
+    with open(path, 'w') as f:
+        json.dump(saved, f)
+    fonts = text_cache.FontCache()
+    fonts.load_paths(path)
+    fonts.resolve('no such face at all')
+    assert fonts.unsaved
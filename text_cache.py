@@ -0,0 +1,249 @@
+"""
+Shared font and text caches for the pygame games.
+
+Building a pygame.font.Font is slow (it loads and parses the font file) and
+pygame.font.match_font() walks the whole system font list, so neither should
+happen inside a frame. This module keeps:
+
+- one Font per (face, size)
+- a pre-rasterised glyph atlas for printable ASCII per (face, size, color)
+- rendered strings in a small LRU, so HUD text that doesn't change is free
+
+Resolved font paths are also saved to FONT_PATH_CACHE, so after the first
+launch resolve_fonts() doesn't need match_font() at all. Faces that weren't
+found are saved too, along with the modification times of the font
+directories, and looked up again once those change. The font module is
+initialised on first use, so games don't need pygame.init() for text.
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+import pygame
+
+# Printable ASCII range baked into each glyph atlas
+ATLAS_FIRST_CHAR = 32 # space
+ATLAS_LAST_CHAR = 126 # ~
+ATLAS_FALLBACK_CHAR = '?' # Used for anything outside the range
+ATLAS_GLYPH_COUNT = ATLAS_LAST_CHAR - ATLAS_FIRST_CHAR + 1
+
+TEXT_CACHE_SIZE = 512 # Rendered strings kept around
+
+# Face name -> font file, kept between launches; delete it to look fonts up again
+FONT_PATH_CACHE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'pygame-games', 'font_paths.json',
+)
+
+# Installing or removing fonts touches at least one of these (fc-cache rewrites its cache directories)
+FONT_DIRS = (
+    '/usr/share/fonts', '/usr/local/share/fonts', '~/.fonts', '~/.local/share/fonts',
+    '/var/cache/fontconfig', '~/.cache/fontconfig',
+    '/Library/Fonts', '/System/Library/Fonts', '~/Library/Fonts',
+    os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+)
+
+
+def font_dirs_stamp():
+    """Modification time of each font directory that exists, for noticing new or removed fonts."""
+    stamp = {}
+    for directory in FONT_DIRS:
+        try:
+            stamp[directory] = os.stat(os.path.expanduser(directory)).st_mtime_ns
+        except OSError:
+            pass
+    return stamp
+
+
+class LRUCache:
+    """A small least-recently-used cache with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False) # Drop the oldest entry
+
+    def clear(self):
+        self._items.clear()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FontCache:
+    """Fonts keyed by (face, size). face=None is pygame's default font."""
+
+    def __init__(self):
+        self._fonts = {}
+        self._paths = {} # face name -> resolved file path (or None)
+        self.unsaved = False # Faces resolved since the paths were loaded or saved
+
+    def resolve(self, face):
+        """Resolves a system font name to a file path, once per face."""
+        if face is None:
+            return None
+        if face not in self._paths:
+            # match_font returns None if the face isn't installed, which
+            # makes pygame.font.Font fall back to the default font
+            self._paths[face] = pygame.font.match_font(face)
+            self.unsaved = True
+        return self._paths[face]
+
+    def load_paths(self, path):
+        """
+        Adds font paths saved by save_paths(), skipping fonts that have since
+        gone, and faces that weren't found unless the font directories are
+        unchanged since.
+        """
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return # First launch, or an unreadable cache: resolve as usual
+        if not isinstance(saved, dict) or not isinstance(saved.get('paths'), dict):
+            return
+        misses_valid = saved.get('stamp') == font_dirs_stamp()
+        for face, font_path in saved['paths'].items():
+            if (font_path is None and misses_valid) or (isinstance(font_path, str) and os.path.isfile(font_path)):
+                self._paths.setdefault(face, font_path)
+
+    def save_paths(self, path):
+        """Writes the resolved paths for the next launch (quietly does nothing if it can't)."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({'stamp': font_dirs_stamp(), 'paths': self._paths}, f, indent=1, sort_keys=True)
+            os.replace(temp_path, path) # Two games starting at once never see half a file
+        except OSError:
+            return
+        self.unsaved = False
+
+    def get(self, face, size):
+        key = (face, size)
+        font = self._fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init() # Only once text is actually needed
+            font = pygame.font.Font(self.resolve(face), size)
+            self._fonts[key] = font
+        return font
+
+    def clear(self):
+        self._fonts.clear()
+
+
+class GlyphAtlas:
+    """
+    Printable ASCII rendered once into a single surface.
+
+    Each character is addressed by its glyph_index() into self.rects, so callers can
+    draw many characters with one Surface.blits() call using
+    (atlas.surface, position, atlas.rects[index]) tuples.
+    """
+
+    def __init__(self, font, color, antialias=True):
+        self.chars = ''.join(chr(c) for c in range(ATLAS_FIRST_CHAR, ATLAS_LAST_CHAR + 1))
+        glyphs = [font.render(char, antialias, color) for char in self.chars]
+
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max(glyph.get_height() for glyph in glyphs)
+        self.surface = pygame.Surface((max(width, 1), height), pygame.SRCALPHA)
+
+        self.rects = []
+        x = 0
+        for glyph in glyphs:
+            self.surface.blit(glyph, (x, 0))
+            self.rects.append(pygame.Rect(x, 0, glyph.get_width(), height))
+            x += glyph.get_width()
+
+        self.height = height
+
+    def draw(self, surf, text, x, y):
+        """Draws a string glyph by glyph from the atlas."""
+        blit_list = []
+        for char in text:
+            rect = self.rects[glyph_index(char)]
+            blit_list.append((self.surface, (x, y), rect))
+            x += rect.width
+        surf.blits(blit_list, doreturn=False)
+
+
+def glyph_index(char):
+    """Returns the atlas index for a character; the same in every atlas."""
+    code = ord(char) - ATLAS_FIRST_CHAR
+    if 0 <= code < ATLAS_GLYPH_COUNT:
+        return code
+    return ord(ATLAS_FALLBACK_CHAR) - ATLAS_FIRST_CHAR
+
+
+# --- Shared caches used by both games ---
+_fonts = FontCache()
+_atlases = {}
+_rendered_text = LRUCache(TEXT_CACHE_SIZE)
+
+
+def resolve_fonts(faces, cache_path=FONT_PATH_CACHE):
+    """
+    Resolves the font faces a game uses up front, from the paths saved by
+    earlier launches where possible, and saves any new ones. Call it at
+    startup so no system font scan happens on the first frames.
+    """
+    _fonts.load_paths(cache_path)
+    for face in faces:
+        _fonts.resolve(face)
+    if _fonts.unsaved:
+        _fonts.save_paths(cache_path)
+
+
+def get_font(size, face=None):
+    """Returns the shared Font for (face, size)."""
+    return _fonts.get(face, size)
+
+
+def get_glyph_atlas(size, color, face=None, antialias=True):
+    """Returns the shared glyph atlas for (face, size, color, antialias)."""
+    key = (face, size, tuple(color), antialias)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = GlyphAtlas(get_font(size, face), color, antialias)
+        _atlases[key] = atlas
+    return atlas
+
+
+def render_text(text, size, color, face=None, antialias=True):
+    """Returns a rendered text surface, reusing it if it was rendered recently."""
+    key = (face, size, text, tuple(color), antialias)
+    text_surface = _rendered_text.get(key)
+    if text_surface is None:
+        text_surface = get_font(size, face).render(text, antialias, color)
+        _rendered_text.put(key, text_surface)
+    return text_surface
+
+
+def clear_caches():
+    """Drops every cached font, atlas and rendered string."""
+    _fonts.clear()
+    _atlases.clear()
+    _rendered_text.clear()
@@ -0,0 +1,48 @@
+"""
+Fixed-timestep game loop helpers shared by the pygame games.
+
+The simulation always advances in ticks of the same length, no matter how
+long a frame took to render. Real time is collected in an accumulator and
+spent one tick at a time; whatever is left over (less than one tick) becomes
+the interpolation factor the renderer uses to draw between the last two
+simulated states.
+"""
+
+
+class FixedTimestep:
+    """Turns variable frame times into a whole number of fixed ticks."""
+
+    def __init__(self, tick_rate, max_ticks_per_frame=5):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate # Seconds per tick
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.accumulator = 0.0
+        self.dropped_time = 0.0 # Seconds thrown away by the catch-up cap
+
+    def advance(self, frame_time):
+        """Adds a frame's worth of real time (seconds) and returns how many ticks to run."""
+        self.accumulator += frame_time
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.max_ticks_per_frame:
+            # Too far behind: run the cap and drop the rest rather than
+            # spiralling into ever longer catch-up frames
+            self.dropped_time += (ticks - self.max_ticks_per_frame) * self.dt
+            ticks = self.max_ticks_per_frame
+            self.accumulator %= self.dt
+        else:
+            self.accumulator -= ticks * self.dt
+        return ticks
+
+    @property
+    def alpha(self):
+        """How far (0..1) the renderer is between the previous and current tick."""
+        return min(self.accumulator / self.dt, 1.0)
+
+    def reset(self):
+        self.accumulator = 0.0
+
+
+def lerp_wrapped(a, b, alpha, size):
+    """Interpolates along the short way around a wrapping axis of the given size."""
+    delta = (b - a + size / 2) % size - size / 2
+    return (a + delta * alpha) % size